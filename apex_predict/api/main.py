@@ -5,7 +5,9 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from apex_predict.api.routes_v1 import router as v1_router
 from apex_predict.config import get_settings
-from apex_predict.db import init_db
+from apex_predict.db import AsyncSessionLocal, init_db
+from apex_predict.providers.router import provider_router
+from apex_predict.services.prediction_buffer import prediction_buffer
 
 settings = get_settings()
 
@@ -13,7 +15,12 @@ settings = get_settings()
 @asynccontextmanager
 async def lifespan(_: FastAPI):
     await init_db()
+    if settings.prediction_write_buffer_enabled:
+        await prediction_buffer.start(AsyncSessionLocal)
+    provider_router.open()
     yield
+    await prediction_buffer.stop()
+    await provider_router.aclose()
 
 
 app = FastAPI(title=settings.app_name, lifespan=lifespan)
@@ -23,5 +30,6 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 app.include_router(v1_router)
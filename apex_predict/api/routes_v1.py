@@ -4,14 +4,17 @@ from datetime import datetime, timezone
 from typing import Any
 from uuid import uuid4
 
-from fastapi import APIRouter, HTTPException, Query, status
-from sqlalchemy import delete, select
+from fastapi import APIRouter, Header, HTTPException, Query, Response, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import select, tuple_, update
+from sqlalchemy.orm import selectinload
 
 from apex_predict.api.deps import AdminAuthorized, AuthedUserId, DbSession
 from apex_predict.config import get_settings
 from apex_predict.enums import (
     JobStatus,
     JoinPolicy,
+    LeaderboardScope,
     LeagueVisibility,
     MemberRole,
     ModerationState,
@@ -24,24 +27,28 @@ from apex_predict.models import (
     LeagueMember,
     ModerationReport,
     Prediction,
-    PredictionAnswer,
-    PredictionConfidenceAllocation,
     ProviderSyncLog,
-    QuestionInstance,
     ScoringRule,
     Season,
     Session,
 )
-from apex_predict.providers.router import ProviderRouter
+from apex_predict.providers.router import provider_router
 from apex_predict.schemas import (
     AIInsightOut,
     AIPreviewOut,
     EventOut,
     LeaderboardOut,
+    LeaderboardRow,
     LeagueCreateIn,
     LeagueInviteOut,
     LeagueJoinIn,
     LeagueOut,
+    PredictionAckOut,
+    PredictionAnswerOut,
+    PredictionBatchIn,
+    PredictionBatchItemIn,
+    PredictionBatchOut,
+    PredictionBatchResult,
     PredictionOut,
     PredictionQuestion,
     PredictionSubmission,
@@ -52,19 +59,38 @@ from apex_predict.schemas import (
     ScoringRunOut,
     SeasonOut,
     SessionOut,
+    TotalsRebuildOut,
 )
 from apex_predict.services.ai import get_or_create_preview, get_or_create_session_insight
+from apex_predict.services.idempotency import (
+    IdempotencyReservation,
+    StoredResponse,
+    idempotency_store,
+    request_fingerprint,
+)
 from apex_predict.services.ingestion import ingest_session_question_outcomes
-from apex_predict.services.leaderboard import build_global_leaderboard, build_league_leaderboard
+from apex_predict.services.leaderboard import (
+    LeaderboardCursor,
+    build_global_leaderboard,
+    build_league_leaderboard,
+    get_global_rank_index,
+    get_provisional_leaderboard,
+    leaderboard_version,
+    paginate_leaderboard,
+    rebuild_user_totals,
+)
 from apex_predict.services.moderation import is_name_allowed
+from apex_predict.services.prediction_buffer import prediction_buffer
+from apex_predict.services.predictions import PredictionHistoryCursor, upsert_prediction, upsert_predictions
 from apex_predict.services.scoring import (
     record_job_run,
     run_session_scoring,
 )
+from apex_predict.services.session_catalog import SessionCatalog, session_catalog
+from apex_predict.services.snapshot_history import league_standings_at
 
 router = APIRouter(prefix="/v1", tags=["v1"])
 settings = get_settings()
-provider_router = ProviderRouter()
 
 
 def now_utc() -> datetime:
@@ -81,6 +107,22 @@ def generate_code(size: int = 8) -> str:
     return uuid4().hex[:size].upper()
 
 
+def _leaderboard_rows(rows: list[dict]) -> list[LeaderboardRow]:
+    return [LeaderboardRow.model_validate(row) for row in rows]
+
+
+def _leaderboard_cursor(cursor: str | None, version: str) -> LeaderboardCursor | None:
+    if cursor is None:
+        return None
+    try:
+        after = LeaderboardCursor.decode(cursor)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="invalid_cursor") from None
+    if after.version != version:
+        raise HTTPException(status_code=409, detail="leaderboard_version_changed")
+    return after
+
+
 async def _get_or_create_current_season(db: DbSession) -> Season:
     current = await db.scalar(select(Season).where(Season.is_current.is_(True)))
     if current is not None:
@@ -178,43 +220,43 @@ async def get_sessions_for_event(event_id: str, db: DbSession) -> Any:
 
 @router.get("/sessions/{session_id}/questions", response_model=list[PredictionQuestion])
 async def get_session_questions(session_id: str, db: DbSession) -> Any:
-    session_obj = await db.get(Session, session_id)
-    if session_obj is None:
+    catalog = await session_catalog.get(db, session_id)
+    if catalog is None:
         raise HTTPException(status_code=404, detail="session_not_found")
-    questions = (
-        await db.scalars(
-            select(QuestionInstance)
-            .where(QuestionInstance.session_id == session_id)
-            .order_by(QuestionInstance.created_at.asc())
-        )
-    ).all()
-    return [PredictionQuestion.model_validate(item, from_attributes=True) for item in questions]
+    return list(catalog.questions)
 
 
-@router.post("/sessions/{session_id}/predictions", response_model=PredictionOut)
-async def submit_predictions(
+def _idempotent_replay(stored: StoredResponse, request_hash: str) -> JSONResponse:
+    if stored.request_hash != request_hash:
+        raise HTTPException(status_code=409, detail="idempotency_key_reused")
+    return JSONResponse(
+        status_code=stored.status_code,
+        content=stored.body,
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+async def _validate_prediction_submission(
+    db: DbSession,
     session_id: str,
     payload: PredictionSubmission,
-    db: DbSession,
-    user_id: AuthedUserId,
-) -> Any:
-    session_obj = await db.get(Session, session_id)
-    if session_obj is None:
+) -> SessionCatalog:
+    catalog = await session_catalog.get(db, session_id)
+    if catalog is None:
         raise HTTPException(status_code=404, detail="session_not_found")
 
-    if session_obj.state in [SessionState.LOCKED, SessionState.SCORING, SessionState.FINALIZED]:
+    if catalog.state in [SessionState.LOCKED, SessionState.SCORING, SessionState.FINALIZED]:
         raise HTTPException(status_code=409, detail="session_locked")
-    if now_utc() >= coerce_utc(session_obj.lock_at):
-        session_obj.state = SessionState.LOCKED
-        await db.flush()
+    if now_utc() >= catalog.lock_at:
+        await db.execute(
+            update(Session)
+            .where(Session.id == session_id, Session.state.in_([SessionState.SCHEDULED, SessionState.OPEN]))
+            .values(state=SessionState.LOCKED)
+        )
         await db.commit()
+        session_catalog.invalidate(session_id)
         raise HTTPException(status_code=409, detail="session_locked")
 
-    questions = (
-        await db.scalars(select(QuestionInstance).where(QuestionInstance.session_id == session_id))
-    ).all()
-    question_map = {q.id: q for q in questions}
-
     if not payload.answers:
         raise HTTPException(status_code=422, detail="prediction_answers_required")
 
@@ -227,105 +269,181 @@ async def submit_predictions(
 
     seen_questions: set[str] = set()
     for item in payload.answers:
-        question = question_map.get(item.question_instance_id)
-        if question is None:
+        options = catalog.options.get(item.question_instance_id)
+        if options is None:
             raise HTTPException(status_code=422, detail="invalid_question_instance")
-        if item.selected_option not in question.options:
+        if item.selected_option not in options:
             raise HTTPException(status_code=422, detail="invalid_selected_option")
         if item.question_instance_id in seen_questions:
             raise HTTPException(status_code=422, detail="duplicate_question_answer")
         seen_questions.add(item.question_instance_id)
+    return catalog
 
-    prediction = await db.scalar(
-        select(Prediction).where(Prediction.user_id == user_id, Prediction.session_id == session_id)
-    )
-
-    if prediction is None:
-        prediction = Prediction(user_id=user_id, session_id=session_id, client_version=payload.client_version)
-        db.add(prediction)
-        await db.flush()
-    else:
-        prediction.client_version = payload.client_version
-        await db.execute(delete(PredictionAnswer).where(PredictionAnswer.prediction_id == prediction.id))
-        await db.execute(
-            delete(PredictionConfidenceAllocation).where(
-                PredictionConfidenceAllocation.prediction_id == prediction.id
-            )
-        )
 
-    for item in payload.answers:
-        db.add(
-            PredictionAnswer(
-                prediction_id=prediction.id,
+@router.post(
+    "/sessions/{session_id}/predictions",
+    response_model=PredictionOut,
+    responses={202: {"model": PredictionAckOut}},
+)
+async def submit_predictions(
+    session_id: str,
+    payload: PredictionSubmission,
+    db: DbSession,
+    user_id: AuthedUserId,
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key", max_length=120),
+) -> Any:
+    request_hash = None
+    if idempotency_key is not None:
+        request_hash = request_fingerprint(f"predictions:{session_id}", payload.model_dump(mode="json"))
+        stored = await idempotency_store.lookup(db, user_id=user_id, key=idempotency_key)
+        if stored is not None:
+            return _idempotent_replay(stored, request_hash)
+
+    catalog = await _validate_prediction_submission(db, session_id, payload)
+
+    reservation: IdempotencyReservation | None = None
+    if idempotency_key is not None and request_hash is not None:
+        reserved = await idempotency_store.reserve(db, user_id=user_id, key=idempotency_key, request_hash=request_hash)
+        if isinstance(reserved, StoredResponse):
+            return _idempotent_replay(reserved, request_hash)
+        reservation = reserved
+
+    if prediction_buffer.is_running:
+        try:
+            sequence = await prediction_buffer.submit(
                 user_id=user_id,
-                question_instance_id=item.question_instance_id,
-                selected_option=item.selected_option,
-            )
-        )
-        db.add(
-            PredictionConfidenceAllocation(
-                prediction_id=prediction.id,
-                question_instance_id=item.question_instance_id,
-                credits=item.confidence_credits,
+                session_id=session_id,
+                lock_at=catalog.lock_at,
+                payload=payload,
             )
+        except ValueError as exc:
+            raise HTTPException(status_code=409, detail=str(exc)) from exc
+        response_status = status.HTTP_202_ACCEPTED
+        body = PredictionAckOut(session_id=session_id, sequence=sequence, accepted_at=now_utc()).model_dump(
+            mode="json"
         )
+    else:
+        prediction = await upsert_prediction(db, user_id=user_id, session_id=session_id, payload=payload)
+        response_status = status.HTTP_200_OK
+        body = prediction.model_dump(mode="json")
 
-    await db.flush()
-    await db.refresh(prediction)
+    if reservation is None:
+        await db.commit()
+        return JSONResponse(status_code=response_status, content=body)
 
-    answers = (
-        await db.scalars(select(PredictionAnswer).where(PredictionAnswer.prediction_id == prediction.id))
-    ).all()
-    allocations = (
-        await db.scalars(
-            select(PredictionConfidenceAllocation).where(
-                PredictionConfidenceAllocation.prediction_id == prediction.id
+    stored = await idempotency_store.save(db, reservation, status_code=response_status, body=body)
+    await db.commit()
+    idempotency_store.remember(user_id=reservation.user_id, key=reservation.key, stored=stored)
+    return JSONResponse(status_code=response_status, content=body)
+
+
+@router.post("/predictions:batch", response_model=PredictionBatchOut)
+async def submit_prediction_batch(
+    payload: PredictionBatchIn,
+    db: DbSession,
+    user_id: AuthedUserId,
+) -> Any:
+    results: dict[int, PredictionBatchResult] = {}
+    accepted: list[tuple[int, PredictionBatchItemIn, SessionCatalog]] = []
+    seen_sessions: set[str] = set()
+    for position, item in enumerate(payload.submissions):
+        if item.session_id in seen_sessions:
+            results[position] = PredictionBatchResult(
+                session_id=item.session_id,
+                status_code=422,
+                error="duplicate_session_submission",
+            )
+            continue
+        seen_sessions.add(item.session_id)
+        try:
+            catalog = await _validate_prediction_submission(db, item.session_id, item)
+        except HTTPException as exc:
+            results[position] = PredictionBatchResult(
+                session_id=item.session_id,
+                status_code=exc.status_code,
+                error=exc.detail,
+            )
+            continue
+        accepted.append((position, item, catalog))
+
+    if prediction_buffer.is_running:
+        for position, item, catalog in accepted:
+            try:
+                sequence = await prediction_buffer.submit(
+                    user_id=user_id,
+                    session_id=item.session_id,
+                    lock_at=catalog.lock_at,
+                    payload=item,
+                )
+            except ValueError as exc:
+                results[position] = PredictionBatchResult(
+                    session_id=item.session_id,
+                    status_code=409,
+                    error=str(exc),
+                )
+                continue
+            results[position] = PredictionBatchResult(
+                session_id=item.session_id,
+                status_code=status.HTTP_202_ACCEPTED,
+                sequence=sequence,
+            )
+    else:
+        predictions = await upsert_predictions(db, [(user_id, item.session_id, item) for _, item, _ in accepted])
+        await db.commit()
+        for (position, item, _), prediction in zip(accepted, predictions, strict=True):
+            results[position] = PredictionBatchResult(
+                session_id=item.session_id,
+                status_code=status.HTTP_200_OK,
+                prediction=prediction,
             )
-        )
-    ).all()
-    allocation_map = {a.question_instance_id: a.credits for a in allocations}
 
-    await db.commit()
-    return PredictionOut(
-        id=prediction.id,
-        user_id=prediction.user_id,
-        session_id=prediction.session_id,
-        client_version=prediction.client_version,
-        updated_at=prediction.updated_at,
-        answers=[
-            {
-                "question_instance_id": answer.question_instance_id,
-                "selected_option": answer.selected_option,
-                "confidence_credits": allocation_map.get(answer.question_instance_id, 0),
-            }
-            for answer in answers
-        ],
-    )
+    return PredictionBatchOut(results=[results[position] for position in range(len(payload.submissions))])
 
 
 @router.get("/users/me/predictions", response_model=list[PredictionOut])
-async def get_my_predictions(db: DbSession, user_id: AuthedUserId) -> Any:
-    predictions = (
-        await db.scalars(
-            select(Prediction)
-            .where(Prediction.user_id == user_id)
-            .order_by(Prediction.updated_at.desc())
+async def get_my_predictions(
+    db: DbSession,
+    user_id: AuthedUserId,
+    response: Response,
+    season_id: str | None = Query(default=None),
+    session_id: str | None = Query(default=None),
+    before: datetime | None = None,
+    cursor: str | None = Query(default=None, max_length=512),
+    limit: int = Query(default=100, ge=1, le=500),
+) -> Any:
+    query = (
+        select(Prediction)
+        .options(selectinload(Prediction.answers))
+        .where(Prediction.user_id == user_id)
+    )
+    if session_id is not None:
+        query = query.where(Prediction.session_id == session_id)
+    if season_id is not None:
+        query = (
+            query.join(Session, Session.id == Prediction.session_id)
+            .join(Event, Event.id == Session.event_id)
+            .where(Event.season_id == season_id)
         )
+    if before is not None:
+        query = query.where(Prediction.updated_at < coerce_utc(before))
+    if cursor is not None:
+        try:
+            after = PredictionHistoryCursor.decode(cursor)
+        except ValueError:
+            raise HTTPException(status_code=422, detail="invalid_cursor") from None
+        query = query.where(
+            tuple_(Prediction.updated_at, Prediction.id) < tuple_(coerce_utc(after.updated_at), after.prediction_id)
+        )
+    predictions = (
+        await db.scalars(query.order_by(Prediction.updated_at.desc(), Prediction.id.desc()).limit(limit + 1))
     ).all()
+    if len(predictions) > limit:
+        predictions = predictions[:limit]
+        last = predictions[-1]
+        response.headers["X-Next-Cursor"] = PredictionHistoryCursor(last.updated_at, last.id).encode()
 
     result: list[PredictionOut] = []
     for prediction in predictions:
-        answers = (
-            await db.scalars(select(PredictionAnswer).where(PredictionAnswer.prediction_id == prediction.id))
-        ).all()
-        allocations = (
-            await db.scalars(
-                select(PredictionConfidenceAllocation).where(
-                    PredictionConfidenceAllocation.prediction_id == prediction.id
-                )
-            )
-        ).all()
-        allocation_map = {a.question_instance_id: a.credits for a in allocations}
         result.append(
             PredictionOut(
                 id=prediction.id,
@@ -334,12 +452,12 @@ async def get_my_predictions(db: DbSession, user_id: AuthedUserId) -> Any:
                 client_version=prediction.client_version,
                 updated_at=prediction.updated_at,
                 answers=[
-                    {
-                        "question_instance_id": answer.question_instance_id,
-                        "selected_option": answer.selected_option,
-                        "confidence_credits": allocation_map.get(answer.question_instance_id, 0),
-                    }
-                    for answer in answers
+                    PredictionAnswerOut(
+                        question_instance_id=answer.question_instance_id,
+                        selected_option=answer.selected_option,
+                        confidence_credits=answer.credits,
+                    )
+                    for answer in prediction.answers
                 ],
             )
         )
@@ -348,9 +466,39 @@ async def get_my_predictions(db: DbSession, user_id: AuthedUserId) -> Any:
 
 
 @router.get("/leaderboards/global", response_model=LeaderboardOut)
-async def get_global_leaderboard(db: DbSession) -> Any:
-    rows = await build_global_leaderboard(db)
-    return LeaderboardOut(scope="GLOBAL", rows=rows)
+async def get_global_leaderboard(
+    db: DbSession,
+    season_id: str | None = Query(default=None),
+    around: str | None = Query(default=None, max_length=36),
+    radius: int = Query(default=5, ge=0, le=50),
+    limit: int = Query(default=100, ge=1, le=500),
+    cursor: str | None = Query(default=None, max_length=512),
+) -> Any:
+    if around is not None:
+        if season_id is not None:
+            raise HTTPException(status_code=422, detail="around_not_supported_for_season")
+        index = await get_global_rank_index(db)
+        return LeaderboardOut(
+            scope="GLOBAL",
+            rows=_leaderboard_rows(index.window(around, radius)),
+            version=index.version,
+        )
+
+    version = await leaderboard_version(db, scope=LeaderboardScope.GLOBAL)
+    after = _leaderboard_cursor(cursor, version)
+    rows = await build_global_leaderboard(db, season_id=season_id, limit=limit + 1, after=after)
+    page, next_cursor = paginate_leaderboard(rows, limit=limit, version=version)
+    scope = "GLOBAL" if season_id is None else f"SEASON:{season_id}"
+    return LeaderboardOut(scope=scope, rows=_leaderboard_rows(page), version=version, next_cursor=next_cursor)
+
+
+@router.get("/leaderboards/global/me", response_model=LeaderboardRow)
+async def get_my_global_rank(db: DbSession, user_id: AuthedUserId) -> Any:
+    index = await get_global_rank_index(db)
+    row = index.row_for(user_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="not_ranked")
+    return LeaderboardRow(**row)
 
 
 @router.post("/leagues", response_model=LeagueOut, status_code=status.HTTP_201_CREATED)
@@ -429,15 +577,49 @@ async def join_league(
 
 
 @router.get("/leagues/{league_id}/leaderboard", response_model=LeaderboardOut)
-async def league_leaderboard(league_id: str, db: DbSession, user_id: AuthedUserId) -> Any:
+async def league_leaderboard(
+    league_id: str,
+    db: DbSession,
+    user_id: AuthedUserId,
+    limit: int = Query(default=100, ge=1, le=500),
+    cursor: str | None = Query(default=None, max_length=512),
+) -> Any:
     member = await db.scalar(
         select(LeagueMember).where(LeagueMember.league_id == league_id, LeagueMember.user_id == user_id)
     )
     if member is None:
         raise HTTPException(status_code=403, detail="not_a_league_member")
 
-    rows = await build_league_leaderboard(db, league_id)
-    return LeaderboardOut(scope=f"LEAGUE:{league_id}", rows=rows)
+    version = await leaderboard_version(db, scope=LeaderboardScope.LEAGUE, scope_id=league_id)
+    after = _leaderboard_cursor(cursor, version)
+    rows = await build_league_leaderboard(db, league_id, limit=limit + 1, after=after)
+    page, next_cursor = paginate_leaderboard(rows, limit=limit, version=version)
+    return LeaderboardOut(
+        scope=f"LEAGUE:{league_id}",
+        rows=_leaderboard_rows(page),
+        version=version,
+        next_cursor=next_cursor,
+    )
+
+
+@router.get("/leagues/{league_id}/leaderboard/history", response_model=LeaderboardOut)
+async def league_leaderboard_history(
+    league_id: str,
+    db: DbSession,
+    user_id: AuthedUserId,
+    at: datetime | None = None,
+) -> Any:
+    member = await db.scalar(
+        select(LeagueMember).where(LeagueMember.league_id == league_id, LeagueMember.user_id == user_id)
+    )
+    if member is None:
+        raise HTTPException(status_code=403, detail="not_a_league_member")
+
+    standings = await league_standings_at(db, league_id, at=coerce_utc(at) if at is not None else None)
+    if standings is None:
+        raise HTTPException(status_code=404, detail="snapshot_not_found")
+    snapshot, rows = standings
+    return LeaderboardOut(scope=f"LEAGUE:{league_id}", rows=_leaderboard_rows(rows), version=snapshot.id)
 
 
 @router.post("/leagues/{league_id}/invites", response_model=LeagueInviteOut)
@@ -463,6 +645,18 @@ async def ai_preview(event_id: str, db: DbSession) -> Any:
     return AIPreviewOut.model_validate(preview, from_attributes=True)
 
 
+@router.get("/sessions/{session_id}/leaderboard/provisional", response_model=LeaderboardOut)
+async def provisional_session_leaderboard(session_id: str, db: DbSession) -> Any:
+    snapshot = await get_provisional_leaderboard(db, session_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="provisional_leaderboard_not_found")
+    return LeaderboardOut(
+        scope=f"PROVISIONAL:{session_id}",
+        rows=_leaderboard_rows(snapshot.rows_json),
+        version=snapshot.id,
+    )
+
+
 @router.get("/sessions/{session_id}/ai-insights", response_model=AIInsightOut)
 async def ai_insight(session_id: str, db: DbSession) -> Any:
     insight = await get_or_create_session_insight(db, session_id)
@@ -510,6 +704,22 @@ async def upsert_rule(
     return RuleOut.model_validate(rule, from_attributes=True)
 
 
+@router.post("/admin/leaderboards/rebuild-totals", response_model=TotalsRebuildOut)
+async def admin_rebuild_totals(db: DbSession, user_id: AuthedUserId, _: AdminAuthorized) -> Any:
+    # Repair path for drift in the incrementally maintained totals.
+    result = await rebuild_user_totals(db)
+    await record_job_run(
+        db,
+        idempotency_key=f"admin-rebuild-totals:{now_utc().isoformat()}",
+        job_type="admin_rebuild_totals",
+        status=JobStatus.SUCCESS,
+        payload_json={"initiated_by": user_id},
+        result_json=result,
+    )
+    await db.commit()
+    return TotalsRebuildOut(**result)
+
+
 @router.post("/admin/scoring/run", response_model=ScoringRunOut)
 async def admin_run_scoring(
     payload: ScoringRunIn,
@@ -31,6 +31,30 @@ class Settings(BaseSettings):
     openf1_base_url: str = "https://api.openf1.org/v1"
     fallback_base_url: str = "https://api.jolpi.ca/ergast/f1"
     provider_timeout_seconds: float = 5.0
+    provider_bulk_timeout_seconds: float = 15.0
+    provider_pool_max_connections: int = 20
+    provider_pool_max_keepalive: int = 10
+    provider_pool_keepalive_expiry_seconds: float = 30.0
+    provider_http2_enabled: bool = True
+    provider_breaker_failure_threshold: int = 3
+    provider_breaker_failure_window_seconds: float = 60.0
+    provider_breaker_reset_seconds: float = 30.0
+    provider_hedging_enabled: bool = False
+    provider_hedge_min_samples: int = 20
+    provider_hedge_default_delay_seconds: float = 1.0
+    provider_latency_window: int = 200
+    provider_cache_dir: str = ""
+    provider_cache_live_ttl_seconds: float = 30.0
+    provider_cache_settle_seconds: float = 3600.0
+    provider_mode: str = "live"
+    provider_replay_dir: str = "infra/provider-recordings"
+    provider_replay_latency_seconds: float = 0.0
+    provider_replay_jitter_seconds: float = 0.0
+    provider_replay_failure_rate: float = 0.0
+    provider_replay_seed: int | None = None
+    openf1_final_position_window_seconds: float = 900.0
+    openf1_pit_lap_window: int = 25
+    openf1_weather_window_seconds: float = 1800.0
 
     worker_scheduler_enabled: bool = True
     worker_startup_delay_seconds: float = 3.0
@@ -38,6 +62,26 @@ class Settings(BaseSettings):
     worker_provider_health_interval_seconds: float = 120.0
     worker_ai_previews_interval_seconds: float = 600.0
     worker_auto_finalize_interval_seconds: float = 30.0
+    worker_live_ingestion_interval_seconds: float = 15.0
+    worker_snapshot_retention_interval_seconds: float = 3600.0
+    worker_idempotency_purge_interval_seconds: float = 3600.0
+
+    league_snapshot_mode: str = "full"
+    league_snapshot_keyframe_interval: int = 10
+    league_snapshot_retention_days: float = 30.0
+
+    scoring_engine: str = "python"
+    scoring_chunk_size: int = 5000
+
+    session_catalog_ttl_seconds: float = 30.0
+    idempotency_ttl_seconds: float = 86400.0
+    idempotency_cache_size: int = 10000
+
+    prediction_write_buffer_enabled: bool = False
+    prediction_write_buffer_journal_path: str = ""
+    prediction_write_buffer_max_batch: int = 500
+    prediction_write_buffer_flush_interval_seconds: float = 0.25
+    prediction_write_buffer_stale_seconds: float = 30.0
 
     default_confidence_credits: int = 100
     admin_api_key: str = "dev-admin-key"
@@ -69,3 +69,9 @@ class JobStatus(str, Enum):
 class LeaderboardScope(str, Enum):
     GLOBAL = "GLOBAL"
     LEAGUE = "LEAGUE"
+    PROVISIONAL = "PROVISIONAL"
+
+
+class SnapshotKind(str, Enum):
+    KEYFRAME = "KEYFRAME"
+    DELTA = "DELTA"
@@ -8,13 +8,14 @@ from sqlalchemy import (
     Boolean,
     DateTime,
     Enum,
-    Float,
     ForeignKey,
+    Index,
     Integer,
     Numeric,
     String,
     Text,
     UniqueConstraint,
+    desc,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -30,6 +31,7 @@ from apex_predict.enums import (
     ReportStatus,
     SessionState,
     SessionType,
+    SnapshotKind,
 )
 
 
@@ -53,16 +55,31 @@ class User(Base):
 
 class Profile(Base):
     __tablename__ = "profiles"
+    __table_args__ = (Index("ix_profiles_leaderboard", desc("total_points"), "user_id"),)
 
     user_id: Mapped[str] = mapped_column(String(36), ForeignKey("users.id"), primary_key=True)
     username: Mapped[str] = mapped_column(String(50), unique=True)
     avatar_url: Mapped[str | None] = mapped_column(String(500), nullable=True)
-    total_points: Mapped[float] = mapped_column(Float, default=0.0)
+    total_points: Mapped[float] = mapped_column(Numeric(10, 2), default=0)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utc_now)
 
     user: Mapped[User] = relationship(back_populates="profile")
 
 
+class UserSeasonTotal(Base):
+    __tablename__ = "user_season_totals"
+    __table_args__ = (
+        UniqueConstraint("user_id", "season_id", name="uq_user_season_total"),
+        Index("ix_user_season_totals_leaderboard", "season_id", desc("total_points"), "user_id"),
+    )
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=uuid_str)
+    user_id: Mapped[str] = mapped_column(String(36), ForeignKey("users.id"), index=True)
+    season_id: Mapped[str] = mapped_column(String(36), ForeignKey("seasons.id"), index=True)
+    total_points: Mapped[float] = mapped_column(Numeric(10, 2), default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utc_now, onupdate=utc_now)
+
+
 class Season(Base):
     __tablename__ = "seasons"
 
@@ -159,7 +176,10 @@ class QuestionInstance(Base):
 
 class Prediction(Base):
     __tablename__ = "predictions"
-    __table_args__ = (UniqueConstraint("user_id", "session_id", name="uq_prediction_user_session"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "session_id", name="uq_prediction_user_session"),
+        Index("ix_predictions_user_history", "user_id", desc("updated_at"), desc("id")),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=uuid_str)
     user_id: Mapped[str] = mapped_column(String(36), ForeignKey("users.id"), index=True)
@@ -171,9 +191,6 @@ class Prediction(Base):
     answers: Mapped[list[PredictionAnswer]] = relationship(
         back_populates="prediction", cascade="all, delete-orphan"
     )
-    confidence_allocations: Mapped[list[PredictionConfidenceAllocation]] = relationship(
-        back_populates="prediction", cascade="all, delete-orphan"
-    )
 
 
 class PredictionAnswer(Base):
@@ -189,24 +206,12 @@ class PredictionAnswer(Base):
         String(36), ForeignKey("question_instances.id"), index=True
     )
     selected_option: Mapped[str] = mapped_column(String(120))
+    credits: Mapped[int] = mapped_column(Integer, default=0)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utc_now)
 
     prediction: Mapped[Prediction] = relationship(back_populates="answers")
 
 
-class PredictionConfidenceAllocation(Base):
-    __tablename__ = "prediction_confidence_allocations"
-
-    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=uuid_str)
-    prediction_id: Mapped[str] = mapped_column(String(36), ForeignKey("predictions.id"), index=True)
-    question_instance_id: Mapped[str] = mapped_column(
-        String(36), ForeignKey("question_instances.id"), index=True
-    )
-    credits: Mapped[int] = mapped_column(Integer)
-
-    prediction: Mapped[Prediction] = relationship(back_populates="confidence_allocations")
-
-
 class ScoreEntry(Base):
     __tablename__ = "score_entries"
     __table_args__ = (
@@ -236,6 +241,7 @@ class ScoreEntry(Base):
 
 class LeaderboardSnapshot(Base):
     __tablename__ = "leaderboard_snapshots"
+    __table_args__ = (Index("ix_leaderboard_snapshots_latest", "scope", "scope_id", desc("computed_at")),)
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=uuid_str)
     scope: Mapped[LeaderboardScope] = mapped_column(Enum(LeaderboardScope), index=True)
@@ -284,10 +290,16 @@ class LeagueInvite(Base):
 
 class LeagueSnapshot(Base):
     __tablename__ = "league_snapshots"
+    __table_args__ = (Index("ix_league_snapshots_history", "league_id", "computed_at"),)
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=uuid_str)
     league_id: Mapped[str] = mapped_column(String(36), ForeignKey("leagues.id"), index=True)
     computed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utc_now)
+    kind: Mapped[SnapshotKind] = mapped_column(Enum(SnapshotKind), default=SnapshotKind.KEYFRAME)
+    base_snapshot_id: Mapped[str | None] = mapped_column(
+        String(36), ForeignKey("league_snapshots.id"), nullable=True, index=True
+    )
+    sequence: Mapped[int] = mapped_column(Integer, default=0)
     rows_json: Mapped[list[dict]] = mapped_column(JSON)
 
 
@@ -355,6 +367,41 @@ class JobRun(Base):
     finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
 
+class LiveSessionState(Base):
+    __tablename__ = "live_session_states"
+
+    session_id: Mapped[str] = mapped_column(String(36), ForeignKey("sessions.id"), primary_key=True)
+    provider_name: Mapped[str | None] = mapped_column(String(40), nullable=True)
+    cursors_json: Mapped[dict] = mapped_column(JSON, default=dict)
+    rows_json: Mapped[dict] = mapped_column(JSON, default=dict)
+    facts_json: Mapped[dict] = mapped_column(JSON, default=dict)
+    provisional_json: Mapped[dict] = mapped_column(JSON, default=dict)
+    polls: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utc_now)
+
+
+class PredictionBufferWatermark(Base):
+    __tablename__ = "prediction_buffer_watermarks"
+
+    buffer_id: Mapped[str] = mapped_column(String(255), primary_key=True)
+    pending_lock_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    reported_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utc_now)
+
+
+class IdempotencyRecord(Base):
+    __tablename__ = "idempotency_records"
+    __table_args__ = (UniqueConstraint("user_id", "idempotency_key", name="uq_idempotency_user_key"),)
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=uuid_str)
+    user_id: Mapped[str] = mapped_column(String(36), ForeignKey("users.id"), index=True)
+    idempotency_key: Mapped[str] = mapped_column(String(120))
+    request_hash: Mapped[str] = mapped_column(String(64))
+    status_code: Mapped[int] = mapped_column(Integer)
+    response_json: Mapped[dict] = mapped_column(JSON, default=dict)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utc_now)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
+
+
 class ModerationReport(Base):
     __tablename__ = "moderation_reports"
 
@@ -1,3 +1,3 @@
-from apex_predict.providers.router import ProviderRouter
+from apex_predict.providers.router import ProviderRouter, provider_router
 
-__all__ = ["ProviderRouter"]
+__all__ = ["ProviderRouter", "provider_router"]
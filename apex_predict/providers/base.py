@@ -1,11 +1,62 @@
 from __future__ import annotations
 
+import asyncio
+import importlib.util
 from abc import ABC, abstractmethod
+from collections.abc import Callable
 from datetime import datetime
+from typing import Any
+
+import httpx
+
+from apex_predict.config import Settings, get_settings
+from apex_predict.providers.reducers import RowReducer
+from apex_predict.providers.response_cache import CachedResponse, ResponseCache
+from apex_predict.providers.streaming import iter_json_array
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+def build_http_transport(settings: Settings) -> httpx.AsyncHTTPTransport:
+    return httpx.AsyncHTTPTransport(
+        limits=httpx.Limits(
+            max_connections=settings.provider_pool_max_connections,
+            max_keepalive_connections=settings.provider_pool_max_keepalive,
+            keepalive_expiry=settings.provider_pool_keepalive_expiry_seconds,
+        ),
+        http2=settings.provider_http2_enabled and HTTP2_AVAILABLE,
+    )
+
+
+def build_http_client(settings: Settings, transport: httpx.AsyncBaseTransport | None = None) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=settings.provider_timeout_seconds,
+        transport=transport if transport is not None else build_http_transport(settings),
+    )
 
 
 class DataProvider(ABC):
     name: str
+    _client: httpx.AsyncClient | None = None
+    _client_loop: asyncio.AbstractEventLoop | None = None
+    # Set by ReplayProvider to record or replay traffic instead of using the network pool.
+    transport_factory: Callable[[], httpx.AsyncBaseTransport] | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # One pooled client per provider, reused across calls. Connections are bound to the
+        # event loop that opened them, so a client from a previous loop is replaced, not reused.
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            transport = self.transport_factory() if self.transport_factory is not None else None
+            self._client = build_http_client(get_settings(), transport)
+            self._client_loop = loop
+        return self._client
+
+    async def aclose(self) -> None:
+        client, self._client, self._client_loop = self._client, None, None
+        if client is not None and not client.is_closed:
+            await client.aclose()
 
     @abstractmethod
     async def health_check(self) -> bool:
@@ -20,13 +71,89 @@ class DataProvider(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    async def fetch_session_facts(self, session_external_id: str) -> dict:
+    async def fetch_session_facts(
+        self,
+        session_external_id: str,
+        *,
+        finalized: bool = False,
+        ends_at: datetime | None = None,
+    ) -> dict:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def fetch_session_updates(
+        self,
+        session_external_id: str,
+        cursors: dict[str, str],
+        *,
+        include_drivers: bool = False,
+    ) -> dict:
         raise NotImplementedError
 
     @abstractmethod
     async def fetch_weather(self, event_external_id: str) -> dict:
         raise NotImplementedError
 
+    async def _get_json(
+        self,
+        url: str,
+        params: dict,
+        *,
+        timeout: float | None = None,
+        cache: bool = False,
+        immutable: bool = False,
+        reducer: Callable[[], RowReducer] | None = None,
+    ) -> Any:
+        # With PROVIDER_CACHE_DIR set, cacheable GETs are served from disk while fresh and
+        # revalidated with If-None-Match / If-Modified-Since once stale. Immutable entries are
+        # never revalidated, so repeat reads cost no network at all. With a reducer, the body is
+        # streamed through it element by element and only the reduced rows are returned/cached.
+        settings = get_settings()
+        response_cache = ResponseCache(settings.provider_cache_dir) if cache and settings.provider_cache_dir else None
+        active_reducer = reducer() if reducer is not None else None
+        variant = active_reducer.name if active_reducer is not None else ""
+        cached: CachedResponse | None = None
+        headers: dict[str, str] = {}
+        if response_cache is not None:
+            cached = await asyncio.to_thread(response_cache.get, url, params, variant)
+            if cached is not None and cached.is_fresh:
+                return cached.body
+            if cached is not None:
+                headers = cached.validators()
+
+        async with self.client.stream(
+            "GET",
+            url,
+            params=params,
+            headers=headers,
+            timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+        ) as response:
+            revalidated = cached if response.status_code == 304 else None
+            if revalidated is not None:
+                payload = revalidated.body
+            else:
+                response.raise_for_status()
+                if active_reducer is None:
+                    await response.aread()
+                    payload = response.json()
+                else:
+                    async for row in iter_json_array(response.aiter_text()):
+                        active_reducer.feed(row)
+                    payload = active_reducer.rows()
+
+        if response_cache is not None:
+            await asyncio.to_thread(
+                response_cache.put,
+                url,
+                params,
+                payload,
+                variant=variant,
+                etag=response.headers.get("etag", revalidated.etag if revalidated else None),
+                last_modified=response.headers.get("last-modified", revalidated.last_modified if revalidated else None),
+                ttl_seconds=None if immutable else settings.provider_cache_live_ttl_seconds,
+            )
+        return payload
+
     @staticmethod
     def normalize_timestamp(raw: str | None) -> datetime | None:
         if raw is None:
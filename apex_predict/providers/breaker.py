@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from collections.abc import Callable
+from enum import Enum
+
+
+class BreakerState(str, Enum):
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
+
+
+class CircuitBreaker:
+    # Health is inferred from real calls rather than probes: failure_threshold failures inside
+    # failure_window_seconds open the breaker, and it stays open (skipped without a request) for
+    # reset_timeout_seconds. After that a single trial call is let through; its outcome closes the
+    # breaker or re-opens it for another reset period.
+    def __init__(
+        self,
+        *,
+        failure_threshold: int,
+        failure_window_seconds: float,
+        reset_timeout_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = max(failure_threshold, 1)
+        self.failure_window_seconds = failure_window_seconds
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self._clock = clock
+        self._failures: deque[float] = deque()
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+        self.last_error: str | None = None
+
+    @property
+    def state(self) -> BreakerState:
+        if self._opened_at is None:
+            return BreakerState.CLOSED
+        if self._trial_in_flight or self._clock() - self._opened_at >= self.reset_timeout_seconds:
+            return BreakerState.HALF_OPEN
+        return BreakerState.OPEN
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == BreakerState.CLOSED:
+            return True
+        if state == BreakerState.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def release_trial(self) -> None:
+        # Call ended without a verdict (e.g. cancelled); let the next caller run the trial.
+        self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        self._failures.clear()
+        self._opened_at = None
+        self._trial_in_flight = False
+        self.last_error = None
+
+    def record_failure(self, error: BaseException | None = None) -> None:
+        now = self._clock()
+        self.last_error = type(error).__name__ if error is not None else None
+        if self._opened_at is not None:
+            # Failed trial (or a straggler from before the breaker opened): restart the open period.
+            self._opened_at = now
+            self._trial_in_flight = False
+            return
+        self._failures.append(now)
+        while self._failures and now - self._failures[0] > self.failure_window_seconds:
+            self._failures.popleft()
+        if len(self._failures) >= self.failure_threshold:
+            self._opened_at = now
+            self._failures.clear()
+
+    def snapshot(self) -> dict[str, str | int | None]:
+        return {
+            "state": self.state.value,
+            "recent_failures": len(self._failures),
+            "last_error": self.last_error,
+        }
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from datetime import datetime
+
 import httpx
 
 from apex_predict.config import get_settings
@@ -14,19 +16,17 @@ class FallbackProvider(DataProvider):
 
     async def health_check(self) -> bool:
         try:
-            async with httpx.AsyncClient(timeout=self.settings.provider_timeout_seconds) as client:
-                response = await client.get(
-                    f"{self.settings.fallback_base_url}/current.json", params={"limit": 1}
-                )
-                return response.status_code == 200
+            response = await self.client.get(
+                f"{self.settings.fallback_base_url}/current.json", params={"limit": 1}
+            )
+            return response.status_code == 200
         except httpx.HTTPError:
             return False
 
     async def fetch_events(self, season_year: int) -> list[dict]:
-        async with httpx.AsyncClient(timeout=self.settings.provider_timeout_seconds) as client:
-            response = await client.get(f"{self.settings.fallback_base_url}/{season_year}.json")
-            response.raise_for_status()
-            payload = response.json()
+        response = await self.client.get(f"{self.settings.fallback_base_url}/{season_year}.json")
+        response.raise_for_status()
+        payload = response.json()
 
         races = payload.get("MRData", {}).get("RaceTable", {}).get("Races", [])
         events: list[dict] = []
@@ -50,7 +50,13 @@ class FallbackProvider(DataProvider):
         # Fallback API does not expose in-session live positions with this endpoint shape.
         return []
 
-    async def fetch_session_facts(self, session_external_id: str) -> dict:
+    async def fetch_session_facts(
+        self,
+        session_external_id: str,
+        *,
+        finalized: bool = False,
+        ends_at: datetime | None = None,
+    ) -> dict:
         return {
             "winner": None,
             "pole": None,
@@ -65,5 +71,15 @@ class FallbackProvider(DataProvider):
             "provider": self.name,
         }
 
+    async def fetch_session_updates(
+        self,
+        session_external_id: str,
+        cursors: dict[str, str],
+        *,
+        include_drivers: bool = False,
+    ) -> dict:
+        # No live timing feed behind the fallback API.
+        return {"rows": {}, "failed": []}
+
     async def fetch_weather(self, event_external_id: str) -> dict:
         return {}
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import math
+from collections import deque
+
+
+class LatencyTracker:
+    # Rolling per-endpoint latency samples for the primary provider. The hedge delay is the
+    # observed p95, so roughly one request in twenty also fires the fallback.
+    def __init__(
+        self,
+        *,
+        window: int,
+        min_samples: int,
+        default_delay_seconds: float,
+        max_delay_seconds: float,
+    ) -> None:
+        self.window = max(window, 1)
+        self.min_samples = max(min_samples, 1)
+        self.default_delay_seconds = default_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self._samples: dict[str, deque[float]] = {}
+
+    def observe(self, endpoint: str, seconds: float) -> None:
+        samples = self._samples.get(endpoint)
+        if samples is None:
+            samples = self._samples[endpoint] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def percentile(self, endpoint: str, fraction: float) -> float | None:
+        samples = self._samples.get(endpoint)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+    def hedge_delay(self, endpoint: str) -> float:
+        p95 = self.percentile(endpoint, 0.95)
+        delay = self.default_delay_seconds if p95 is None else p95
+        return min(delay, self.max_delay_seconds)
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import asyncio
+import time
 from collections import defaultdict
+from collections.abc import Awaitable, Collection
+from datetime import datetime, timedelta, timezone
 
 import httpx
 
 from apex_predict.config import get_settings
+from apex_predict.providers import reducers
 from apex_predict.providers.base import DataProvider
 
 RACE_POINTS_BY_POSITION = {
@@ -20,28 +25,211 @@ RACE_POINTS_BY_POSITION = {
     10: 1,
 }
 
+SESSION_FACT_ENDPOINTS = ("drivers", "position", "laps", "pit", "race_control")
+BULK_SESSION_ENDPOINTS = frozenset({"position", "laps"})
+# position/laps/pit only feed per-driver extremes, so they are reduced while streaming and
+# memory stays proportional to the grid rather than the number of samples.
+SESSION_ENDPOINT_REDUCERS = {
+    "position": reducers.latest_position,
+    "laps": reducers.fastest_lap,
+    "pit": reducers.earliest_pit,
+}
+# Query-string filters OpenF1 evaluates server-side, per endpoint. Filters for fields not listed
+# here are dropped and the endpoint is reduced locally instead.
+ENDPOINT_FILTER_FIELDS: dict[str, frozenset[str]] = {
+    "drivers": frozenset(),
+    "position": frozenset({"date", "position", "driver_number"}),
+    "laps": frozenset({"lap_duration", "lap_number", "is_pit_out_lap", "date_start"}),
+    "pit": frozenset({"date", "lap_number"}),
+    "race_control": frozenset({"date", "category", "lap_number"}),
+    "weather": frozenset({"date"}),
+}
+# Past this many drivers missing from the final position window, one unfiltered fetch is cheaper.
+POSITION_BACKFILL_MAX_DRIVERS = 5
+# Timestamp field used as the `field>=` cursor for incremental live polling. The bound is
+# inclusive so rows published late with the cursor's own timestamp are not skipped; the rows
+# seen again are de-duplicated when they are merged into the live state.
+LIVE_CURSOR_FIELDS = {"position": "date", "laps": "date_start", "pit": "date", "race_control": "date"}
+FACTS_BY_SESSION_ENDPOINT = {
+    "position": ("winner", "pole", "top5", "dnf_driver_codes", "constructor_points", "midfield_constructor"),
+    "laps": ("fastest_lap", "constructor_points", "midfield_constructor"),
+    "pit": ("first_pit_stop_team",),
+    "race_control": ("safety_car", "first_safety_car_lap", "dnf_driver_codes"),
+}
+
+
+def derive_session_facts(
+    payloads: dict[str, list[dict]],
+    *,
+    provider: str,
+    unavailable_facts: Collection[str] = (),
+) -> dict:
+    # Shared by the end-of-session fetch and live ingestion. position/laps/pit may already be
+    # reduced to one row per driver; the result is the same either way.
+    drivers_payload = payloads["drivers"]
+    positions_payload = payloads["position"]
+    laps_payload = payloads["laps"]
+    pit_payload = payloads["pit"]
+    race_control_payload = payloads["race_control"]
+
+    driver_map: dict[int, dict] = {}
+    for row in drivers_payload:
+        number = row.get("driver_number")
+        if number is None:
+            continue
+        code = str(row.get("name_acronym") or row.get("broadcast_name") or number).upper()[:8]
+        constructor = str(row.get("team_name") or "UNK").upper().replace(" ", "_")[:12]
+        driver_map[int(number)] = {
+            "driver_code": code,
+            "constructor_code": constructor,
+        }
+
+    latest_position: dict[int, dict] = {}
+    for row in positions_payload:
+        number = row.get("driver_number")
+        if number is None:
+            continue
+        key = int(number)
+        existing = latest_position.get(key)
+        if existing is None or str(row.get("date") or "") > str(existing.get("date") or ""):
+            latest_position[key] = row
+
+    positions: list[dict] = []
+    dnf_driver_codes: set[str] = set()
+    for number, row in latest_position.items():
+        position = row.get("position")
+        driver_details = driver_map.get(number)
+        if driver_details is None:
+            continue
+        if position is None:
+            dnf_driver_codes.add(driver_details["driver_code"])
+            continue
+        positions.append(
+            {
+                "position": int(position),
+                "driver_code": driver_details["driver_code"],
+                "constructor_code": driver_details["constructor_code"],
+            }
+        )
+    positions.sort(key=lambda item: item["position"])
+
+    fastest_lap_driver_code: str | None = None
+    fastest_lap_duration: float | None = None
+    for row in laps_payload:
+        lap_duration = row.get("lap_duration")
+        driver_number = row.get("driver_number")
+        if lap_duration is None or driver_number is None:
+            continue
+        duration = float(lap_duration)
+        if duration <= 0:
+            continue
+        if fastest_lap_duration is None or duration < fastest_lap_duration:
+            details = driver_map.get(int(driver_number))
+            if details is None:
+                continue
+            fastest_lap_duration = duration
+            fastest_lap_driver_code = details["driver_code"]
+
+    first_pit_stop_team: str | None = None
+    earliest_pit_date: str | None = None
+    for row in pit_payload:
+        pit_date = row.get("date")
+        driver_number = row.get("driver_number")
+        if pit_date is None or driver_number is None:
+            continue
+        if earliest_pit_date is None or str(pit_date) < earliest_pit_date:
+            details = driver_map.get(int(driver_number))
+            if details is None:
+                continue
+            earliest_pit_date = str(pit_date)
+            first_pit_stop_team = details["constructor_code"]
+
+    safety_car_deployed = False
+    first_safety_car_lap: int | None = None
+    for row in race_control_payload:
+        message = str(row.get("message") or "").upper()
+        category = str(row.get("category") or "").upper()
+        lap_number = row.get("lap_number")
+        driver_number = row.get("driver_number")
+
+        if "SAFETY CAR" in message and "VIRTUAL" not in message:
+            safety_car_deployed = True
+            if lap_number is not None:
+                lap_int = int(lap_number)
+                if first_safety_car_lap is None or lap_int < first_safety_car_lap:
+                    first_safety_car_lap = lap_int
+
+        retired_terms = ["RETIRED", "DNF", "STOPPED", "WITHDRAW"]
+        if any(term in message for term in retired_terms) or "RETIRE" in category:
+            if driver_number is not None:
+                details = driver_map.get(int(driver_number))
+                if details is not None:
+                    dnf_driver_codes.add(details["driver_code"])
+
+    constructor_points: dict[str, int] = defaultdict(int)
+    for row in positions:
+        pos = row["position"]
+        pts = RACE_POINTS_BY_POSITION.get(pos, 0)
+        constructor_points[row["constructor_code"]] += pts
+
+    if fastest_lap_driver_code:
+        for row in positions:
+            if row["driver_code"] == fastest_lap_driver_code and row["position"] <= 10:
+                constructor_points[row["constructor_code"]] += 1
+                break
+
+    sorted_constructors = sorted(
+        constructor_points.items(), key=lambda item: item[1], reverse=True
+    )
+    top_three = {name for name, _ in sorted_constructors[:3]}
+    midfield_constructor = None
+    for constructor, _points in sorted_constructors:
+        if constructor not in top_three:
+            midfield_constructor = constructor
+            break
+
+    winner = positions[0]["driver_code"] if positions else None
+    top5 = [row["driver_code"] for row in positions[:5]]
+
+    return {
+        "winner": winner,
+        "pole": winner,
+        "top5": top5,
+        "dnf_driver_codes": sorted(dnf_driver_codes),
+        "fastest_lap": fastest_lap_driver_code,
+        "safety_car": safety_car_deployed,
+        "first_pit_stop_team": first_pit_stop_team,
+        "first_safety_car_lap": first_safety_car_lap,
+        "constructor_points": dict(constructor_points),
+        "midfield_constructor": midfield_constructor,
+        "unavailable_facts": sorted(unavailable_facts),
+        "provider": provider,
+    }
+
 
 class OpenF1Provider(DataProvider):
     name = "openf1"
 
     def __init__(self) -> None:
         self.settings = get_settings()
+        # Meetings whose weather series had no recent samples, mapped to the monotonic time until
+        # which the recent-window query is skipped. Multi-day meetings go quiet between sessions,
+        # so the entry only lasts one weather window before the recent query is tried again.
+        self._quiet_weather_meetings: dict[str, float] = {}
 
     async def health_check(self) -> bool:
         try:
-            async with httpx.AsyncClient(timeout=self.settings.provider_timeout_seconds) as client:
-                response = await client.get(f"{self.settings.openf1_base_url}/meetings", params={"year": 2025})
-                return response.status_code == 200
+            response = await self.client.get(f"{self.settings.openf1_base_url}/meetings", params={"year": 2025})
+            return response.status_code == 200
         except httpx.HTTPError:
             return False
 
     async def fetch_events(self, season_year: int) -> list[dict]:
-        async with httpx.AsyncClient(timeout=self.settings.provider_timeout_seconds) as client:
-            response = await client.get(
-                f"{self.settings.openf1_base_url}/meetings", params={"year": season_year}
-            )
-            response.raise_for_status()
-            payload = response.json()
+        response = await self.client.get(
+            f"{self.settings.openf1_base_url}/meetings", params={"year": season_year}
+        )
+        response.raise_for_status()
+        payload = response.json()
 
         events: list[dict] = []
         for item in payload:
@@ -62,12 +250,11 @@ class OpenF1Provider(DataProvider):
         return events
 
     async def fetch_session_results(self, session_external_id: str) -> list[dict]:
-        async with httpx.AsyncClient(timeout=self.settings.provider_timeout_seconds) as client:
-            response = await client.get(
-                f"{self.settings.openf1_base_url}/position", params={"session_key": session_external_id}
-            )
-            response.raise_for_status()
-            payload = response.json()
+        response = await self.client.get(
+            f"{self.settings.openf1_base_url}/position", params={"session_key": session_external_id}
+        )
+        response.raise_for_status()
+        payload = response.json()
 
         return [
             {
@@ -78,176 +265,193 @@ class OpenF1Provider(DataProvider):
             for item in payload
         ]
 
-    async def fetch_session_facts(self, session_external_id: str) -> dict:
-        async with httpx.AsyncClient(timeout=self.settings.provider_timeout_seconds) as client:
-            drivers_response = await client.get(
-                f"{self.settings.openf1_base_url}/drivers", params={"session_key": session_external_id}
-            )
-            positions_response = await client.get(
-                f"{self.settings.openf1_base_url}/position", params={"session_key": session_external_id}
-            )
-            laps_response = await client.get(
-                f"{self.settings.openf1_base_url}/laps", params={"session_key": session_external_id}
-            )
-            pit_response = await client.get(
-                f"{self.settings.openf1_base_url}/pit", params={"session_key": session_external_id}
-            )
-            race_control_response = await client.get(
-                f"{self.settings.openf1_base_url}/race_control", params={"session_key": session_external_id}
-            )
-
-        drivers_response.raise_for_status()
-        positions_response.raise_for_status()
-        laps_response.raise_for_status()
-        pit_response.raise_for_status()
-        race_control_response.raise_for_status()
-
-        drivers_payload = drivers_response.json()
-        positions_payload = positions_response.json()
-        laps_payload = laps_response.json()
-        pit_payload = pit_response.json()
-        race_control_payload = race_control_response.json()
-
-        driver_map: dict[int, dict] = {}
-        for row in drivers_payload:
-            number = row.get("driver_number")
-            if number is None:
+    @staticmethod
+    def pushdown_filters(endpoint: str, filters: dict[str, object]) -> dict[str, str]:
+        # Filter keys carry their operator, OpenF1-style: "date>=", "lap_number<=", "is_pit_out_lap".
+        supported = ENDPOINT_FILTER_FIELDS.get(endpoint, frozenset())
+        params: dict[str, str] = {}
+        for key, value in filters.items():
+            if key.rstrip("<>=") not in supported:
                 continue
-            code = str(row.get("name_acronym") or row.get("broadcast_name") or number).upper()[:8]
-            constructor = str(row.get("team_name") or "UNK").upper().replace(" ", "_")[:12]
-            driver_map[int(number)] = {
-                "driver_code": code,
-                "constructor_code": constructor,
-            }
+            if isinstance(value, datetime):
+                value = value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+            elif isinstance(value, bool):
+                value = "true" if value else "false"
+            params[key] = str(value)
+        return params
 
-        latest_position: dict[int, dict] = {}
-        for row in positions_payload:
-            number = row.get("driver_number")
-            if number is None:
-                continue
-            key = int(number)
-            existing = latest_position.get(key)
-            if existing is None or str(row.get("date") or "") > str(existing.get("date") or ""):
-                latest_position[key] = row
-
-        positions: list[dict] = []
-        dnf_driver_codes: set[str] = set()
-        for number, row in latest_position.items():
-            position = row.get("position")
-            driver_details = driver_map.get(number)
-            if driver_details is None:
-                continue
-            if position is None:
-                dnf_driver_codes.add(driver_details["driver_code"])
-                continue
-            positions.append(
-                {
-                    "position": int(position),
-                    "driver_code": driver_details["driver_code"],
-                    "constructor_code": driver_details["constructor_code"],
-                }
+    def _session_filters(self, ends_at: datetime | None, *, finalized: bool) -> dict[str, dict[str, object]]:
+        filters: dict[str, dict[str, object]] = {
+            # Out-laps are never the fastest lap.
+            "laps": {"lap_duration>": 0, "is_pit_out_lap": False},
+            # Pit dates grow with the lap number, so any stop in the window precedes all later ones.
+            "pit": {"lap_number<=": self.settings.openf1_pit_lap_window},
+        }
+        # Settled sessions lead with the full reduced fetch: it is cached as immutable, while
+        # /position only emits on change, so the final window would usually miss drivers anyway.
+        if ends_at is not None and not finalized:
+            window = timedelta(seconds=self.settings.openf1_final_position_window_seconds)
+            filters["position"] = {"date>=": ends_at - window}
+        return filters
+
+    async def _fetch_session_endpoint(
+        self,
+        endpoint: str,
+        session_external_id: str,
+        *,
+        finalized: bool,
+        filters: dict[str, object] | None = None,
+        incremental: bool = False,
+    ) -> list[dict]:
+        timeout = (
+            self.settings.provider_bulk_timeout_seconds
+            if endpoint in BULK_SESSION_ENDPOINTS
+            else self.settings.provider_timeout_seconds
+        )
+        return await asyncio.wait_for(
+            self._get_json(
+                f"{self.settings.openf1_base_url}/{endpoint}",
+                {"session_key": session_external_id, **self.pushdown_filters(endpoint, filters or {})},
+                timeout=timeout,
+                # Incremental polls carry a moving cursor, so caching them would only litter the
+                # cache, and reducing them would drop rows the caller needs to advance its cursor.
+                cache=not incremental,
+                immutable=finalized,
+                reducer=None if incremental else SESSION_ENDPOINT_REDUCERS.get(endpoint),
+            ),
+            timeout,
+        )
+
+    async def _backfill_positions(
+        self,
+        session_external_id: str,
+        window_rows: list[dict],
+        missing: set[int],
+        *,
+        finalized: bool,
+    ) -> list[dict]:
+        if len(missing) > POSITION_BACKFILL_MAX_DRIVERS:
+            return await self._fetch_session_endpoint("position", session_external_id, finalized=finalized)
+        backfilled = await asyncio.gather(
+            *(
+                self._fetch_session_endpoint(
+                    "position", session_external_id, finalized=finalized, filters={"driver_number": number}
+                )
+                for number in sorted(missing)
             )
-        positions.sort(key=lambda item: item["position"])
-
-        fastest_lap_driver_code: str | None = None
-        fastest_lap_duration: float | None = None
-        for row in laps_payload:
-            lap_duration = row.get("lap_duration")
-            driver_number = row.get("driver_number")
-            if lap_duration is None or driver_number is None:
-                continue
-            duration = float(lap_duration)
-            if duration <= 0:
-                continue
-            if fastest_lap_duration is None or duration < fastest_lap_duration:
-                details = driver_map.get(int(driver_number))
-                if details is None:
-                    continue
-                fastest_lap_duration = duration
-                fastest_lap_driver_code = details["driver_code"]
-
-        first_pit_stop_team: str | None = None
-        earliest_pit_date: str | None = None
-        for row in pit_payload:
-            pit_date = row.get("date")
-            driver_number = row.get("driver_number")
-            if pit_date is None or driver_number is None:
+        )
+        return [*window_rows, *(row for rows in backfilled for row in rows)]
+
+    async def fetch_session_updates(
+        self,
+        session_external_id: str,
+        cursors: dict[str, str],
+        *,
+        include_drivers: bool = False,
+    ) -> dict:
+        # Only rows at or after each endpoint's cursor are requested. Endpoints that fail
+        # are listed so the caller keeps their cursor and retries them on the next poll.
+        endpoints = (["drivers"] if include_drivers else []) + list(LIVE_CURSOR_FIELDS)
+        results = await asyncio.gather(
+            *(
+                self._fetch_session_endpoint(
+                    endpoint,
+                    session_external_id,
+                    finalized=False,
+                    filters=(
+                        {f"{LIVE_CURSOR_FIELDS[endpoint]}>=": cursors[endpoint]}
+                        if endpoint in LIVE_CURSOR_FIELDS and cursors.get(endpoint)
+                        else None
+                    ),
+                    incremental=True,
+                )
+                for endpoint in endpoints
+            ),
+            return_exceptions=True,
+        )
+        rows: dict[str, list[dict]] = {}
+        failed: list[str] = []
+        for endpoint, result in zip(endpoints, results, strict=True):
+            if isinstance(result, BaseException):
+                if not isinstance(result, Exception):
+                    raise result
+                failed.append(endpoint)
                 continue
-            if earliest_pit_date is None or str(pit_date) < earliest_pit_date:
-                details = driver_map.get(int(driver_number))
-                if details is None:
-                    continue
-                earliest_pit_date = str(pit_date)
-                first_pit_stop_team = details["constructor_code"]
-
-        safety_car_deployed = False
-        first_safety_car_lap: int | None = None
-        for row in race_control_payload:
-            message = str(row.get("message") or "").upper()
-            category = str(row.get("category") or "").upper()
-            lap_number = row.get("lap_number")
-            driver_number = row.get("driver_number")
-
-            if "SAFETY CAR" in message and "VIRTUAL" not in message:
-                safety_car_deployed = True
-                if lap_number is not None:
-                    lap_int = int(lap_number)
-                    if first_safety_car_lap is None or lap_int < first_safety_car_lap:
-                        first_safety_car_lap = lap_int
-
-            retired_terms = ["RETIRED", "DNF", "STOPPED", "WITHDRAW"]
-            if any(term in message for term in retired_terms) or "RETIRE" in category:
-                if driver_number is not None:
-                    details = driver_map.get(int(driver_number))
-                    if details is not None:
-                        dnf_driver_codes.add(details["driver_code"])
-
-        constructor_points: dict[str, int] = defaultdict(int)
-        for row in positions:
-            pos = row["position"]
-            pts = RACE_POINTS_BY_POSITION.get(pos, 0)
-            constructor_points[row["constructor_code"]] += pts
-
-        if fastest_lap_driver_code:
-            for row in positions:
-                if row["driver_code"] == fastest_lap_driver_code and row["position"] <= 10:
-                    constructor_points[row["constructor_code"]] += 1
-                    break
-
-        sorted_constructors = sorted(
-            constructor_points.items(), key=lambda item: item[1], reverse=True
+            rows[endpoint] = result
+        if not rows:
+            raise next(result for result in results if isinstance(result, BaseException))
+        return {"rows": rows, "failed": failed}
+
+    async def fetch_session_facts(
+        self,
+        session_external_id: str,
+        *,
+        finalized: bool = False,
+        ends_at: datetime | None = None,
+    ) -> dict:
+        # All endpoints are fetched concurrently. Drivers are required to map anything; any other
+        # endpoint may fail, in which case the facts it feeds are reported in unavailable_facts
+        # rather than silently defaulting (e.g. "no safety car" when race_control timed out).
+        filters = self._session_filters(ends_at, finalized=finalized)
+        results = await asyncio.gather(
+            *(
+                self._fetch_session_endpoint(
+                    endpoint, session_external_id, finalized=finalized, filters=filters.get(endpoint)
+                )
+                for endpoint in SESSION_FACT_ENDPOINTS
+            ),
+            return_exceptions=True,
         )
-        top_three = {name for name, _ in sorted_constructors[:3]}
-        midfield_constructor = None
-        for constructor, _points in sorted_constructors:
-            if constructor not in top_three:
-                midfield_constructor = constructor
-                break
+        raw: dict[str, list[dict] | BaseException] = dict(zip(SESSION_FACT_ENDPOINTS, results, strict=True))
+        if isinstance(raw["drivers"], BaseException):
+            raise raw["drivers"]
 
-        winner = positions[0]["driver_code"] if positions else None
-        top5 = [row["driver_code"] for row in positions[:5]]
+        # Narrowed queries that cannot prove they saw the answer are repeated: drivers with no
+        # position change in the final window, or no pit stop in the early-lap window.
+        driver_numbers = {int(row["driver_number"]) for row in raw["drivers"] if row.get("driver_number") is not None}
+        retry: dict[str, Awaitable[list[dict]]] = {}
+        if "position" in filters and isinstance(raw["position"], list):
+            missing = driver_numbers - {row.get("driver_number") for row in raw["position"]}
+            if missing:
+                retry["position"] = self._backfill_positions(
+                    session_external_id, raw["position"], missing, finalized=finalized
+                )
+        if isinstance(raw["pit"], list) and not raw["pit"]:
+            retry["pit"] = self._fetch_session_endpoint("pit", session_external_id, finalized=finalized)
+        if retry:
+            retried = await asyncio.gather(*retry.values(), return_exceptions=True)
+            raw.update(zip(retry, retried, strict=True))
 
-        return {
-            "winner": winner,
-            "pole": winner,
-            "top5": top5,
-            "dnf_driver_codes": sorted(dnf_driver_codes),
-            "fastest_lap": fastest_lap_driver_code,
-            "safety_car": safety_car_deployed,
-            "first_pit_stop_team": first_pit_stop_team,
-            "first_safety_car_lap": first_safety_car_lap,
-            "constructor_points": dict(constructor_points),
-            "midfield_constructor": midfield_constructor,
-            "provider": self.name,
-        }
+        payloads: dict[str, list[dict]] = {}
+        unavailable_facts: set[str] = set()
+        for endpoint, result in raw.items():
+            if isinstance(result, BaseException):
+                if not isinstance(result, Exception):
+                    raise result
+                unavailable_facts.update(FACTS_BY_SESSION_ENDPOINT[endpoint])
+                result = []
+            payloads[endpoint] = result
+
+        return derive_session_facts(payloads, provider=self.name, unavailable_facts=unavailable_facts)
 
     async def fetch_weather(self, event_external_id: str) -> dict:
-        async with httpx.AsyncClient(timeout=self.settings.provider_timeout_seconds) as client:
-            response = await client.get(
-                f"{self.settings.openf1_base_url}/weather", params={"meeting_key": event_external_id}
+        # Ask for the recent window first; meetings that are not live fall back to the full series,
+        # and are remembered for a window so later calls go straight to it.
+        url = f"{self.settings.openf1_base_url}/weather"
+        window = self.settings.openf1_weather_window_seconds
+        payload: list[dict] = []
+        if self._quiet_weather_meetings.get(event_external_id, 0.0) <= time.monotonic():
+            self._quiet_weather_meetings.pop(event_external_id, None)
+            recent = datetime.now(tz=timezone.utc) - timedelta(seconds=window)
+            payload = await self._get_json(
+                url,
+                {"meeting_key": event_external_id, **self.pushdown_filters("weather", {"date>=": recent})},
+                reducer=reducers.latest_sample,
             )
-            response.raise_for_status()
-            payload = response.json()
+        if not payload:
+            payload = await self._get_json(url, {"meeting_key": event_external_id}, reducer=reducers.latest_sample)
+            if payload:
+                self._quiet_weather_meetings[event_external_id] = time.monotonic() + window
 
         if not payload:
             return {}
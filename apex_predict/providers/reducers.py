@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from typing import Any, Protocol
+
+
+class RowReducer(Protocol):
+    name: str
+
+    def feed(self, row: dict) -> None: ...
+
+    def rows(self) -> list[dict]: ...
+
+
+class PerDriverReducer:
+    # Folds a stream of per-driver rows down to one row per driver_number, keeping the row with
+    # the lowest (keep="min") or highest (keep="max") key. Rows whose key is None are ignored.
+    # The output has the same shape as the input rows, so it can stand in for the full payload.
+    def __init__(self, name: str, key: Callable[[dict], Any], *, keep: str) -> None:
+        if keep not in {"min", "max"}:
+            raise ValueError("keep must be 'min' or 'max'")
+        self.name = name
+        self.key = key
+        self.keep = keep
+        self._best: dict[int, tuple[Any, dict]] = {}
+
+    def feed(self, row: dict) -> None:
+        number = row.get("driver_number")
+        if number is None:
+            return
+        value = self.key(row)
+        if value is None:
+            return
+        driver = int(number)
+        current = self._best.get(driver)
+        if current is None or (value < current[0] if self.keep == "min" else value > current[0]):
+            self._best[driver] = (value, row)
+
+    def rows(self) -> list[dict]:
+        return [row for _, row in self._best.values()]
+
+
+class LatestRowReducer:
+    # Keeps only the row with the highest key (the last one on ties), e.g. the newest sample.
+    def __init__(self, name: str, key: Callable[[dict], Any]) -> None:
+        self.name = name
+        self.key = key
+        self._best: tuple[Any, dict] | None = None
+
+    def feed(self, row: dict) -> None:
+        value = self.key(row)
+        if self._best is None or value >= self._best[0]:
+            self._best = (value, row)
+
+    def rows(self) -> list[dict]:
+        return [] if self._best is None else [self._best[1]]
+
+
+def _positive_lap_duration(row: dict) -> float | None:
+    duration = row.get("lap_duration")
+    if duration is None or float(duration) <= 0:
+        return None
+    return float(duration)
+
+
+def latest_position() -> PerDriverReducer:
+    return PerDriverReducer("latest_position", lambda row: str(row.get("date") or ""), keep="max")
+
+
+def fastest_lap() -> PerDriverReducer:
+    return PerDriverReducer("fastest_lap", _positive_lap_duration, keep="min")
+
+
+def earliest_pit() -> PerDriverReducer:
+    return PerDriverReducer(
+        "earliest_pit",
+        lambda row: None if row.get("date") is None else str(row.get("date")),
+        keep="min",
+    )
+
+
+def latest_sample() -> LatestRowReducer:
+    return LatestRowReducer("latest_sample", lambda row: str(row.get("date") or ""))
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import os
+import random
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+from apex_predict.config import Settings, get_settings
+from apex_predict.providers import base
+from apex_predict.providers.base import DataProvider
+from apex_predict.providers.response_cache import cache_key
+
+PROVIDER_MODES = ("live", "record", "replay")
+# Query params derived from the wall clock; leaving them out of the key keeps recordings replayable.
+VOLATILE_PARAMS: dict[str, frozenset[str]] = {"/weather": frozenset({"date>=", "date>"})}
+RECORDED_HEADERS = ("content-type", "etag", "last-modified")
+
+
+@dataclass(frozen=True)
+class RecordedResponse:
+    status_code: int
+    headers: dict[str, str]
+    body: str
+
+
+class ReplayArchive:
+    # One gzipped JSON file per distinct request (method, URL without query, query params).
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+
+    @staticmethod
+    def request_key(request: httpx.Request) -> str:
+        path = request.url.path
+        volatile = next((names for suffix, names in VOLATILE_PARAMS.items() if path.endswith(suffix)), frozenset())
+        params = {key: value for key, value in request.url.params.multi_items() if key not in volatile}
+        return cache_key(f"{request.method} {request.url.copy_with(query=None)}", params)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json.gz"
+
+    def load(self, request: httpx.Request) -> RecordedResponse | None:
+        try:
+            with gzip.open(self._path(self.request_key(request)), "rt", encoding="utf-8") as handle:
+                stored = json.load(handle)
+        except (OSError, EOFError, ValueError):
+            return None
+        return RecordedResponse(status_code=stored["status_code"], headers=stored["headers"], body=stored["body"])
+
+    def save(self, request: httpx.Request, recorded: RecordedResponse) -> None:
+        path = self._path(self.request_key(request))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "method": request.method,
+            "url": str(request.url),
+            "status_code": recorded.status_code,
+            "headers": recorded.headers,
+            "body": recorded.body,
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as handle:
+                json.dump(payload, handle, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, inner: httpx.AsyncBaseTransport, archive: ReplayArchive) -> None:
+        self.inner = inner
+        self.archive = archive
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await self.inner.handle_async_request(request)
+        try:
+            # Read through a client-side Response so content-encoding is undone before storing.
+            decoded = httpx.Response(response.status_code, headers=response.headers, stream=response.stream)
+            body = (await decoded.aread()).decode(decoded.encoding or "utf-8")
+        finally:
+            await response.aclose()
+        recorded = RecordedResponse(
+            status_code=response.status_code,
+            headers={name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers},
+            body=body,
+        )
+        if 200 <= recorded.status_code < 300:
+            await asyncio.to_thread(self.archive.save, request, recorded)
+        return httpx.Response(recorded.status_code, headers=recorded.headers, text=recorded.body, request=request)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    # Serves recorded responses with injected latency (+/- uniform jitter) and a failure rate.
+    # Requests that were never recorded fail like an unreachable host.
+    def __init__(
+        self,
+        archive: ReplayArchive,
+        *,
+        latency_seconds: float = 0.0,
+        jitter_seconds: float = 0.0,
+        failure_rate: float = 0.0,
+        rng: random.Random | None = None,
+    ) -> None:
+        self.archive = archive
+        self.latency_seconds = latency_seconds
+        self.jitter_seconds = jitter_seconds
+        self.failure_rate = failure_rate
+        self.rng = rng or random.Random()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        delay = self.latency_seconds + self.rng.uniform(-self.jitter_seconds, self.jitter_seconds)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.failure_rate > 0 and self.rng.random() < self.failure_rate:
+            raise httpx.ConnectError("replay: injected failure", request=request)
+        recorded = await asyncio.to_thread(self.archive.load, request)
+        if recorded is None:
+            raise httpx.ConnectError(f"replay: no recording for {request.method} {request.url}", request=request)
+        return httpx.Response(recorded.status_code, headers=recorded.headers, text=recorded.body, request=request)
+
+
+class ReplayProvider(DataProvider):
+    # Wraps a real adapter so its parsing, streaming and caching run unchanged while its HTTP
+    # traffic is either captured into the archive (record) or served from it (replay).
+    def __init__(
+        self,
+        inner: DataProvider,
+        *,
+        archive: ReplayArchive,
+        mode: str = "replay",
+        latency_seconds: float = 0.0,
+        jitter_seconds: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: int | None = None,
+    ) -> None:
+        if mode not in {"record", "replay"}:
+            raise ValueError(f"unsupported replay mode: {mode}")
+        self.inner = inner
+        self.name = inner.name
+        self.mode = mode
+        self.archive = archive
+        rng = random.Random(seed)
+        if mode == "record":
+            inner.transport_factory = lambda: RecordingTransport(base.build_http_transport(get_settings()), archive)
+        else:
+            inner.transport_factory = lambda: ReplayTransport(
+                archive,
+                latency_seconds=latency_seconds,
+                jitter_seconds=jitter_seconds,
+                failure_rate=failure_rate,
+                rng=rng,
+            )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self.inner.client
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+    async def health_check(self) -> bool:
+        return await self.inner.health_check()
+
+    async def fetch_events(self, season_year: int) -> list[dict]:
+        return await self.inner.fetch_events(season_year)
+
+    async def fetch_session_results(self, session_external_id: str) -> list[dict]:
+        return await self.inner.fetch_session_results(session_external_id)
+
+    async def fetch_session_facts(
+        self,
+        session_external_id: str,
+        *,
+        finalized: bool = False,
+        ends_at: datetime | None = None,
+    ) -> dict:
+        return await self.inner.fetch_session_facts(session_external_id, finalized=finalized, ends_at=ends_at)
+
+    async def fetch_session_updates(
+        self,
+        session_external_id: str,
+        cursors: dict[str, str],
+        *,
+        include_drivers: bool = False,
+    ) -> dict:
+        return await self.inner.fetch_session_updates(session_external_id, cursors, include_drivers=include_drivers)
+
+    async def fetch_weather(self, event_external_id: str) -> dict:
+        return await self.inner.fetch_weather(event_external_id)
+
+
+def wrap_provider(provider: DataProvider, settings: Settings) -> DataProvider:
+    if settings.provider_mode == "live":
+        return provider
+    if settings.provider_mode not in PROVIDER_MODES:
+        raise ValueError(f"unsupported provider mode: {settings.provider_mode}")
+    return ReplayProvider(
+        provider,
+        archive=ReplayArchive(settings.provider_replay_dir),
+        mode=settings.provider_mode,
+        latency_seconds=settings.provider_replay_latency_seconds,
+        jitter_seconds=settings.provider_replay_jitter_seconds,
+        failure_rate=settings.provider_replay_failure_rate,
+        seed=settings.provider_replay_seed,
+    )
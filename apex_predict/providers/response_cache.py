@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: object
+    etag: str | None
+    last_modified: str | None
+    expires_at: float | None
+
+    @property
+    def is_fresh(self) -> bool:
+        return self.expires_at is None or time.time() < self.expires_at
+
+    def validators(self) -> dict[str, str]:
+        headers: dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def cache_key(url: str, params: dict, variant: str = "") -> str:
+    canonical = json.dumps(
+        {"url": url, "params": params, "variant": variant},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    # Gzipped JSON bodies on local disk, one file per request (sha256 of url + params, plus the
+    # reducer name when only a reduced form of the body is kept). Entries written with
+    # ttl_seconds=None never expire; others are revalidated with their ETag / Last-Modified
+    # once stale.
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json.gz"
+
+    def get(self, url: str, params: dict, variant: str = "") -> CachedResponse | None:
+        path = self._path(cache_key(url, params, variant))
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as handle:
+                stored = json.load(handle)
+        except (OSError, EOFError, ValueError):
+            return None
+        return CachedResponse(
+            body=stored["body"],
+            etag=stored.get("etag"),
+            last_modified=stored.get("last_modified"),
+            expires_at=stored.get("expires_at"),
+        )
+
+    def put(
+        self,
+        url: str,
+        params: dict,
+        body: object,
+        *,
+        variant: str = "",
+        etag: str | None,
+        last_modified: str | None,
+        ttl_seconds: float | None,
+    ) -> CachedResponse:
+        entry = CachedResponse(
+            body=body,
+            etag=etag,
+            last_modified=last_modified,
+            expires_at=None if ttl_seconds is None else time.time() + ttl_seconds,
+        )
+        path = self._path(cache_key(url, params, variant))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "url": url,
+            "params": params,
+            "variant": variant,
+            "etag": entry.etag,
+            "last_modified": entry.last_modified,
+            "expires_at": entry.expires_at,
+            "body": body,
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as handle:
+                json.dump(payload, handle, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        return entry
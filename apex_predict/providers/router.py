@@ -1,44 +1,181 @@
 from __future__ import annotations
 
+import asyncio
+import time
+from collections.abc import Awaitable, Callable, Coroutine
+from datetime import datetime
+from typing import Any, TypeVar
+
+from apex_predict.config import get_settings
 from apex_predict.providers.base import DataProvider
+from apex_predict.providers.breaker import BreakerState, CircuitBreaker
 from apex_predict.providers.fallback import FallbackProvider
+from apex_predict.providers.latency import LatencyTracker
 from apex_predict.providers.openf1 import OpenF1Provider
+from apex_predict.providers.replay import wrap_provider
+
+T = TypeVar("T")
+# A coroutine function, not just any awaitable: hedged calls wrap it in a task.
+ProviderFetch = Callable[[DataProvider], Coroutine[Any, Any, T]]
+
+
+def _build_breaker() -> CircuitBreaker:
+    settings = get_settings()
+    return CircuitBreaker(
+        failure_threshold=settings.provider_breaker_failure_threshold,
+        failure_window_seconds=settings.provider_breaker_failure_window_seconds,
+        reset_timeout_seconds=settings.provider_breaker_reset_seconds,
+    )
+
+
+def _has_answer(task: asyncio.Task) -> bool:
+    return task.done() and not task.cancelled() and task.exception() is None and bool(task.result())
 
 
 class ProviderRouter:
     def __init__(self) -> None:
-        self.primary = OpenF1Provider()
-        self.fallback = FallbackProvider()
+        settings = get_settings()
+        self.primary = wrap_provider(OpenF1Provider(), settings)
+        self.fallback = wrap_provider(FallbackProvider(), settings)
+        self.breakers = {self.primary.name: _build_breaker(), self.fallback.name: _build_breaker()}
+        self.hedging_enabled = settings.provider_hedging_enabled
+        self.latency = LatencyTracker(
+            window=settings.provider_latency_window,
+            min_samples=settings.provider_hedge_min_samples,
+            default_delay_seconds=settings.provider_hedge_default_delay_seconds,
+            max_delay_seconds=settings.provider_timeout_seconds,
+        )
+
+    def open(self) -> None:
+        for provider in (self.primary, self.fallback):
+            _ = provider.client
+
+    async def aclose(self) -> None:
+        await self.primary.aclose()
+        await self.fallback.aclose()
+
+    def breaker_states(self) -> dict[str, dict[str, str | int | None]]:
+        return {name: breaker.snapshot() for name, breaker in self.breakers.items()}
 
     async def active_provider(self) -> DataProvider:
-        if await self.primary.health_check():
-            return self.primary
-        return self.fallback
+        # No probe request: the primary is active unless its breaker is open.
+        if self.breakers[self.primary.name].state == BreakerState.OPEN:
+            return self.fallback
+        return self.primary
 
-    async def fetch_events(self, season_year: int) -> tuple[str, list[dict]]:
-        provider = await self.active_provider()
+    async def _fetch_primary(self, endpoint: str, fetch: ProviderFetch[T]) -> T:
+        started = time.monotonic()
         try:
-            return provider.name, await provider.fetch_events(season_year)
-        except Exception:
-            return self.fallback.name, await self.fallback.fetch_events(season_year)
+            result = await fetch(self.primary)
+        except asyncio.CancelledError:
+            # A hedge loser still took at least this long; dropping it would bias p95 downwards.
+            self.latency.observe(endpoint, time.monotonic() - started)
+            raise
+        self.latency.observe(endpoint, time.monotonic() - started)
+        return result
 
-    async def fetch_session_results(self, session_external_id: str) -> tuple[str, list[dict]]:
-        provider = await self.active_provider()
+    async def _call_fallback(
+        self,
+        fetch: ProviderFetch[T],
+        pending: Awaitable[T] | None = None,
+    ) -> tuple[str, T]:
+        # The fallback is the last resort, so it is always called; its breaker only reports health.
+        fallback_breaker = self.breakers[self.fallback.name]
         try:
-            return provider.name, await provider.fetch_session_results(session_external_id)
-        except Exception:
-            return self.fallback.name, await self.fallback.fetch_session_results(session_external_id)
+            result = await (pending if pending is not None else fetch(self.fallback))
+        except Exception as exc:
+            fallback_breaker.record_failure(exc)
+            raise
+        fallback_breaker.record_success()
+        return self.fallback.name, result
+
+    async def _call(self, endpoint: str, fetch: ProviderFetch[T]) -> tuple[str, T]:
+        breaker = self.breakers[self.primary.name]
+        if breaker.allow_request():
+            try:
+                result = await self._fetch_primary(endpoint, fetch)
+            except Exception as exc:
+                breaker.record_failure(exc)
+            except BaseException:
+                breaker.release_trial()
+                raise
+            else:
+                breaker.record_success()
+                return self.primary.name, result
+        return await self._call_fallback(fetch)
 
-    async def fetch_session_facts(self, session_external_id: str) -> tuple[str, dict]:
-        provider = await self.active_provider()
+    async def _hedged_call(self, endpoint: str, fetch: ProviderFetch[T]) -> tuple[str, T]:
+        # If the primary has not answered within its p95 latency, race the fallback against it. A
+        # fallback answer only wins if it is non-empty; otherwise the primary still decides.
+        if not self.hedging_enabled:
+            return await self._call(endpoint, fetch)
+        breaker = self.breakers[self.primary.name]
+        if not breaker.allow_request():
+            return await self._call_fallback(fetch)
+
+        primary_task = asyncio.create_task(self._fetch_primary(endpoint, fetch))
+        fallback_task: asyncio.Task[T] | None = None
         try:
-            return provider.name, await provider.fetch_session_facts(session_external_id)
-        except Exception:
-            return self.fallback.name, await self.fallback.fetch_session_facts(session_external_id)
+            done, _ = await asyncio.wait({primary_task}, timeout=self.latency.hedge_delay(endpoint))
+            if not done:
+                fallback_task = asyncio.create_task(fetch(self.fallback))
+                done, _ = await asyncio.wait({primary_task, fallback_task}, return_when=asyncio.FIRST_COMPLETED)
+                if primary_task not in done and _has_answer(fallback_task):
+                    return await self._call_fallback(fetch, fallback_task)
+
+            try:
+                result = await primary_task
+            except Exception as exc:
+                breaker.record_failure(exc)
+            else:
+                breaker.record_success()
+                return self.primary.name, result
+            return await self._call_fallback(fetch, fallback_task)
+        finally:
+            if not primary_task.done():
+                primary_task.cancel()
+                breaker.release_trial()
+            if fallback_task is not None:
+                if not fallback_task.done():
+                    fallback_task.cancel()
+                elif not fallback_task.cancelled():
+                    fallback_task.exception()
+
+    async def fetch_events(self, season_year: int) -> tuple[str, list[dict]]:
+        return await self._hedged_call("events", lambda provider: provider.fetch_events(season_year))
+
+    async def fetch_session_results(self, session_external_id: str) -> tuple[str, list[dict]]:
+        return await self._call("session_results", lambda provider: provider.fetch_session_results(session_external_id))
+
+    async def fetch_session_facts(
+        self,
+        session_external_id: str,
+        *,
+        finalized: bool = False,
+        ends_at: datetime | None = None,
+    ) -> tuple[str, dict]:
+        return await self._call(
+            "session_facts",
+            lambda provider: provider.fetch_session_facts(session_external_id, finalized=finalized, ends_at=ends_at),
+        )
+
+    async def fetch_session_updates(
+        self,
+        session_external_id: str,
+        cursors: dict[str, str],
+        *,
+        include_drivers: bool = False,
+    ) -> tuple[str, dict]:
+        return await self._call(
+            "session_updates",
+            lambda provider: provider.fetch_session_updates(
+                session_external_id, cursors, include_drivers=include_drivers
+            ),
+        )
 
     async def fetch_weather(self, event_external_id: str) -> tuple[str, dict]:
-        provider = await self.active_provider()
-        try:
-            return provider.name, await provider.fetch_weather(event_external_id)
-        except Exception:
-            return self.fallback.name, await self.fallback.fetch_weather(event_external_id)
+        return await self._hedged_call("weather", lambda provider: provider.fetch_weather(event_external_id))
+
+
+# One router per process, so the API, the worker jobs and ingestion share breakers and latency history.
+provider_router = ProviderRouter()
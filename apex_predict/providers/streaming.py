@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import json
+from collections.abc import AsyncIterable, AsyncIterator
+from typing import Any
+
+_WHITESPACE = " \t\r\n"
+
+
+async def iter_json_array(chunks: AsyncIterable[str]) -> AsyncIterator[Any]:
+    # Yields the elements of a top-level JSON array as text chunks arrive, so only the current
+    # element (plus one chunk) is held in memory instead of the whole document.
+    decoder = json.JSONDecoder()
+    iterator = chunks.__aiter__()
+    buffer = ""
+    pos = 0
+    eof = False
+    state = "start"
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        decoded = None
+        if pos < len(buffer):
+            char = buffer[pos]
+            if state == "start":
+                if char != "[":
+                    raise ValueError("expected a JSON array")
+                pos += 1
+                state = "first"
+                continue
+            if char == "]" and state in {"first", "separator"}:
+                return
+            if state == "separator":
+                if char != ",":
+                    raise ValueError(f"unexpected {char!r} in JSON array")
+                pos += 1
+                state = "value"
+                continue
+            try:
+                decoded = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            # A scalar that ends exactly at the buffer edge may continue in the next chunk.
+            if decoded is not None and (decoded[1] < len(buffer) or eof):
+                value, pos = decoded
+                state = "separator"
+                yield value
+                continue
+
+        if eof:
+            raise ValueError("truncated JSON array")
+        try:
+            chunk = await anext(iterator)
+        except StopAsyncIteration:
+            eof = True
+            continue
+        buffer = buffer[pos:] + chunk
+        pos = 0
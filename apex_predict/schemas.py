@@ -72,6 +72,32 @@ class PredictionOut(BaseModel):
     answers: list[PredictionAnswerOut]
 
 
+class PredictionAckOut(BaseModel):
+    session_id: str
+    sequence: int
+    accepted_at: datetime
+
+
+class PredictionBatchItemIn(PredictionSubmission):
+    session_id: str
+
+
+class PredictionBatchIn(BaseModel):
+    submissions: list[PredictionBatchItemIn] = Field(min_length=1, max_length=10)
+
+
+class PredictionBatchResult(BaseModel):
+    session_id: str
+    status_code: int
+    prediction: PredictionOut | None = None
+    sequence: int | None = None
+    error: str | None = None
+
+
+class PredictionBatchOut(BaseModel):
+    results: list[PredictionBatchResult]
+
+
 class LeaderboardRow(BaseModel):
     user_id: str
     username: str
@@ -82,6 +108,8 @@ class LeaderboardRow(BaseModel):
 class LeaderboardOut(BaseModel):
     scope: str
     rows: list[LeaderboardRow]
+    version: str | None = None
+    next_cursor: str | None = None
 
 
 class LeagueCreateIn(BaseModel):
@@ -158,3 +186,8 @@ class ScoringRunOut(BaseModel):
     session_id: str
     entries_created: int
     finalized: bool
+
+
+class TotalsRebuildOut(BaseModel):
+    users: int
+    season_totals: int
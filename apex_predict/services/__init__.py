@@ -1,11 +1,16 @@
 from apex_predict.services.ai import get_or_create_preview, get_or_create_session_insight
-from apex_predict.services.ingestion import auto_finalize_ended_sessions, ingest_session_question_outcomes
+from apex_predict.services.ingestion import (
+    auto_finalize_ended_sessions,
+    ingest_live_sessions,
+    ingest_session_question_outcomes,
+)
 from apex_predict.services.leaderboard import build_global_leaderboard, build_league_leaderboard
 from apex_predict.services.scoring import run_session_scoring
 
 __all__ = [
     "auto_finalize_ended_sessions",
     "ingest_session_question_outcomes",
+    "ingest_live_sessions",
     "get_or_create_preview",
     "get_or_create_session_insight",
     "build_global_leaderboard",
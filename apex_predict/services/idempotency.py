@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import cast
+
+from sqlalchemy import CursorResult, delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from apex_predict.config import get_settings
+from apex_predict.db import dialect_insert
+from apex_predict.models import IdempotencyRecord, uuid_str
+
+
+def _now() -> datetime:
+    return datetime.now(tz=timezone.utc)
+
+
+def _coerce_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def request_fingerprint(scope: str, body: dict) -> str:
+    canonical = json.dumps({"scope": scope, "body": body}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    request_hash: str
+    status_code: int
+    body: dict
+    expires_at: datetime
+
+
+@dataclass(frozen=True)
+class IdempotencyReservation:
+    record_id: str
+    user_id: str
+    key: str
+    request_hash: str
+    expires_at: datetime
+
+
+class IdempotencyStore:
+    # DB-backed key -> response store with a bounded in-process LRU in front of it. Entries are
+    # only cached after the write they describe has committed.
+    def __init__(self, *, ttl_seconds: float, max_cached: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_cached = max(max_cached, 0)
+        self._cache: OrderedDict[tuple[str, str], StoredResponse] = OrderedDict()
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    async def lookup(self, db: AsyncSession, *, user_id: str, key: str) -> StoredResponse | None:
+        cache_key = (user_id, key)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            if cached.expires_at > _now():
+                self._cache.move_to_end(cache_key)
+                return cached
+            del self._cache[cache_key]
+
+        record = await db.scalar(
+            select(IdempotencyRecord).where(
+                IdempotencyRecord.user_id == user_id,
+                IdempotencyRecord.idempotency_key == key,
+            )
+        )
+        if record is None or _coerce_utc(record.expires_at) <= _now():
+            return None
+        stored = StoredResponse(
+            request_hash=record.request_hash,
+            status_code=record.status_code,
+            body=record.response_json,
+            expires_at=_coerce_utc(record.expires_at),
+        )
+        self.remember(user_id=user_id, key=key, stored=stored)
+        return stored
+
+    async def reserve(
+        self,
+        db: AsyncSession,
+        *,
+        user_id: str,
+        key: str,
+        request_hash: str,
+    ) -> IdempotencyReservation | StoredResponse:
+        # Claims the key in the same transaction as the write it guards. A concurrent retry
+        # blocks on the uncommitted row and then gets the committed response back instead of
+        # writing twice; an expired row that has not been purged yet is taken over.
+        now = _now()
+        expires_at = now + timedelta(seconds=self.ttl_seconds)
+        statement = dialect_insert(db, IdempotencyRecord).values(
+            id=uuid_str(),
+            user_id=user_id,
+            idempotency_key=key,
+            request_hash=request_hash,
+            status_code=0,
+            response_json={},
+            created_at=now,
+            expires_at=expires_at,
+        )
+        record_id = (
+            await db.execute(
+                statement.on_conflict_do_update(
+                    index_elements=["user_id", "idempotency_key"],
+                    set_={
+                        "request_hash": statement.excluded.request_hash,
+                        "status_code": statement.excluded.status_code,
+                        "response_json": statement.excluded.response_json,
+                        "created_at": statement.excluded.created_at,
+                        "expires_at": statement.excluded.expires_at,
+                    },
+                    where=IdempotencyRecord.expires_at <= now,
+                ).returning(IdempotencyRecord.id)
+            )
+        ).scalar_one_or_none()
+        if record_id is not None:
+            return IdempotencyReservation(
+                record_id=record_id,
+                user_id=user_id,
+                key=key,
+                request_hash=request_hash,
+                expires_at=expires_at,
+            )
+
+        record = await db.scalar(
+            select(IdempotencyRecord)
+            .where(IdempotencyRecord.user_id == user_id, IdempotencyRecord.idempotency_key == key)
+            .execution_options(populate_existing=True)
+        )
+        if record is None:
+            # Purged between the conflict and the read; claim it again.
+            return await self.reserve(db, user_id=user_id, key=key, request_hash=request_hash)
+        return StoredResponse(
+            request_hash=record.request_hash,
+            status_code=record.status_code,
+            body=record.response_json,
+            expires_at=_coerce_utc(record.expires_at),
+        )
+
+    async def save(
+        self,
+        db: AsyncSession,
+        reservation: IdempotencyReservation,
+        *,
+        status_code: int,
+        body: dict,
+    ) -> StoredResponse:
+        await db.execute(
+            update(IdempotencyRecord)
+            .where(IdempotencyRecord.id == reservation.record_id)
+            .values(status_code=status_code, response_json=body)
+            .execution_options(synchronize_session=False)
+        )
+        return StoredResponse(
+            request_hash=reservation.request_hash,
+            status_code=status_code,
+            body=body,
+            expires_at=reservation.expires_at,
+        )
+
+    def remember(self, *, user_id: str, key: str, stored: StoredResponse) -> None:
+        if self.max_cached == 0:
+            return
+        cache_key = (user_id, key)
+        self._cache[cache_key] = stored
+        self._cache.move_to_end(cache_key)
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+
+
+async def purge_expired_idempotency_records(db: AsyncSession) -> dict[str, int]:
+    result = await db.execute(
+        delete(IdempotencyRecord)
+        .where(IdempotencyRecord.expires_at <= _now())
+        .execution_options(synchronize_session=False)
+    )
+    await db.flush()
+    # DELETE returns a CursorResult; Session.execute is only typed as Result.
+    return {"idempotency_records_deleted": cast(CursorResult, result).rowcount or 0}
+
+
+settings = get_settings()
+idempotency_store = IdempotencyStore(
+    ttl_seconds=settings.idempotency_ttl_seconds,
+    max_cached=settings.idempotency_cache_size,
+)
@@ -1,20 +1,72 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from typing import Any
 
-from sqlalchemy import select
+from sqlalchemy import Numeric, and_, case, cast, false, func, literal_column, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnClause
 
+from apex_predict.config import get_settings
 from apex_predict.enums import JobStatus, QuestionType, SessionState
-from apex_predict.models import JobRun, ProviderSyncLog, QuestionInstance, Session
+from apex_predict.models import (
+    JobRun,
+    LiveSessionState,
+    PredictionAnswer,
+    Profile,
+    ProviderSyncLog,
+    QuestionInstance,
+    ScoringRule,
+    Session,
+)
+from apex_predict.providers.openf1 import (
+    FACTS_BY_SESSION_ENDPOINT,
+    LIVE_CURSOR_FIELDS,
+    SESSION_ENDPOINT_REDUCERS,
+    derive_session_facts,
+)
 from apex_predict.providers.router import ProviderRouter
+from apex_predict.providers.router import provider_router as shared_provider_router
+from apex_predict.services.leaderboard import publish_provisional_leaderboard
 from apex_predict.services.scoring import record_job_run, run_session_scoring
+from apex_predict.services.session_catalog import session_catalog
+
+QUESTION_FACT_KEYS: dict[QuestionType, tuple[str, ...]] = {
+    QuestionType.POLE: ("pole", "winner"),
+    QuestionType.WINNER: ("winner",),
+    QuestionType.TOP5: ("top5",),
+    QuestionType.DNF: ("dnf_driver_codes",),
+    QuestionType.FASTEST_LAP: ("fastest_lap",),
+    QuestionType.SAFETY_CAR: ("safety_car",),
+    QuestionType.MIDFIELD_CONSTRUCTOR: ("midfield_constructor", "constructor_points"),
+    QuestionType.FIRST_PIT_STOP_TEAM: ("first_pit_stop_team",),
+    QuestionType.FIRST_SAFETY_CAR_LAP: ("first_safety_car_lap",),
+}
+
+
+class IngestionError(Exception):
+    pass
 
 
 def _now() -> datetime:
     return datetime.now(tz=timezone.utc)
 
 
+def _coerce_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _provider_data_settled(session_obj: Session) -> bool:
+    # Upstream timing data keeps being corrected for a while after the chequered flag; after that
+    # it is safe to cache responses for good.
+    if session_obj.state == SessionState.FINALIZED:
+        return True
+    settle = timedelta(seconds=get_settings().provider_cache_settle_seconds)
+    return _coerce_utc(session_obj.ends_at) + settle <= _now()
+
+
 def _normalize_token(value: str) -> str:
     return "".join(ch for ch in value.upper() if ch.isalnum())
 
@@ -31,6 +83,10 @@ def _match_option(options: list[str], candidates: list[str | None]) -> str | Non
 
 
 def resolve_question_option(question: QuestionInstance, facts: dict) -> str | None:
+    unavailable = set(facts.get("unavailable_facts") or ())
+    if unavailable.intersection(QUESTION_FACT_KEYS.get(question.question_type, ())):
+        return None
+
     if question.question_type == QuestionType.POLE:
         return _match_option(question.options, [facts.get("pole"), facts.get("winner")])
 
@@ -81,12 +137,242 @@ def resolve_question_option(question: QuestionInstance, facts: dict) -> str | No
     return None
 
 
+def _live_row_key(endpoint: str, row: dict) -> tuple:
+    # race_control rows without a driver can share a timestamp, so the message tells them apart.
+    return (row.get(LIVE_CURSOR_FIELDS[endpoint]), row.get("driver_number"), row.get("message"))
+
+
+def merge_live_rows(stored: dict[str, list[dict]], updates: dict[str, list[dict]]) -> dict[str, list[dict]]:
+    # position/laps/pit are folded through the same per-driver reducers the full fetch uses, so
+    # the stored state stays one row per driver however long the session runs. race_control is
+    # small and every message matters, so new rows are appended. The cursors are inclusive, so
+    # rows already merged at the cursor timestamp come back and are dropped here.
+    merged = {endpoint: list(rows) for endpoint, rows in stored.items()}
+    for endpoint, rows in updates.items():
+        if endpoint == "drivers":
+            if rows or "drivers" not in merged:
+                merged["drivers"] = list(rows)
+            continue
+        if endpoint in LIVE_CURSOR_FIELDS:
+            seen = {_live_row_key(endpoint, row) for row in merged.get(endpoint, ())}
+            fresh = []
+            for row in rows:
+                key = _live_row_key(endpoint, row)
+                if key not in seen:
+                    seen.add(key)
+                    fresh.append(row)
+            rows = fresh
+        reducer_factory = SESSION_ENDPOINT_REDUCERS.get(endpoint)
+        if reducer_factory is None:
+            merged[endpoint] = merged.get(endpoint, []) + list(rows)
+            continue
+        reducer = reducer_factory()
+        for row in (*merged.get(endpoint, ()), *rows):
+            reducer.feed(row)
+        merged[endpoint] = reducer.rows()
+    return merged
+
+
+def advance_live_cursors(cursors: dict[str, str], updates: dict[str, list[dict]]) -> dict[str, str]:
+    # Endpoints missing from `updates` failed this poll and keep their cursor.
+    advanced = dict(cursors)
+    for endpoint, field in LIVE_CURSOR_FIELDS.items():
+        stamps = [str(row[field]) for row in updates.get(endpoint, ()) if row.get(field)]
+        if endpoint in cursors:
+            stamps.append(cursors[endpoint])
+        if stamps:
+            advanced[endpoint] = max(stamps)
+    return advanced
+
+
+async def _provisional_leaderboard_rows(
+    db: AsyncSession,
+    session_id: str,
+    provisional: dict[str, str],
+) -> list[dict]:
+    # One aggregate per poll instead of loading every answer: points are summed in the database
+    # with the same base_points * (100 + credits) / 100 the SQL scoring engine uses.
+    credits = func.coalesce(PredictionAnswer.credits, 0)
+    hundred: ColumnClause[Any] = literal_column("100.0")
+    awarded = cast(ScoringRule.base_points * (100 + credits), Numeric(10, 2)) / hundred
+    correct = or_(
+        false(),
+        *(
+            and_(PredictionAnswer.question_instance_id == question_id, PredictionAnswer.selected_option == option)
+            for question_id, option in provisional.items()
+        ),
+    )
+    total_points = func.coalesce(func.sum(case((correct, awarded), else_=0)), 0)
+    totals = (
+        await db.execute(
+            select(PredictionAnswer.user_id, func.max(Profile.username), total_points)
+            .join(QuestionInstance, QuestionInstance.id == PredictionAnswer.question_instance_id)
+            .join(ScoringRule, ScoringRule.id == QuestionInstance.scoring_rule_id)
+            .outerjoin(Profile, Profile.user_id == PredictionAnswer.user_id)
+            .where(QuestionInstance.session_id == session_id)
+            .group_by(PredictionAnswer.user_id)
+            .order_by(total_points.desc(), PredictionAnswer.user_id.asc())
+        )
+    ).all()
+    return [
+        {
+            "rank": rank,
+            "user_id": user_id,
+            "username": username or user_id,
+            "total_points": round(float(total), 2),
+        }
+        for rank, (user_id, username, total) in enumerate(totals, start=1)
+    ]
+
+
+async def poll_live_session(
+    db: AsyncSession,
+    session_obj: Session,
+    router: ProviderRouter,
+) -> tuple[LiveSessionState, bool]:
+    # One incremental poll: fetch rows past the stored cursors, fold them into the running state,
+    # re-derive facts and republish the provisional leaderboard. The flag is True when every
+    # endpoint was answered by the provider that owns the state.
+    external_id = session_obj.external_id
+    if not external_id:
+        raise IngestionError("missing_external_id")
+    state = await db.get(LiveSessionState, session_obj.id)
+    if state is None:
+        state = LiveSessionState(
+            session_id=session_obj.id,
+            cursors_json={},
+            rows_json={},
+            facts_json={},
+            provisional_json={},
+            polls=0,
+        )
+        db.add(state)
+
+    stored_rows = state.rows_json or {}
+    if not stored_rows.get("drivers"):
+        # Without a driver list nothing can be derived yet, so the state is not owned by anyone:
+        # start over with whichever provider answers rather than waiting on one that returned nothing.
+        state.provider_name = None
+        state.cursors_json = {}
+        stored_rows = {}
+    provider_name, updates = await router.fetch_session_updates(
+        external_id,
+        dict(state.cursors_json or {}),
+        include_drivers=not stored_rows.get("drivers"),
+    )
+    state.polls = (state.polls or 0) + 1
+    state.updated_at = _now()
+    if state.provider_name not in (None, provider_name):
+        # Cursors are only meaningful to the provider that issued the rows; wait for it to return.
+        await db.flush()
+        return state, False
+
+    new_rows = updates.get("rows") or {}
+    state.provider_name = provider_name
+    state.rows_json = merge_live_rows(stored_rows, new_rows)
+    state.cursors_json = advance_live_cursors(state.cursors_json or {}, new_rows)
+
+    synced = state.rows_json
+    if not synced.get("drivers"):
+        await db.flush()
+        return state, False
+
+    unavailable = {
+        fact for endpoint, facts in FACTS_BY_SESSION_ENDPOINT.items() if endpoint not in synced for fact in facts
+    }
+    payloads = {endpoint: synced.get(endpoint, []) for endpoint in ("drivers", *LIVE_CURSOR_FIELDS)}
+    facts = derive_session_facts(payloads, provider=provider_name, unavailable_facts=unavailable)
+    state.facts_json = facts
+
+    questions = (
+        await db.scalars(select(QuestionInstance).where(QuestionInstance.session_id == session_obj.id))
+    ).all()
+    provisional: dict[str, str] = {}
+    for question in questions:
+        option = resolve_question_option(question, facts)
+        if option is not None:
+            provisional[question.id] = option
+    state.provisional_json = provisional
+
+    rows = await _provisional_leaderboard_rows(db, session_obj.id, provisional)
+    await publish_provisional_leaderboard(db, session_id=session_obj.id, rows=rows)
+    return state, not updates.get("failed") and not unavailable
+
+
+async def ingest_live_sessions(
+    db: AsyncSession,
+    provider_router: ProviderRouter | None = None,
+) -> dict[str, int]:
+    now = _now()
+    candidates = (
+        await db.scalars(
+            select(Session).where(
+                Session.starts_at <= now,
+                Session.ends_at > now,
+                Session.state.in_([SessionState.OPEN, SessionState.LOCKED]),
+                Session.external_id.is_not(None),
+            )
+        )
+    ).all()
+    if not candidates:
+        return {"candidates": 0, "polled": 0, "failed": 0, "provisional_outcomes": 0}
+
+    router = provider_router or shared_provider_router
+    polled = 0
+    failed = 0
+    provisional_outcomes = 0
+    for session_obj in candidates:
+        try:
+            state, _complete = await poll_live_session(db, session_obj, router)
+        except Exception as exc:
+            failed += 1
+            db.add(
+                ProviderSyncLog(
+                    provider_name="router",
+                    resource="live_session",
+                    status=JobStatus.FAILED,
+                    details=f"session={session_obj.id} error={type(exc).__name__}",
+                    finished_at=_now(),
+                )
+            )
+            continue
+        polled += 1
+        provisional_outcomes += len(state.provisional_json or {})
+
+    await db.flush()
+    return {
+        "candidates": len(candidates),
+        "polled": polled,
+        "failed": failed,
+        "provisional_outcomes": provisional_outcomes,
+    }
+
+
+async def _confirm_live_facts(
+    db: AsyncSession,
+    session_obj: Session,
+    router: ProviderRouter,
+) -> tuple[str, dict] | None:
+    # Finalization for a session that was followed live: one last incremental poll instead of
+    # refetching every endpoint. Anything short of a complete poll from the primary falls back.
+    state = await db.get(LiveSessionState, session_obj.id)
+    if state is None or not (state.rows_json or {}).get("drivers") or state.provider_name != router.primary.name:
+        return None
+    try:
+        state, complete = await poll_live_session(db, session_obj, router)
+    except Exception:
+        return None
+    if not complete or state.provider_name is None:
+        return None
+    return state.provider_name, state.facts_json
+
+
 async def ingest_session_question_outcomes(
     db: AsyncSession,
     session_obj: Session,
     provider_router: ProviderRouter | None = None,
 ) -> dict:
-    router = provider_router or ProviderRouter()
+    router = provider_router or shared_provider_router
 
     if not session_obj.external_id:
         db.add(
@@ -100,7 +386,15 @@ async def ingest_session_question_outcomes(
         await db.flush()
         return {"resolved": 0, "unresolved": 0, "provider": "none", "facts": {}}
 
-    provider_name, facts = await router.fetch_session_facts(session_obj.external_id)
+    confirmed = await _confirm_live_facts(db, session_obj, router)
+    if confirmed is not None:
+        provider_name, facts = confirmed
+    else:
+        provider_name, facts = await router.fetch_session_facts(
+            session_obj.external_id,
+            finalized=_provider_data_settled(session_obj),
+            ends_at=_coerce_utc(session_obj.ends_at),
+        )
     questions = (
         await db.scalars(select(QuestionInstance).where(QuestionInstance.session_id == session_obj.id))
     ).all()
@@ -150,6 +444,7 @@ async def auto_finalize_ended_sessions(
     for session_obj in candidates:
         if session_obj.state == SessionState.OPEN:
             session_obj.state = SessionState.LOCKED
+            session_catalog.invalidate_on_commit(db, session_obj.id)
 
         idempotency_key = f"auto-finalize:{session_obj.id}"
         existing_job = await db.scalar(
@@ -168,6 +463,11 @@ async def auto_finalize_ended_sessions(
                 session_obj,
                 provider_router=provider_router,
             )
+            unavailable = ingestion["facts"].get("unavailable_facts")
+            if unavailable:
+                # Scoring now would finalize those questions unscored for good; fail the job so
+                # the next pass fetches the facts again.
+                raise IngestionError(f"unavailable_facts={','.join(unavailable)}")
             entries = await run_session_scoring(db, session_obj.id, initiated_by=initiated_by)
             await record_job_run(
                 db,
@@ -1,41 +1,93 @@
 from __future__ import annotations
 
+import base64
+import json
+from collections import defaultdict
+from collections.abc import Collection
+from dataclasses import dataclass
 from datetime import datetime, timezone
+from decimal import Decimal
 
-from sqlalchemy import func, select
+from sqlalchemy import and_, delete, event, func, insert, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session as OrmSession
 
+from apex_predict.db import dialect_insert
 from apex_predict.enums import LeaderboardScope
 from apex_predict.models import (
+    Event,
     LeaderboardSnapshot,
     League,
     LeagueMember,
     LeagueSnapshot,
     Profile,
     ScoreEntry,
+    Session,
+    UserSeasonTotal,
+    uuid_str,
 )
+from apex_predict.services.rank_index import (
+    LIVE_VERSION,
+    LeaderboardIndex,
+    global_rank_index,
+    snapshot_version,
+)
+from apex_predict.services.snapshot_history import build_league_snapshot_rows
+
+PUBLISH_BATCH_SIZE = 500
+PENDING_RANK_INDEX_KEY = "pending_global_rank_index"
+TOTALS_BATCH_SIZE = 500
 
 
 def _now_utc() -> datetime:
     return datetime.now(tz=timezone.utc)
 
 
-async def build_global_leaderboard(session: AsyncSession) -> list[dict]:
-    rows = (
-        await session.execute(
-            select(
-                ScoreEntry.user_id,
-                func.coalesce(Profile.username, ScoreEntry.user_id).label("username"),
-                func.coalesce(func.sum(ScoreEntry.awarded_points), 0).label("total_points"),
-            )
-            .join(Profile, Profile.user_id == ScoreEntry.user_id, isouter=True)
-            .group_by(ScoreEntry.user_id, Profile.username)
-            .order_by(func.sum(ScoreEntry.awarded_points).desc())
+@event.listens_for(OrmSession, "after_commit")
+def _load_published_rank_index(session: OrmSession) -> None:
+    pending = session.info.pop(PENDING_RANK_INDEX_KEY, None)
+    if pending is not None:
+        rows, version = pending
+        global_rank_index.load(rows, version=version)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _discard_published_rank_index(session: OrmSession) -> None:
+    session.info.pop(PENDING_RANK_INDEX_KEY, None)
+
+
+@dataclass(frozen=True)
+class LeaderboardCursor:
+    version: str
+    total_points: Decimal
+    user_id: str
+    rank: int
+
+    def encode(self) -> str:
+        raw = json.dumps(
+            {"v": self.version, "p": str(self.total_points), "u": self.user_id, "r": self.rank},
+            separators=(",", ":"),
         )
-    ).all()
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+    @classmethod
+    def decode(cls, value: str) -> LeaderboardCursor:
+        try:
+            padded = value + "=" * (-len(value) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+            return cls(
+                version=str(payload["v"]),
+                total_points=Decimal(str(payload["p"])),
+                user_id=str(payload["u"]),
+                rank=int(payload["r"]),
+            )
+        except (ValueError, KeyError, TypeError, ArithmeticError) as exc:
+            raise ValueError("invalid_cursor") from exc
+
 
+def _ranked_rows(rows, start_rank: int = 1) -> list[dict]:
     result: list[dict] = []
-    for i, row in enumerate(rows, start=1):
+    for i, row in enumerate(rows, start=start_rank):
         result.append(
             {
                 "rank": i,
@@ -47,33 +99,229 @@ async def build_global_leaderboard(session: AsyncSession) -> list[dict]:
     return result
 
 
-async def build_league_leaderboard(session: AsyncSession, league_id: str) -> list[dict]:
-    rows = (
-        await session.execute(
+def _keyset_page(query, points_column, user_id_column, *, limit: int | None, after: LeaderboardCursor | None):
+    query = query.order_by(points_column.desc(), user_id_column.asc())
+    if after is not None:
+        query = query.where(
+            or_(
+                points_column < after.total_points,
+                and_(points_column == after.total_points, user_id_column > after.user_id),
+            )
+        )
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+async def build_global_leaderboard(
+    session: AsyncSession,
+    season_id: str | None = None,
+    *,
+    limit: int | None = None,
+    after: LeaderboardCursor | None = None,
+) -> list[dict]:
+    if season_id is None:
+        query = _keyset_page(
+            select(Profile.user_id, Profile.username, Profile.total_points).where(Profile.total_points != 0),
+            Profile.total_points,
+            Profile.user_id,
+            limit=limit,
+            after=after,
+        )
+    else:
+        query = _keyset_page(
             select(
-                LeagueMember.user_id,
-                func.coalesce(Profile.username, LeagueMember.user_id).label("username"),
-                func.coalesce(func.sum(ScoreEntry.awarded_points), 0).label("total_points"),
+                UserSeasonTotal.user_id,
+                Profile.username,
+                UserSeasonTotal.total_points,
             )
-            .join(Profile, Profile.user_id == LeagueMember.user_id, isouter=True)
-            .join(ScoreEntry, ScoreEntry.user_id == LeagueMember.user_id, isouter=True)
-            .where(LeagueMember.league_id == league_id)
-            .group_by(LeagueMember.user_id, Profile.username)
-            .order_by(func.coalesce(func.sum(ScoreEntry.awarded_points), 0).desc())
+            .join(Profile, Profile.user_id == UserSeasonTotal.user_id, isouter=True)
+            .where(UserSeasonTotal.season_id == season_id),
+            UserSeasonTotal.total_points,
+            UserSeasonTotal.user_id,
+            limit=limit,
+            after=after,
         )
-    ).all()
 
-    result: list[dict] = []
-    for i, row in enumerate(rows, start=1):
-        result.append(
+    rows = (await session.execute(query)).all()
+    return _ranked_rows(rows, start_rank=after.rank + 1 if after is not None else 1)
+
+
+async def build_league_leaderboard(
+    session: AsyncSession,
+    league_id: str,
+    *,
+    limit: int | None = None,
+    after: LeaderboardCursor | None = None,
+) -> list[dict]:
+    total_points = func.coalesce(Profile.total_points, 0)
+    query = _keyset_page(
+        select(
+            LeagueMember.user_id,
+            Profile.username,
+            total_points.label("total_points"),
+        )
+        .join(Profile, Profile.user_id == LeagueMember.user_id, isouter=True)
+        .where(LeagueMember.league_id == league_id),
+        total_points,
+        LeagueMember.user_id,
+        limit=limit,
+        after=after,
+    )
+    rows = (await session.execute(query)).all()
+    return _ranked_rows(rows, start_rank=after.rank + 1 if after is not None else 1)
+
+
+def paginate_leaderboard(rows: list[dict], *, limit: int, version: str) -> tuple[list[dict], str | None]:
+    # Callers fetch `limit + 1` rows; the extra row only signals that another page exists.
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    last = page[-1]
+    cursor = LeaderboardCursor(
+        version=version,
+        total_points=Decimal(str(last["total_points"])),
+        user_id=last["user_id"],
+        rank=last["rank"],
+    )
+    return page, cursor.encode()
+
+
+async def _latest_snapshot_ref(
+    session: AsyncSession,
+    *,
+    scope: LeaderboardScope,
+    scope_id: str | None,
+):
+    query = select(LeaderboardSnapshot.id, LeaderboardSnapshot.computed_at).where(
+        LeaderboardSnapshot.scope == scope
+    )
+    if scope_id is None:
+        query = query.where(LeaderboardSnapshot.scope_id.is_(None))
+    else:
+        query = query.where(LeaderboardSnapshot.scope_id == scope_id)
+    return (await session.execute(query.order_by(LeaderboardSnapshot.computed_at.desc()).limit(1))).first()
+
+
+async def leaderboard_version(
+    session: AsyncSession,
+    *,
+    scope: LeaderboardScope,
+    scope_id: str | None = None,
+) -> str:
+    latest = await _latest_snapshot_ref(session, scope=scope, scope_id=scope_id)
+    if latest is None:
+        return LIVE_VERSION
+    return snapshot_version(latest.id, latest.computed_at)
+
+
+async def get_global_rank_index(session: AsyncSession) -> LeaderboardIndex:
+    latest = await _latest_snapshot_ref(session, scope=LeaderboardScope.GLOBAL, scope_id=None)
+    if latest is None:
+        # Nothing published yet: build once from the running totals. Totals only move through
+        # scoring, which publishes a snapshot and so a new version that replaces this one.
+        if global_rank_index.version != LIVE_VERSION:
+            global_rank_index.load(await build_global_leaderboard(session), version=LIVE_VERSION)
+        return global_rank_index
+
+    version = snapshot_version(latest.id, latest.computed_at)
+    if global_rank_index.version != version:
+        rows = await session.scalar(select(LeaderboardSnapshot.rows_json).where(LeaderboardSnapshot.id == latest.id))
+        global_rank_index.load(rows or [], version=version)
+    return global_rank_index
+
+
+async def increment_user_totals(
+    session: AsyncSession,
+    *,
+    season_id: str | None,
+    deltas: dict[str, Decimal],
+    profiles: bool = True,
+) -> None:
+    """Apply per-user point deltas to the running totals in the caller's transaction."""
+    items = [(user_id, delta) for user_id, delta in deltas.items() if delta]
+    for start in range(0, len(items), TOTALS_BATCH_SIZE):
+        batch = items[start : start + TOTALS_BATCH_SIZE]
+        if profiles:
+            await _increment_profile_totals(session, batch)
+        if season_id is not None:
+            await _increment_season_totals(session, season_id, batch)
+
+
+async def _increment_profile_totals(session: AsyncSession, batch: list[tuple[str, Decimal]]) -> None:
+    # `total_points = total_points + excluded.total_points` is evaluated by the database, so
+    # concurrent scoring runs add up instead of overwriting each other.
+    user_ids = [user_id for user_id, _ in batch]
+    taken = set((await session.scalars(select(Profile.username).where(Profile.username.in_(user_ids)))).all())
+    table = Profile.__table__
+    statement = dialect_insert(session, table).values(
+        [
             {
-                "rank": i,
-                "user_id": row.user_id,
-                "username": row.username or row.user_id,
-                "total_points": float(row.total_points),
+                "user_id": user_id,
+                "username": user_id if user_id not in taken else f"{user_id[:20]}-{user_id[-4:]}",
+                "total_points": delta,
             }
+            for user_id, delta in batch
+        ]
+    )
+    await session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[table.c.user_id],
+            set_={"total_points": table.c.total_points + statement.excluded.total_points},
         )
-    return result
+    )
+
+
+async def _increment_season_totals(session: AsyncSession, season_id: str, batch: list[tuple[str, Decimal]]) -> None:
+    table = UserSeasonTotal.__table__
+    now = _now_utc()
+    statement = dialect_insert(session, table).values(
+        [
+            {"id": uuid_str(), "user_id": user_id, "season_id": season_id, "total_points": delta, "updated_at": now}
+            for user_id, delta in batch
+        ]
+    )
+    await session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.season_id],
+            set_={
+                "total_points": table.c.total_points + statement.excluded.total_points,
+                "updated_at": statement.excluded.updated_at,
+            },
+        )
+    )
+
+
+async def rebuild_user_totals(session: AsyncSession) -> dict[str, int]:
+    """Recompute every running total from `score_entries` (backfill / repair path)."""
+    global_rows = (
+        await session.execute(
+            select(ScoreEntry.user_id, func.sum(ScoreEntry.awarded_points)).group_by(ScoreEntry.user_id)
+        )
+    ).all()
+    season_rows = (
+        await session.execute(
+            select(Event.season_id, ScoreEntry.user_id, func.sum(ScoreEntry.awarded_points))
+            .join(Session, Session.id == ScoreEntry.session_id)
+            .join(Event, Event.id == Session.event_id)
+            .group_by(Event.season_id, ScoreEntry.user_id)
+        )
+    ).all()
+
+    await session.execute(update(Profile).values(total_points=0).execution_options(synchronize_session=False))
+    await session.execute(delete(UserSeasonTotal).execution_options(synchronize_session=False))
+    await increment_user_totals(
+        session,
+        season_id=None,
+        deltas={user_id: Decimal(points or 0) for user_id, points in global_rows},
+    )
+    by_season: dict[str, dict[str, Decimal]] = defaultdict(dict)
+    for season_id, user_id, points in season_rows:
+        by_season[season_id][user_id] = Decimal(points or 0)
+    for season_id, deltas in by_season.items():
+        await increment_user_totals(session, season_id=season_id, deltas=deltas, profiles=False)
+    await session.flush()
+    return {"users": len(global_rows), "season_totals": len(season_rows)}
 
 
 async def _upsert_leaderboard_snapshot(
@@ -110,13 +358,138 @@ async def _upsert_leaderboard_snapshot(
     return snapshot
 
 
+async def build_all_league_leaderboards(
+    session: AsyncSession,
+    league_ids: list[str] | None = None,
+) -> dict[str, list[dict]]:
+    total_points = func.coalesce(Profile.total_points, 0)
+    rank = func.row_number().over(
+        partition_by=LeagueMember.league_id,
+        order_by=(total_points.desc(), LeagueMember.user_id.asc()),
+    )
+    query = (
+        select(
+            League.id.label("league_id"),
+            LeagueMember.user_id,
+            Profile.username,
+            total_points.label("total_points"),
+            rank.label("rank"),
+        )
+        .select_from(League)
+        .join(LeagueMember, LeagueMember.league_id == League.id, isouter=True)
+        .join(Profile, Profile.user_id == LeagueMember.user_id, isouter=True)
+        .order_by(League.id, "rank")
+    )
+    if league_ids is not None:
+        query = query.where(League.id.in_(league_ids))
+
+    standings: dict[str, list[dict]] = {}
+    for row in (await session.execute(query)).all():
+        rows = standings.setdefault(row.league_id, [])
+        if row.user_id is None:
+            continue
+        rows.append(
+            {
+                "rank": row.rank,
+                "user_id": row.user_id,
+                "username": row.username or row.user_id,
+                "total_points": float(row.total_points),
+            }
+        )
+    return standings
+
+
+async def _publish_league_snapshots(
+    session: AsyncSession,
+    *,
+    session_id: str | None,
+    league_ids: list[str] | None = None,
+) -> int:
+    standings = await build_all_league_leaderboards(session, league_ids)
+    if not standings:
+        return 0
+
+    existing_query = select(LeaderboardSnapshot.id, LeaderboardSnapshot.scope_id).where(
+        LeaderboardSnapshot.scope == LeaderboardScope.LEAGUE
+    )
+    if session_id is None:
+        existing_query = existing_query.where(LeaderboardSnapshot.session_id.is_(None))
+    else:
+        existing_query = existing_query.where(LeaderboardSnapshot.session_id == session_id)
+    if league_ids is not None:
+        existing_query = existing_query.where(LeaderboardSnapshot.scope_id.in_(list(standings)))
+    existing = {row.scope_id: row.id for row in (await session.execute(existing_query)).all()}
+
+    computed_at = _now_utc()
+    updates: list[dict] = []
+    inserts: list[dict] = []
+    for league_id, rows in standings.items():
+        snapshot_id = existing.get(league_id)
+        if snapshot_id is None:
+            inserts.append(
+                {
+                    "id": uuid_str(),
+                    "scope": LeaderboardScope.LEAGUE,
+                    "scope_id": league_id,
+                    "session_id": session_id,
+                    "computed_at": computed_at,
+                    "rows_json": rows,
+                }
+            )
+        else:
+            updates.append({"id": snapshot_id, "computed_at": computed_at, "rows_json": rows})
+
+    if inserts:
+        await session.execute(insert(LeaderboardSnapshot), inserts)
+    if updates:
+        await session.execute(update(LeaderboardSnapshot), updates)
+    await session.execute(
+        insert(LeagueSnapshot),
+        await build_league_snapshot_rows(session, standings, computed_at=computed_at),
+    )
+    return len(standings)
+
+
+async def _affected_league_ids(
+    session: AsyncSession,
+    *,
+    session_id: str | None,
+    changed_user_ids: Collection[str] | None,
+) -> list[str] | None:
+    if changed_user_ids is None:
+        if session_id is None:
+            return None
+        scored_users = select(ScoreEntry.user_id).where(ScoreEntry.session_id == session_id)
+        return list(
+            (
+                await session.scalars(
+                    select(LeagueMember.league_id).where(LeagueMember.user_id.in_(scored_users)).distinct()
+                )
+            ).all()
+        )
+
+    league_ids: set[str] = set()
+    user_ids = list(changed_user_ids)
+    for start in range(0, len(user_ids), PUBLISH_BATCH_SIZE):
+        chunk = user_ids[start : start + PUBLISH_BATCH_SIZE]
+        league_ids.update(
+            (
+                await session.scalars(
+                    select(LeagueMember.league_id).where(LeagueMember.user_id.in_(chunk)).distinct()
+                )
+            ).all()
+        )
+    return sorted(league_ids)
+
+
 async def publish_leaderboard_snapshots(
     session: AsyncSession,
     *,
     session_id: str | None,
+    changed_user_ids: Collection[str] | None = None,
 ) -> dict[str, int]:
     global_rows = await build_global_leaderboard(session)
-    await _upsert_leaderboard_snapshot(
+    global_snapshot = await _upsert_leaderboard_snapshot(
         session,
         scope=LeaderboardScope.GLOBAL,
         scope_id=None,
@@ -124,28 +497,58 @@ async def publish_leaderboard_snapshots(
         rows=global_rows,
     )
 
-    league_ids = (await session.scalars(select(League.id))).all()
+    # Only leagues containing a user whose totals moved can have different standings.
+    league_ids = await _affected_league_ids(
+        session,
+        session_id=session_id,
+        changed_user_ids=changed_user_ids,
+    )
     league_snapshot_rows = 0
-    for league_id in league_ids:
-        league_rows = await build_league_leaderboard(session, league_id)
-        await _upsert_leaderboard_snapshot(
-            session,
-            scope=LeaderboardScope.LEAGUE,
-            scope_id=league_id,
-            session_id=session_id,
-            rows=league_rows,
-        )
-        session.add(
-            LeagueSnapshot(
-                league_id=league_id,
-                computed_at=_now_utc(),
-                rows_json=league_rows,
+    if league_ids is None:
+        league_snapshot_rows = await _publish_league_snapshots(session, session_id=session_id)
+    else:
+        for start in range(0, len(league_ids), PUBLISH_BATCH_SIZE):
+            league_snapshot_rows += await _publish_league_snapshots(
+                session,
+                session_id=session_id,
+                league_ids=league_ids[start : start + PUBLISH_BATCH_SIZE],
             )
-        )
-        league_snapshot_rows += 1
 
     await session.flush()
+    # Applied by the after_commit hook below, so a rolled-back publish never reaches the index.
+    session.info[PENDING_RANK_INDEX_KEY] = (
+        global_rows,
+        snapshot_version(global_snapshot.id, global_snapshot.computed_at),
+    )
     return {
         "leaderboard_snapshots": 1 + league_snapshot_rows,
         "league_snapshots": league_snapshot_rows,
     }
+
+
+async def publish_provisional_leaderboard(
+    session: AsyncSession,
+    *,
+    session_id: str,
+    rows: list[dict],
+) -> LeaderboardSnapshot:
+    # Standings for a session still in progress, from outcomes resolved so far; replaced on
+    # every live poll and never folded into user totals.
+    snapshot = await _upsert_leaderboard_snapshot(
+        session,
+        scope=LeaderboardScope.PROVISIONAL,
+        scope_id=session_id,
+        session_id=session_id,
+        rows=rows,
+    )
+    await session.flush()
+    return snapshot
+
+
+async def get_provisional_leaderboard(session: AsyncSession, session_id: str) -> LeaderboardSnapshot | None:
+    return await session.scalar(
+        select(LeaderboardSnapshot).where(
+            LeaderboardSnapshot.scope == LeaderboardScope.PROVISIONAL,
+            LeaderboardSnapshot.scope_id == session_id,
+        )
+    )
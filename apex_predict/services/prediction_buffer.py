@@ -0,0 +1,493 @@
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import socket
+import threading
+from collections.abc import Callable, Collection, Sequence
+from contextlib import AbstractAsyncContextManager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import TextIO
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from apex_predict.config import get_settings
+from apex_predict.db import dialect_insert
+from apex_predict.enums import SessionState
+from apex_predict.models import PredictionBufferWatermark, Session
+from apex_predict.schemas import PredictionSubmission
+from apex_predict.services.predictions import upsert_predictions
+
+logger = logging.getLogger(__name__)
+
+SessionFactory = Callable[[], AbstractAsyncContextManager[AsyncSession]]
+
+CLOSED_STATES = (SessionState.LOCKED, SessionState.SCORING, SessionState.FINALIZED)
+WATERMARK_INTERVAL_SECONDS = 1.0
+
+
+def _now() -> datetime:
+    return datetime.now(tz=timezone.utc)
+
+
+def _coerce_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+@dataclass(frozen=True)
+class BufferedSubmission:
+    sequence: int
+    user_id: str
+    session_id: str
+    lock_at: datetime
+    payload: PredictionSubmission
+
+    def to_journal(self) -> dict:
+        return {
+            "sequence": self.sequence,
+            "user_id": self.user_id,
+            "session_id": self.session_id,
+            "lock_at": self.lock_at.isoformat(),
+            "payload": self.payload.model_dump(mode="json"),
+        }
+
+    @classmethod
+    def from_journal(cls, record: dict) -> BufferedSubmission:
+        return cls(
+            sequence=record["sequence"],
+            user_id=record["user_id"],
+            session_id=record["session_id"],
+            lock_at=datetime.fromisoformat(record["lock_at"]),
+            payload=PredictionSubmission.model_validate(record["payload"]),
+        )
+
+
+class PredictionWriteBuffer:
+    # Write-behind queue for prediction submissions. Accepted submissions get a monotonically
+    # increasing sequence number (appended and fsynced to the journal first, so the buffer
+    # refuses to start without one) and are written by a background flusher in multi-row
+    # batches. Each running buffer reports a watermark row that the worker's lock pass waits on.
+    # The journal is a series of segments: the active one takes appends, and each flush seals it
+    # as `<journal>.segment-<last sequence>` so flushed segments are deleted rather than rewritten.
+    def __init__(
+        self,
+        *,
+        journal_path: str = "",
+        max_batch: int = 500,
+        flush_interval_seconds: float = 0.25,
+    ) -> None:
+        self.journal_path = Path(journal_path) if journal_path else None
+        self.max_batch = max(max_batch, 1)
+        self.flush_interval_seconds = max(flush_interval_seconds, 0.01)
+        self.flushed_sequence = 0
+        self.dropped_count = 0
+        self._sequence = 0
+        self._pending: list[BufferedSubmission] = []
+        self._submit_lock = asyncio.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._sync_lock = asyncio.Lock()
+        self._synced_sequence = 0
+        self._journal_lock = threading.Lock()
+        self._journal_handle: TextIO | None = None
+        self._journal_last: int | None = None
+        self._session_factory: SessionFactory | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._reported_at: datetime | None = None
+        self._journal_claim: TextIO | None = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None
+
+    @property
+    def buffer_id(self) -> str:
+        # Stable across restarts so a recovered journal takes over its own watermark row; the
+        # journal claim taken in start() keeps two live processes from sharing one.
+        location = self.journal_path.resolve() if self.journal_path is not None else os.getpid()
+        return f"{socket.gethostname()}:{location}"
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    async def start(self, session_factory: SessionFactory) -> None:
+        if self.is_running:
+            return
+        if self.journal_path is None:
+            # A 202 with a sequence number promises the submission survives a crash.
+            raise RuntimeError("prediction_buffer_journal_required")
+        self._claim_journal()
+        self._session_factory = session_factory
+        self._submit_lock = asyncio.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._sync_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        try:
+            await asyncio.to_thread(self._recover)
+            await self.report_watermark()
+        except BaseException:
+            self._release_journal()
+            raise
+        self._task = asyncio.create_task(self._run(), name="prediction-write-buffer")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        await self.drain()
+        if self._session_factory is not None:
+            async with self._session_factory() as db:
+                await db.execute(
+                    delete(PredictionBufferWatermark).where(PredictionBufferWatermark.buffer_id == self.buffer_id)
+                )
+                await db.commit()
+        self._release_journal()
+
+    async def submit(
+        self,
+        *,
+        user_id: str,
+        session_id: str,
+        lock_at: datetime,
+        payload: PredictionSubmission,
+    ) -> int:
+        async with self._submit_lock:
+            if lock_at <= _now():
+                # Checked under the lock so a watermark reported after lock_at never misses it.
+                raise ValueError("session_locked")
+            item = BufferedSubmission(
+                sequence=self._sequence + 1,
+                user_id=user_id,
+                session_id=session_id,
+                lock_at=lock_at,
+                payload=payload,
+            )
+            if self.journal_path is not None:
+                await asyncio.to_thread(self._append, [item.to_journal()])
+            self._sequence = item.sequence
+            self._pending.append(item)
+        if self.journal_path is not None:
+            await self._sync_through(item.sequence)
+        if len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+        return item.sequence
+
+    async def _sync_through(self, sequence: int) -> None:
+        # Group commit: appends happen under the submit lock without an fsync, and one fsync then
+        # covers every submission appended before it started, so callers that queued up behind an
+        # fsync in flight are all acknowledged by the next one.
+        async with self._sync_lock:
+            if self._synced_sequence >= sequence:
+                return
+            target = self._sequence
+            await asyncio.to_thread(self._sync_journal)
+            self._synced_sequence = max(self._synced_sequence, target)
+
+    async def drain(self, session_ids: Collection[str] | None = None) -> int:
+        # Barrier: returns once nothing accepted for `session_ids` (or at all) is still queued.
+        written = 0
+        while any(session_ids is None or item.session_id in session_ids for item in self._pending):
+            written += await self.flush()
+        return written
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            batch = self._pending[: self.max_batch]
+            if not batch:
+                return 0
+            if self._session_factory is None:
+                raise RuntimeError("prediction_buffer_not_started")
+
+            latest: dict[tuple[str, str], BufferedSubmission] = {}
+            for item in batch:
+                latest[(item.user_id, item.session_id)] = item
+            for item in await self._drop_late(list(latest.values())):
+                del latest[(item.user_id, item.session_id)]
+
+            try:
+                await self._write(list(latest.values()))
+            except (IntegrityError, DataError):
+                # One bad row must not hold the batch hostage: write rows one by one and
+                # dead-letter only those the database rejects outright.
+                logger.warning("prediction_buffer_batch_rejected size=%s", len(latest))
+                for item in latest.values():
+                    try:
+                        await self._write([item])
+                    except (IntegrityError, DataError):
+                        logger.exception(
+                            "prediction_buffer_row_rejected sequence=%s user_id=%s session_id=%s",
+                            item.sequence,
+                            item.user_id,
+                            item.session_id,
+                        )
+                        await asyncio.to_thread(self._reject, item)
+
+            del self._pending[: len(batch)]
+            self.flushed_sequence = batch[-1].sequence
+            if self.journal_path is not None:
+                await asyncio.to_thread(self._mark_flushed)
+            return len(batch)
+
+    async def _drop_late(self, items: Sequence[BufferedSubmission]) -> list[BufferedSubmission]:
+        # The lock barrier should make this impossible, but a buffer written off as stale can
+        # still hold rows for a session the worker has since locked. Answers must not change
+        # after lock, so those rows are dead-lettered and counted instead of written.
+        assert self._session_factory is not None
+        if not items:
+            return []
+        async with self._session_factory() as db:
+            closed = set(
+                (
+                    await db.scalars(
+                        select(Session.id).where(
+                            Session.id.in_({item.session_id for item in items}),
+                            Session.state.in_(CLOSED_STATES),
+                        )
+                    )
+                ).all()
+            )
+        late = [item for item in items if item.session_id in closed]
+        if late:
+            logger.error("prediction_buffer_dropped_after_lock rows=%s sessions=%s", len(late), sorted(closed))
+            for item in late:
+                await asyncio.to_thread(self._reject, item)
+            self.dropped_count += len(late)
+        return late
+
+    async def _write(self, items: Sequence[BufferedSubmission]) -> None:
+        assert self._session_factory is not None
+        if not items:
+            return
+        async with self._session_factory() as db:
+            await upsert_predictions(db, [(item.user_id, item.session_id, item.payload) for item in items])
+            await db.commit()
+
+    async def report_watermark(self) -> None:
+        if self._session_factory is None:
+            raise RuntimeError("prediction_buffer_not_started")
+        async with self._submit_lock:
+            # Everything accepted before reported_at is either committed or still pending.
+            reported_at = _now()
+            pending_lock_at = min((item.lock_at for item in self._pending), default=None)
+        async with self._session_factory() as db:
+            statement = dialect_insert(db, PredictionBufferWatermark).values(
+                buffer_id=self.buffer_id,
+                pending_lock_at=pending_lock_at,
+                reported_at=reported_at,
+            )
+            await db.execute(
+                statement.on_conflict_do_update(
+                    index_elements=["buffer_id"],
+                    set_={
+                        "pending_lock_at": statement.excluded.pending_lock_at,
+                        "reported_at": statement.excluded.reported_at,
+                    },
+                )
+            )
+            await db.commit()
+        self._reported_at = reported_at
+
+    async def _run(self) -> None:
+        while True:
+            timeout = self.flush_interval_seconds
+            if self._pending:
+                # Never sleep past the earliest pending lock_at: that flush is the drain barrier.
+                until_lock = (min(item.lock_at for item in self._pending) - _now()).total_seconds()
+                timeout = max(min(timeout, until_lock), 0.0)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                flushed = 0
+                while self._pending:
+                    flushed += await self.flush()
+                if (
+                    flushed
+                    or self._reported_at is None
+                    or (_now() - self._reported_at).total_seconds() >= WATERMARK_INTERVAL_SECONDS
+                ):
+                    await self.report_watermark()
+            except Exception:
+                logger.exception("prediction_buffer_flush_failed pending=%s", len(self._pending))
+                await asyncio.sleep(self.flush_interval_seconds)
+
+    def _journal_sibling(self, suffix: str) -> Path:
+        assert self.journal_path is not None
+        return self.journal_path.with_suffix(self.journal_path.suffix + suffix)
+
+    def _claim_journal(self) -> None:
+        # One buffer per journal: a second process on the same file would share its watermark row
+        # and compact away entries it never wrote. The lock is released when the process exits.
+        assert self.journal_path is not None
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        handle = self._journal_sibling(".lock").open("a", encoding="utf-8")
+        try:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            raise RuntimeError("prediction_buffer_journal_in_use") from None
+        self._journal_claim = handle
+
+    def _release_journal(self) -> None:
+        with self._journal_lock:
+            if self._journal_handle is not None:
+                self._journal_handle.close()
+                self._journal_handle = None
+        if self._journal_claim is not None:
+            self._journal_claim.close()
+            self._journal_claim = None
+
+    def _append(self, records: list[dict]) -> None:
+        # Written through to the OS but not fsynced; _sync_through makes it durable.
+        assert self.journal_path is not None
+        with self._journal_lock:
+            if self._journal_handle is None:
+                self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+                self._journal_handle = self.journal_path.open("a", encoding="utf-8")
+            for record in records:
+                self._journal_handle.write(json.dumps(record) + "\n")
+            self._journal_handle.flush()
+            if records:
+                self._journal_last = records[-1]["sequence"]
+
+    def _sync_journal(self) -> None:
+        # fsync a duplicate descriptor outside the journal lock so appends are not held up; a
+        # segment sealed in the meantime was fsynced when it was sealed.
+        with self._journal_lock:
+            if self._journal_handle is None:
+                return
+            descriptor = os.dup(self._journal_handle.fileno())
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+    def _reject(self, item: BufferedSubmission) -> None:
+        if self.journal_path is None:
+            return
+        rejected = self._journal_sibling(".rejected")
+        with self._journal_lock, rejected.open("a", encoding="utf-8") as handle:
+            handle.write(json.dumps(item.to_journal()) + "\n")
+            handle.flush()
+            os.fsync(handle.fileno())
+
+    def _mark_flushed(self) -> None:
+        # Seal the active segment (if it holds entries) and start a fresh one that records the
+        # high-water mark, then delete every sealed segment at or below it.
+        assert self.journal_path is not None
+        with self._journal_lock:
+            if self._journal_handle is not None:
+                self._journal_handle.flush()
+                os.fsync(self._journal_handle.fileno())
+                self._journal_handle.close()
+                self._journal_handle = None
+            if self._journal_last is not None:
+                os.replace(self.journal_path, self._journal_sibling(f".segment-{self._journal_last:012d}"))
+                self._journal_last = None
+            fresh = self._journal_sibling(".tmp")
+            with fresh.open("w", encoding="utf-8") as handle:
+                handle.write(json.dumps({"flushed": self.flushed_sequence}) + "\n")
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(fresh, self.journal_path)
+            for segment in self._sealed_segments():
+                if int(segment.name.rsplit("-", 1)[1]) <= self.flushed_sequence:
+                    segment.unlink()
+
+    def _sealed_segments(self) -> list[Path]:
+        assert self.journal_path is not None
+        return sorted(self.journal_path.parent.glob(f"{self.journal_path.name}.segment-*"))
+
+    @staticmethod
+    def _read_segment(path: Path) -> tuple[int, list[BufferedSubmission]]:
+        flushed = 0
+        entries: list[BufferedSubmission] = []
+        if not path.exists():
+            return flushed, entries
+        with path.open(encoding="utf-8") as handle:
+            for line in handle:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning("prediction_buffer_journal_truncated_line path=%s", path.name)
+                    continue
+                if "flushed" in record:
+                    flushed = max(flushed, record["flushed"])
+                else:
+                    entries.append(BufferedSubmission.from_journal(record))
+        return flushed, entries
+
+    def _recover(self) -> None:
+        if self.journal_path is None:
+            return
+        flushed = 0
+        entries: list[BufferedSubmission] = []
+        with self._journal_lock:
+            for path in (*self._sealed_segments(), self.journal_path):
+                segment_flushed, segment_entries = self._read_segment(path)
+                flushed = max(flushed, segment_flushed)
+                entries.extend(segment_entries)
+            # Whatever the active segment holds is sealed by the compaction below.
+            self._journal_last = max((entry.sequence for entry in segment_entries), default=None)
+        self.flushed_sequence = max(self.flushed_sequence, flushed)
+        self._sequence = max([self._sequence, flushed, *(entry.sequence for entry in entries)])
+        self._synced_sequence = self._sequence
+        self._pending = sorted(
+            (entry for entry in entries if entry.sequence > self.flushed_sequence),
+            key=lambda entry: entry.sequence,
+        )
+        self._mark_flushed()
+        if self._pending:
+            logger.info("prediction_buffer_recovered pending=%s", len(self._pending))
+
+
+async def drained_session_ids(session: AsyncSession, sessions: Sequence[Session]) -> set[str]:
+    # Cross-process lock barrier: a session may lock once every live API buffer has reported
+    # at or after its lock_at with nothing still pending that locks at or before it.
+    stale_before = _now() - timedelta(seconds=max(get_settings().prediction_write_buffer_stale_seconds, 0.0))
+    live: list[PredictionBufferWatermark] = []
+    for watermark in (await session.scalars(select(PredictionBufferWatermark))).all():
+        if _coerce_utc(watermark.reported_at) < stale_before:
+            logger.warning(
+                "prediction_buffer_watermark_stale buffer_id=%s reported_at=%s",
+                watermark.buffer_id,
+                watermark.reported_at,
+            )
+            continue
+        live.append(watermark)
+
+    drained: set[str] = set()
+    for row in sessions:
+        lock_at = _coerce_utc(row.lock_at)
+        if all(
+            _coerce_utc(watermark.reported_at) >= lock_at
+            and (watermark.pending_lock_at is None or _coerce_utc(watermark.pending_lock_at) > lock_at)
+            for watermark in live
+        ):
+            drained.add(row.id)
+    return drained
+
+
+settings = get_settings()
+prediction_buffer = PredictionWriteBuffer(
+    journal_path=settings.prediction_write_buffer_journal_path,
+    max_batch=settings.prediction_write_buffer_max_batch,
+    flush_interval_seconds=settings.prediction_write_buffer_flush_interval_seconds,
+)
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import base64
+import json
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from sqlalchemy import and_, delete, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from apex_predict.db import dialect_insert
+from apex_predict.models import Prediction, PredictionAnswer, uuid_str
+from apex_predict.schemas import PredictionAnswerOut, PredictionOut, PredictionSubmission
+
+UPSERT_BATCH_ROWS = 1000
+
+PredictionWrite = tuple[str, str, PredictionSubmission]
+
+
+def _now() -> datetime:
+    return datetime.now(tz=timezone.utc)
+
+
+@dataclass(frozen=True)
+class PredictionHistoryCursor:
+    # Keyset position in (updated_at desc, id desc) order. A batch upsert gives many rows the
+    # same updated_at, so the id is needed to resume inside a run of ties.
+    updated_at: datetime
+    prediction_id: str
+
+    def encode(self) -> str:
+        raw = json.dumps({"t": self.updated_at.isoformat(), "i": self.prediction_id}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+    @classmethod
+    def decode(cls, value: str) -> PredictionHistoryCursor:
+        try:
+            padded = value + "=" * (-len(value) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+            return cls(updated_at=datetime.fromisoformat(str(payload["t"])), prediction_id=str(payload["i"]))
+        except (ValueError, KeyError, TypeError) as exc:
+            raise ValueError("invalid_cursor") from exc
+
+
+def _batches(rows: list[dict]) -> list[list[dict]]:
+    return [rows[start : start + UPSERT_BATCH_ROWS] for start in range(0, len(rows), UPSERT_BATCH_ROWS)]
+
+
+async def upsert_predictions(session: AsyncSession, writes: Sequence[PredictionWrite]) -> list[PredictionOut]:
+    # Only rows whose pick or credits actually changed are written; unchanged answers hit
+    # ON CONFLICT and are filtered out by the DO UPDATE ... WHERE clause. Each write must be
+    # for a distinct (user_id, session_id).
+    if not writes:
+        return []
+    now = _now()
+    prediction_insert = dialect_insert(session, Prediction).values(
+        [
+            {
+                "id": uuid_str(),
+                "user_id": user_id,
+                "session_id": session_id,
+                "client_version": payload.client_version,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for user_id, session_id, payload in writes
+        ]
+    )
+    returned = await session.execute(
+        prediction_insert.on_conflict_do_update(
+            index_elements=["user_id", "session_id"],
+            set_={"client_version": prediction_insert.excluded.client_version, "updated_at": now},
+        ).returning(Prediction.id, Prediction.user_id, Prediction.session_id)
+    )
+    prediction_ids = {(user_id, session_id): prediction_id for prediction_id, user_id, session_id in returned}
+
+    answer_rows: list[dict] = []
+    for user_id, session_id, payload in writes:
+        prediction_id = prediction_ids[(user_id, session_id)]
+        for item in payload.answers:
+            answer_rows.append(
+                {
+                    "id": uuid_str(),
+                    "prediction_id": prediction_id,
+                    "user_id": user_id,
+                    "question_instance_id": item.question_instance_id,
+                    "selected_option": item.selected_option,
+                    "credits": item.confidence_credits,
+                    "created_at": now,
+                }
+            )
+
+    for rows in _batches(answer_rows):
+        answer_insert = dialect_insert(session, PredictionAnswer).values(rows)
+        await session.execute(
+            answer_insert.on_conflict_do_update(
+                index_elements=["user_id", "question_instance_id"],
+                set_={
+                    "prediction_id": answer_insert.excluded.prediction_id,
+                    "selected_option": answer_insert.excluded.selected_option,
+                    "credits": answer_insert.excluded.credits,
+                },
+                where=or_(
+                    PredictionAnswer.selected_option.is_distinct_from(answer_insert.excluded.selected_option),
+                    PredictionAnswer.credits.is_distinct_from(answer_insert.excluded.credits),
+                ),
+            )
+        )
+
+    kept = {
+        prediction_ids[(user_id, session_id)]: [item.question_instance_id for item in payload.answers]
+        for user_id, session_id, payload in writes
+    }
+    await session.execute(
+        delete(PredictionAnswer)
+        .where(
+            or_(
+                *(
+                    and_(
+                        PredictionAnswer.prediction_id == prediction_id,
+                        PredictionAnswer.question_instance_id.not_in(question_ids),
+                    )
+                    for prediction_id, question_ids in kept.items()
+                )
+            )
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    return [
+        PredictionOut(
+            id=prediction_ids[(user_id, session_id)],
+            user_id=user_id,
+            session_id=session_id,
+            client_version=payload.client_version,
+            updated_at=now,
+            answers=[
+                PredictionAnswerOut(
+                    question_instance_id=item.question_instance_id,
+                    selected_option=item.selected_option,
+                    confidence_credits=item.confidence_credits,
+                )
+                for item in payload.answers
+            ],
+        )
+        for user_id, session_id, payload in writes
+    ]
+
+
+async def upsert_prediction(
+    session: AsyncSession,
+    *,
+    user_id: str,
+    session_id: str,
+    payload: PredictionSubmission,
+) -> PredictionOut:
+    (prediction,) = await upsert_predictions(session, [(user_id, session_id, payload)])
+    return prediction
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from datetime import datetime
+from decimal import ROUND_HALF_EVEN, Decimal
+
+LIVE_VERSION = "live"
+
+
+def _points_to_cents(total_points: float | Decimal) -> int:
+    return int((Decimal(str(total_points)) * 100).to_integral_value(rounding=ROUND_HALF_EVEN))
+
+
+def snapshot_version(snapshot_id: str, computed_at: datetime) -> str:
+    return f"{snapshot_id}:{computed_at.isoformat()}"
+
+
+class LeaderboardIndex:
+    # Sorted (points desc, user_id asc) keys: rank lookups are binary searches, so
+    # `/me` and "around me" windows never walk the full standings.
+    def __init__(self) -> None:
+        self.version: str | None = None
+        self._keys: list[tuple[int, str]] = []
+        self._rows: dict[str, dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def load(self, rows: list[dict], *, version: str | None) -> None:
+        self._rows = {
+            row["user_id"]: {
+                "username": row.get("username") or row["user_id"],
+                "total_points": row["total_points"],
+            }
+            for row in rows
+        }
+        self._keys = sorted(
+            (-_points_to_cents(row["total_points"]), user_id) for user_id, row in self._rows.items()
+        )
+        self.version = version
+
+    def rank_of(self, user_id: str) -> int | None:
+        row = self._rows.get(user_id)
+        if row is None:
+            return None
+        return bisect_left(self._keys, (-_points_to_cents(row["total_points"]), user_id)) + 1
+
+    def row_at(self, rank: int) -> dict | None:
+        if rank < 1 or rank > len(self._keys):
+            return None
+        _, user_id = self._keys[rank - 1]
+        row = self._rows[user_id]
+        return {
+            "rank": rank,
+            "user_id": user_id,
+            "username": row["username"],
+            "total_points": float(row["total_points"]),
+        }
+
+    def row_for(self, user_id: str) -> dict | None:
+        rank = self.rank_of(user_id)
+        if rank is None:
+            return None
+        return self.row_at(rank)
+
+    def window(self, user_id: str, radius: int) -> list[dict]:
+        rank = self.rank_of(user_id)
+        if rank is None:
+            return []
+        first = max(rank - radius, 1)
+        last = min(rank + radius, len(self._keys))
+        return [row for row in (self.row_at(r) for r in range(first, last + 1)) if row is not None]
+
+
+global_rank_index = LeaderboardIndex()
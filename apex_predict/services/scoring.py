@@ -1,24 +1,31 @@
 from __future__ import annotations
 
+import time
 from collections import defaultdict
 from datetime import datetime, timezone
 from decimal import Decimal
+from typing import Any
 
-from sqlalchemy import and_, func, select
+from sqlalchemy import JSON, DateTime, Numeric, String, and_, cast, false, func, insert, literal, literal_column, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnClause
 
+from apex_predict.config import get_settings
+from apex_predict.db import dialect_insert
 from apex_predict.enums import JobStatus, SessionState
 from apex_predict.models import (
+    Event,
     JobRun,
     Prediction,
     PredictionAnswer,
-    PredictionConfidenceAllocation,
     QuestionInstance,
     ScoreEntry,
     ScoringRule,
     Session,
 )
-from apex_predict.services.leaderboard import publish_leaderboard_snapshots
+from apex_predict.services.leaderboard import increment_user_totals, publish_leaderboard_snapshots
+from apex_predict.services.prediction_buffer import drained_session_ids
+from apex_predict.services.session_catalog import session_catalog
 
 
 class ScoringError(Exception):
@@ -33,10 +40,29 @@ async def _finalize_session_and_publish(
     session: AsyncSession,
     *,
     target_session: Session,
+    awarded_by_user: dict[str, Decimal] | None = None,
 ) -> None:
+    # awarded_by_user=None means the engine already applied its totals; the leagues to
+    # republish are then found from the session's score entries instead.
+    if awarded_by_user:
+        await increment_user_totals(
+            session,
+            season_id=await _season_id_for(session, target_session),
+            deltas=awarded_by_user,
+        )
     target_session.state = SessionState.FINALIZED
     await session.flush()
-    await publish_leaderboard_snapshots(session, session_id=target_session.id)
+    session_catalog.invalidate_on_commit(session, target_session.id)
+    await publish_leaderboard_snapshots(
+        session,
+        session_id=target_session.id,
+        changed_user_ids=None if awarded_by_user is None else set(awarded_by_user),
+    )
+
+
+async def _season_id_for(session: AsyncSession, target_session: Session) -> str | None:
+    event = await session.get(Event, target_session.event_id)
+    return event.season_id if event is not None else None
 
 
 def confidence_multiplier_from_credits(credits: int) -> Decimal:
@@ -52,21 +78,19 @@ def awarded_points_for_prediction(base_points: int | float | Decimal, credits: i
     return (points * confidence_multiplier_from_credits(credits)).quantize(Decimal("0.01"))
 
 
-async def run_session_scoring(session: AsyncSession, session_id: str, initiated_by: str) -> int:
-    target_session = await session.get(Session, session_id)
-    if target_session is None:
-        raise ScoringError("session_not_found")
+SCORE_INSERT_BATCH_SIZE = 1000
+SCORING_PROGRESS_INTERVAL_SECONDS = 5.0
 
-    target_session.state = SessionState.SCORING
-    await session.flush()
+ScoringResult = tuple[int, dict[str, Decimal] | None]
 
+
+async def _score_session_python(session: AsyncSession, session_id: str, initiated_by: str) -> ScoringResult:
     questions = (
         await session.scalars(select(QuestionInstance).where(QuestionInstance.session_id == session_id))
     ).all()
     question_map = {q.id: q for q in questions}
     if not question_map:
-        await _finalize_session_and_publish(session, target_session=target_session)
-        return 0
+        return 0, {}
 
     rule_ids = {q.scoring_rule_id for q in questions}
     rules = (
@@ -79,30 +103,17 @@ async def run_session_scoring(session: AsyncSession, session_id: str, initiated_
     ).all()
     prediction_ids = [p.id for p in predictions]
     if not prediction_ids:
-        await _finalize_session_and_publish(session, target_session=target_session)
-        return 0
+        return 0, {}
 
     answers = (
         await session.scalars(
             select(PredictionAnswer).where(PredictionAnswer.prediction_id.in_(prediction_ids))
         )
     ).all()
-    allocations = (
-        await session.scalars(
-            select(PredictionConfidenceAllocation).where(
-                PredictionConfidenceAllocation.prediction_id.in_(prediction_ids)
-            )
-        )
-    ).all()
-
     by_prediction_answers: dict[str, list[PredictionAnswer]] = defaultdict(list)
     for answer in answers:
         by_prediction_answers[answer.prediction_id].append(answer)
 
-    allocation_map: dict[tuple[str, str], int] = {}
-    for allocation in allocations:
-        allocation_map[(allocation.prediction_id, allocation.question_instance_id)] = allocation.credits
-
     existing_entries = (
         await session.scalars(
             select(ScoreEntry).where(
@@ -116,6 +127,7 @@ async def run_session_scoring(session: AsyncSession, session_id: str, initiated_
     }
 
     created = 0
+    awarded_by_user: dict[str, Decimal] = defaultdict(Decimal)
     for prediction in predictions:
         for answer in by_prediction_answers.get(prediction.id, []):
             question = question_map.get(answer.question_instance_id)
@@ -127,7 +139,7 @@ async def run_session_scoring(session: AsyncSession, session_id: str, initiated_
             if rule is None:
                 continue
 
-            credits = allocation_map.get((prediction.id, question.id), 0)
+            credits = answer.credits or 0
             multiplier = confidence_multiplier_from_credits(credits)
             base_points = Decimal(rule.base_points)
             awarded = awarded_points_for_prediction(base_points, credits)
@@ -153,9 +165,361 @@ async def run_session_scoring(session: AsyncSession, session_id: str, initiated_
             )
             session.add(entry)
             existing_key.add(key)
+            awarded_by_user[prediction.user_id] += awarded
             created += 1
 
-    await _finalize_session_and_publish(session, target_session=target_session)
+    return created, awarded_by_user
+
+
+def _generated_id(dialect_name: str):
+    if dialect_name == "postgresql":
+        return cast(func.gen_random_uuid(), String)
+    return func.lower(func.hex(func.randomblob(16)))
+
+
+def _json_object(dialect_name: str, *pairs):
+    builder = func.jsonb_build_object if dialect_name == "postgresql" else func.json_object
+    return builder(*pairs, type_=JSON)
+
+
+async def _score_session_sql(session: AsyncSession, session_id: str, initiated_by: str) -> ScoringResult:
+    # One INSERT ... SELECT over answers/questions/rules. Points stay exact by
+    # multiplying integer base points by integer (100 + credits) before the single /100.
+    dialect_name = session.get_bind().dialect.name
+    credits = func.coalesce(PredictionAnswer.credits, 0)
+    hundred: ColumnClause[Any] = literal_column("100.0")
+    scored = (
+        select(
+            _generated_id(dialect_name),
+            Prediction.user_id,
+            Prediction.session_id,
+            QuestionInstance.id,
+            ScoringRule.base_points,
+            cast(100 + credits, Numeric(10, 2)) / hundred,
+            cast(ScoringRule.base_points * (100 + credits), Numeric(10, 2)) / hundred,
+            literal("SESSION_SCORE", String),
+            false(),
+            _json_object(
+                dialect_name,
+                "initiated_by",
+                literal(initiated_by, String),
+                "prediction_id",
+                Prediction.id,
+                "rule_id",
+                ScoringRule.id,
+                "credits",
+                credits,
+            ),
+            literal(_now(), DateTime(timezone=True)),
+        )
+        .select_from(PredictionAnswer)
+        .join(Prediction, Prediction.id == PredictionAnswer.prediction_id)
+        .join(
+            QuestionInstance,
+            and_(
+                QuestionInstance.id == PredictionAnswer.question_instance_id,
+                QuestionInstance.session_id == Prediction.session_id,
+            ),
+        )
+        .join(ScoringRule, ScoringRule.id == QuestionInstance.scoring_rule_id)
+        .where(
+            Prediction.session_id == session_id,
+            QuestionInstance.correct_option.is_not(None),
+            PredictionAnswer.selected_option == QuestionInstance.correct_option,
+        )
+    )
+    statement = (
+        dialect_insert(session, ScoreEntry.__table__)
+        .from_select(
+            [
+                "id",
+                "user_id",
+                "session_id",
+                "question_instance_id",
+                "base_points",
+                "confidence_multiplier",
+                "awarded_points",
+                "reason",
+                "is_correction",
+                "metadata_json",
+                "created_at",
+            ],
+            scored,
+        )
+        .on_conflict_do_nothing(index_elements=["user_id", "session_id", "question_instance_id", "reason"])
+        .returning(ScoreEntry.__table__.c.user_id, ScoreEntry.__table__.c.awarded_points)
+    )
+    inserted = (await session.execute(statement)).all()
+
+    awarded_by_user: dict[str, Decimal] = defaultdict(Decimal)
+    for user_id, awarded in inserted:
+        awarded_by_user[user_id] += Decimal(str(awarded)).quantize(Decimal("0.01"))
+    return len(inserted), awarded_by_user
+
+
+async def _score_session_numpy(session: AsyncSession, session_id: str, initiated_by: str) -> ScoringResult:
+    try:
+        from apex_predict.services.scoring_columnar import score_answer_columns
+    except ImportError as exc:
+        raise ScoringError("numpy_not_installed") from exc
+
+    questions = (
+        await session.execute(
+            select(
+                QuestionInstance.id,
+                QuestionInstance.correct_option,
+                ScoringRule.id,
+                ScoringRule.base_points,
+            )
+            .join(ScoringRule, ScoringRule.id == QuestionInstance.scoring_rule_id)
+            .where(QuestionInstance.session_id == session_id, QuestionInstance.correct_option.is_not(None))
+        )
+    ).all()
+    if not questions:
+        return 0, {}
+    question_ids, correct_options, rule_ids, base_points = zip(*questions, strict=True)
+
+    already_scored = (
+        select(ScoreEntry.id)
+        .where(
+            ScoreEntry.user_id == Prediction.user_id,
+            ScoreEntry.session_id == session_id,
+            ScoreEntry.question_instance_id == PredictionAnswer.question_instance_id,
+            ScoreEntry.reason == "SESSION_SCORE",
+        )
+        .exists()
+    )
+    answers = (
+        await session.execute(
+            select(
+                Prediction.id,
+                Prediction.user_id,
+                PredictionAnswer.question_instance_id,
+                PredictionAnswer.selected_option,
+                func.coalesce(PredictionAnswer.credits, 0),
+            )
+            .join(PredictionAnswer, PredictionAnswer.prediction_id == Prediction.id)
+            .where(Prediction.session_id == session_id, ~already_scored)
+        )
+    ).all()
+    if not answers:
+        return 0, {}
+    prediction_ids, user_ids, answer_question_ids, selected_options, credits = zip(*answers, strict=True)
+
+    rows, base, multiplier_cents, awarded_cents = score_answer_columns(
+        question_ids=question_ids,
+        correct_options=correct_options,
+        base_points=base_points,
+        answer_question_ids=answer_question_ids,
+        selected_options=selected_options,
+        credits=credits,
+    )
+
+    rule_by_question = dict(zip(question_ids, rule_ids, strict=True))
+    awarded_by_user: dict[str, Decimal] = defaultdict(Decimal)
+    entries: list[dict] = []
+    for row, row_base, row_multiplier, row_awarded in zip(
+        rows.tolist(), base.tolist(), multiplier_cents.tolist(), awarded_cents.tolist(), strict=True
+    ):
+        user_id = user_ids[row]
+        question_id = answer_question_ids[row]
+        entries.append(
+            {
+                "user_id": user_id,
+                "session_id": session_id,
+                "question_instance_id": question_id,
+                "base_points": float(row_base),
+                "confidence_multiplier": row_multiplier / 100,
+                "awarded_points": row_awarded / 100,
+                "reason": "SESSION_SCORE",
+                "metadata_json": {
+                    "initiated_by": initiated_by,
+                    "prediction_id": prediction_ids[row],
+                    "rule_id": rule_by_question[question_id],
+                    "credits": int(credits[row]),
+                },
+            }
+        )
+        awarded_by_user[user_id] += Decimal(row_awarded).scaleb(-2)
+
+    for start in range(0, len(entries), SCORE_INSERT_BATCH_SIZE):
+        await session.execute(insert(ScoreEntry), entries[start : start + SCORE_INSERT_BATCH_SIZE])
+    return len(entries), awarded_by_user
+
+
+async def _score_session_stream(session: AsyncSession, session_id: str, initiated_by: str) -> ScoringResult:
+    # Walks predictions in keyset-ordered chunks of Core rows so memory stays bounded by the
+    # chunk size: each chunk's entries are inserted and its point totals applied before the
+    # next chunk is fetched, so nothing per-user is carried across chunks.
+    chunk_size = max(get_settings().scoring_chunk_size, 1)
+    questions = (
+        await session.execute(
+            select(
+                QuestionInstance.id,
+                QuestionInstance.correct_option,
+                ScoringRule.id,
+                ScoringRule.base_points,
+            )
+            .join(ScoringRule, ScoringRule.id == QuestionInstance.scoring_rule_id)
+            .where(QuestionInstance.session_id == session_id, QuestionInstance.correct_option.is_not(None))
+        )
+    ).all()
+    if not questions:
+        return 0, {}
+    question_map = {question_id: (correct, rule_id, base) for question_id, correct, rule_id, base in questions}
+    target_session = await session.get(Session, session_id)
+    season_id = await _season_id_for(session, target_session) if target_session is not None else None
+
+    progress_key = f"scoring-progress:{session_id}"
+    payload = {"session_id": session_id, "chunk_size": chunk_size}
+    chunks = 0
+    predictions_scored = 0
+    entries_created = 0
+    last_prediction_id: str | None = None
+    progress_job: JobRun | None = None
+    progress_written_at = 0.0
+    while True:
+        chunk_query = select(Prediction.id, Prediction.user_id).where(Prediction.session_id == session_id)
+        if last_prediction_id is not None:
+            chunk_query = chunk_query.where(Prediction.id > last_prediction_id)
+        chunk = (await session.execute(chunk_query.order_by(Prediction.id).limit(chunk_size))).all()
+        if not chunk:
+            break
+        last_prediction_id = chunk[-1][0]
+        user_by_prediction = dict(chunk)
+
+        answers = (
+            await session.execute(
+                select(
+                    PredictionAnswer.prediction_id,
+                    PredictionAnswer.question_instance_id,
+                    PredictionAnswer.selected_option,
+                    func.coalesce(PredictionAnswer.credits, 0),
+                )
+                .where(PredictionAnswer.prediction_id.in_(user_by_prediction))
+            )
+        ).all()
+        existing_key: set[tuple[str, str]] = {
+            (user_id, question_id)
+            for user_id, question_id in (
+                await session.execute(
+                    select(ScoreEntry.user_id, ScoreEntry.question_instance_id).where(
+                        ScoreEntry.session_id == session_id,
+                        ScoreEntry.reason == "SESSION_SCORE",
+                        ScoreEntry.user_id.in_(set(user_by_prediction.values())),
+                    )
+                )
+            ).all()
+        }
+
+        entries: list[dict] = []
+        chunk_awarded: dict[str, Decimal] = defaultdict(Decimal)
+        for prediction_id, question_id, selected_option, credits in answers:
+            question = question_map.get(question_id)
+            if question is None or selected_option != question[0]:
+                continue
+            user_id = user_by_prediction[prediction_id]
+            if (user_id, question_id) in existing_key:
+                continue
+            existing_key.add((user_id, question_id))
+            base_points = Decimal(question[2])
+            awarded = awarded_points_for_prediction(base_points, credits)
+            entries.append(
+                {
+                    "user_id": user_id,
+                    "session_id": session_id,
+                    "question_instance_id": question_id,
+                    "base_points": float(base_points),
+                    "confidence_multiplier": float(confidence_multiplier_from_credits(credits)),
+                    "awarded_points": float(awarded),
+                    "reason": "SESSION_SCORE",
+                    "metadata_json": {
+                        "initiated_by": initiated_by,
+                        "prediction_id": prediction_id,
+                        "rule_id": question[1],
+                        "credits": credits,
+                    },
+                }
+            )
+            chunk_awarded[user_id] += awarded
+        if entries:
+            await session.execute(insert(ScoreEntry), entries)
+            await increment_user_totals(session, season_id=season_id, deltas=chunk_awarded)
+
+        chunks += 1
+        predictions_scored += len(chunk)
+        entries_created += len(entries)
+        now = time.monotonic()
+        if progress_job is None or now - progress_written_at >= SCORING_PROGRESS_INTERVAL_SECONDS:
+            progress = {
+                "chunks": chunks,
+                "predictions_scored": predictions_scored,
+                "entries_created": entries_created,
+                "last_prediction_id": last_prediction_id,
+            }
+            if progress_job is None:
+                progress_job = await record_job_run(
+                    session,
+                    idempotency_key=progress_key,
+                    job_type="session_scoring_progress",
+                    status=JobStatus.RUNNING,
+                    payload_json=payload,
+                    result_json=progress,
+                )
+            else:
+                # Picked up by the next chunk's autoflush; no extra round trip.
+                progress_job.result_json = progress
+            progress_written_at = now
+
+    await record_job_run(
+        session,
+        idempotency_key=progress_key,
+        job_type="session_scoring_progress",
+        status=JobStatus.SUCCESS,
+        payload_json=payload,
+        result_json={
+            "chunks": chunks,
+            "predictions_scored": predictions_scored,
+            "entries_created": entries_created,
+            "last_prediction_id": last_prediction_id,
+        },
+    )
+    return entries_created, None
+
+
+SCORING_ENGINES = {
+    "python": _score_session_python,
+    "sql": _score_session_sql,
+    "numpy": _score_session_numpy,
+    "stream": _score_session_stream,
+}
+
+
+async def run_session_scoring(
+    session: AsyncSession,
+    session_id: str,
+    initiated_by: str,
+    *,
+    engine: str | None = None,
+) -> int:
+    scorer = SCORING_ENGINES.get(engine or get_settings().scoring_engine)
+    if scorer is None:
+        raise ScoringError("unknown_scoring_engine")
+
+    target_session = await session.get(Session, session_id)
+    if target_session is None:
+        raise ScoringError("session_not_found")
+
+    target_session.state = SessionState.SCORING
+    await session.flush()
+    session_catalog.invalidate_on_commit(session, session_id)
+
+    created, awarded_by_user = await scorer(session, session_id, initiated_by)
+    await _finalize_session_and_publish(
+        session,
+        target_session=target_session,
+        awarded_by_user=awarded_by_user,
+    )
     return created
 
 
@@ -196,10 +560,14 @@ async def lock_expired_sessions(session: AsyncSession) -> int:
             )
         )
     ).all()
-    for row in sessions:
+    # Sessions some API write buffer has not drained yet stay open until a later pass.
+    drained = await drained_session_ids(session, sessions) if sessions else set()
+    locked = [row for row in sessions if row.id in drained]
+    for row in locked:
         row.state = SessionState.LOCKED
+        session_catalog.invalidate_on_commit(session, row.id)
     await session.flush()
-    return len(sessions)
+    return len(locked)
 
 
 async def auto_open_scheduled_sessions(session: AsyncSession) -> int:
@@ -211,6 +579,7 @@ async def auto_open_scheduled_sessions(session: AsyncSession) -> int:
     ).all()
     for row in sessions:
         row.state = SessionState.OPEN
+        session_catalog.invalidate_on_commit(session, row.id)
     await session.flush()
     return len(sessions)
 
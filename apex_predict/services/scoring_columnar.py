@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import numpy as np
+
+
+def award_cents(base_points: np.ndarray, credits: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Integer-cent equivalent of awarded_points_for_prediction: the multiplier is exactly
+    # (100 + credits) / 100, so base * (100 + credits) is already the quantized cent value.
+    if (credits < 0).any():
+        raise ValueError("credits_must_be_non_negative")
+    if (base_points < 0).any():
+        raise ValueError("base_points_must_be_non_negative")
+    multiplier_cents = credits.astype(np.int64) + 100
+    return multiplier_cents, base_points.astype(np.int64) * multiplier_cents
+
+
+def score_answer_columns(
+    *,
+    question_ids: Sequence[str],
+    correct_options: Sequence[str],
+    base_points: Sequence[int],
+    answer_question_ids: Sequence[str],
+    selected_options: Sequence[str],
+    credits: Sequence[int],
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    question_index = {question_id: position for position, question_id in enumerate(question_ids)}
+    answer_question = np.fromiter(
+        (question_index.get(question_id, -1) for question_id in answer_question_ids),
+        dtype=np.int64,
+        count=len(answer_question_ids),
+    )
+    known = answer_question >= 0
+    lookup = np.where(known, answer_question, 0)
+
+    correct = np.asarray(correct_options, dtype=object)
+    selected = np.asarray(selected_options, dtype=object)
+    mask = known.copy()
+    if len(correct):
+        mask &= selected == correct[lookup]
+
+    rows = np.flatnonzero(mask)
+    base = np.asarray(base_points, dtype=np.int64)[lookup[rows]]
+    multiplier_cents, awarded = award_cents(base, np.asarray(credits, dtype=np.int64)[rows])
+    return rows, base, multiplier_cents, awarded
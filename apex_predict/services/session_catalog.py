@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session as OrmSession
+
+from apex_predict.config import get_settings
+from apex_predict.enums import SessionState
+from apex_predict.models import QuestionInstance, Session
+from apex_predict.schemas import PredictionQuestion
+
+PENDING_INVALIDATIONS_KEY = "pending_session_catalog_invalidations"
+
+
+@dataclass(frozen=True)
+class SessionCatalog:
+    session_id: str
+    version: int
+    state: SessionState
+    lock_at: datetime
+    questions: tuple[PredictionQuestion, ...]
+    options: dict[str, frozenset[str]]
+    loaded_at: float
+
+
+def _coerce_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+class SessionCatalogCache:
+    # Per-session (state, lock_at, question options) used by submission validation and
+    # GET /sessions/{id}/questions. In-process writers invalidate explicitly; the TTL bounds
+    # staleness for changes made by other processes (e.g. the worker locking sessions).
+    def __init__(self, *, ttl_seconds: float) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._entries: dict[str, SessionCatalog] = {}
+        self._version = 0
+
+    def invalidate(self, session_id: str | None = None) -> None:
+        if session_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(session_id, None)
+
+    def invalidate_on_commit(self, db: AsyncSession, session_id: str) -> None:
+        # Dropping the entry before commit lets a concurrent reader re-cache the old state.
+        db.info.setdefault(PENDING_INVALIDATIONS_KEY, set()).add(session_id)
+
+    async def get(self, db: AsyncSession, session_id: str) -> SessionCatalog | None:
+        cached = self._entries.get(session_id)
+        if cached is not None and time.monotonic() - cached.loaded_at < self.ttl_seconds:
+            return cached
+
+        session_obj = await db.get(Session, session_id, populate_existing=True)
+        if session_obj is None:
+            self._entries.pop(session_id, None)
+            return None
+        questions = (
+            await db.scalars(
+                select(QuestionInstance)
+                .where(QuestionInstance.session_id == session_id)
+                .order_by(QuestionInstance.created_at.asc())
+            )
+        ).all()
+
+        self._version += 1
+        catalog = SessionCatalog(
+            session_id=session_id,
+            version=self._version,
+            state=session_obj.state,
+            lock_at=_coerce_utc(session_obj.lock_at),
+            questions=tuple(PredictionQuestion.model_validate(item, from_attributes=True) for item in questions),
+            options={item.id: frozenset(item.options) for item in questions},
+            loaded_at=time.monotonic(),
+        )
+        if self.ttl_seconds > 0:
+            self._entries[session_id] = catalog
+        return catalog
+
+
+session_catalog = SessionCatalogCache(ttl_seconds=get_settings().session_catalog_ttl_seconds)
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _apply_pending_invalidations(session: OrmSession) -> None:
+    for session_id in session.info.pop(PENDING_INVALIDATIONS_KEY, ()):
+        session_catalog.invalidate(session_id)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _discard_pending_invalidations(session: OrmSession) -> None:
+    session.info.pop(PENDING_INVALIDATIONS_KEY, None)
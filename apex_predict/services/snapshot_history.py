@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import cast
+
+from sqlalchemy import CursorResult, delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from apex_predict.config import get_settings
+from apex_predict.enums import LeaderboardScope, SnapshotKind
+from apex_predict.models import LeaderboardSnapshot, LeagueSnapshot, uuid_str
+
+DELTA_FIELDS = ("rank", "username", "total_points")
+
+
+def _now_utc() -> datetime:
+    return datetime.now(tz=timezone.utc)
+
+
+def diff_league_rows(keyframe_rows: list[dict], rows: list[dict]) -> list[dict]:
+    previous = {row["user_id"]: row for row in keyframe_rows}
+    delta: list[dict] = []
+    for row in rows:
+        before = previous.pop(row["user_id"], None)
+        if before is None or any(before.get(field) != row.get(field) for field in DELTA_FIELDS):
+            delta.append(row)
+    delta.extend({"user_id": user_id, "removed": True} for user_id in previous)
+    return delta
+
+
+def apply_league_delta(keyframe_rows: list[dict], delta_rows: list[dict]) -> list[dict]:
+    standings = {row["user_id"]: row for row in keyframe_rows}
+    for row in delta_rows:
+        if row.get("removed"):
+            standings.pop(row["user_id"], None)
+        else:
+            standings[row["user_id"]] = row
+    return sorted(standings.values(), key=lambda row: row["rank"])
+
+
+def _keyframe_row(league_id: str, rows: list[dict], *, computed_at: datetime) -> dict:
+    return {
+        "id": uuid_str(),
+        "league_id": league_id,
+        "computed_at": computed_at,
+        "kind": SnapshotKind.KEYFRAME,
+        "base_snapshot_id": None,
+        "sequence": 0,
+        "rows_json": rows,
+    }
+
+
+async def _latest_league_snapshots(session: AsyncSession, league_ids: list[str]) -> dict[str, LeagueSnapshot]:
+    position = (
+        func.row_number()
+        .over(partition_by=LeagueSnapshot.league_id, order_by=LeagueSnapshot.computed_at.desc())
+        .label("position")
+    )
+    ranked = (
+        select(LeagueSnapshot.id, position).where(LeagueSnapshot.league_id.in_(league_ids)).subquery()
+    )
+    latest = (
+        await session.scalars(
+            select(LeagueSnapshot).join(ranked, ranked.c.id == LeagueSnapshot.id).where(ranked.c.position == 1)
+        )
+    ).all()
+    return {snapshot.league_id: snapshot for snapshot in latest}
+
+
+async def build_league_snapshot_rows(
+    session: AsyncSession,
+    standings: dict[str, list[dict]],
+    *,
+    computed_at: datetime,
+) -> list[dict]:
+    settings = get_settings()
+    if settings.league_snapshot_mode != "delta":
+        return [_keyframe_row(league_id, rows, computed_at=computed_at) for league_id, rows in standings.items()]
+
+    latest = await _latest_league_snapshots(session, list(standings))
+    keyframe_ids = {
+        snapshot.id if snapshot.kind == SnapshotKind.KEYFRAME else snapshot.base_snapshot_id
+        for snapshot in latest.values()
+    } - {None}
+    keyframe_rows = {
+        row.id: row.rows_json
+        for row in (
+            await session.execute(
+                select(LeagueSnapshot.id, LeagueSnapshot.rows_json).where(LeagueSnapshot.id.in_(keyframe_ids))
+            )
+        ).all()
+    }
+
+    interval = max(settings.league_snapshot_keyframe_interval, 1)
+    snapshot_rows: list[dict] = []
+    for league_id, rows in standings.items():
+        previous = latest.get(league_id)
+        keyframe_id = None
+        if previous is not None:
+            keyframe_id = previous.id if previous.kind == SnapshotKind.KEYFRAME else previous.base_snapshot_id
+        sequence = previous.sequence + 1 if previous is not None else 0
+        if keyframe_id not in keyframe_rows or sequence >= interval:
+            snapshot_rows.append(_keyframe_row(league_id, rows, computed_at=computed_at))
+            continue
+        snapshot_rows.append(
+            {
+                "id": uuid_str(),
+                "league_id": league_id,
+                "computed_at": computed_at,
+                "kind": SnapshotKind.DELTA,
+                "base_snapshot_id": keyframe_id,
+                "sequence": sequence,
+                "rows_json": diff_league_rows(keyframe_rows[keyframe_id], rows),
+            }
+        )
+    return snapshot_rows
+
+
+async def league_standings_at(
+    session: AsyncSession,
+    league_id: str,
+    at: datetime | None = None,
+) -> tuple[LeagueSnapshot, list[dict]] | None:
+    query = select(LeagueSnapshot).where(LeagueSnapshot.league_id == league_id)
+    if at is not None:
+        query = query.where(LeagueSnapshot.computed_at <= at)
+    snapshot = await session.scalar(query.order_by(LeagueSnapshot.computed_at.desc()).limit(1))
+    if snapshot is None:
+        return None
+    if snapshot.kind == SnapshotKind.KEYFRAME:
+        return snapshot, list(snapshot.rows_json)
+
+    keyframe_rows = await session.scalar(
+        select(LeagueSnapshot.rows_json).where(LeagueSnapshot.id == snapshot.base_snapshot_id)
+    )
+    if keyframe_rows is None:
+        return None
+    return snapshot, apply_league_delta(keyframe_rows, snapshot.rows_json)
+
+
+async def compact_snapshot_history(
+    session: AsyncSession,
+    *,
+    retention_days: float | None = None,
+) -> dict[str, int]:
+    settings = get_settings()
+    days = settings.league_snapshot_retention_days if retention_days is None else retention_days
+    cutoff = _now_utc() - timedelta(days=max(days, 0))
+
+    # Always keep each league's newest snapshot and every keyframe a retained delta points at.
+    latest_position = (
+        func.row_number()
+        .over(partition_by=LeagueSnapshot.league_id, order_by=LeagueSnapshot.computed_at.desc())
+        .label("position")
+    )
+    ranked = select(LeagueSnapshot.id, latest_position).subquery()
+    latest_ids = select(ranked.c.id).where(ranked.c.position == 1)
+    retained_bases = select(LeagueSnapshot.base_snapshot_id).where(
+        LeagueSnapshot.base_snapshot_id.is_not(None),
+        (LeagueSnapshot.computed_at >= cutoff) | LeagueSnapshot.id.in_(latest_ids),
+    )
+    league_result = await session.execute(
+        delete(LeagueSnapshot).where(
+            LeagueSnapshot.computed_at < cutoff,
+            LeagueSnapshot.id.not_in(latest_ids),
+            LeagueSnapshot.id.not_in(retained_bases),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    scope_position = (
+        func.row_number()
+        .over(partition_by=LeaderboardSnapshot.scope_id, order_by=LeaderboardSnapshot.computed_at.desc())
+        .label("position")
+    )
+    scope_ranked = (
+        select(LeaderboardSnapshot.id, scope_position)
+        .where(LeaderboardSnapshot.scope == LeaderboardScope.LEAGUE)
+        .subquery()
+    )
+    scope_latest_ids = select(scope_ranked.c.id).where(scope_ranked.c.position == 1)
+    scope_result = await session.execute(
+        delete(LeaderboardSnapshot).where(
+            LeaderboardSnapshot.scope == LeaderboardScope.LEAGUE,
+            LeaderboardSnapshot.computed_at < cutoff,
+            LeaderboardSnapshot.id.not_in(scope_latest_ids),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await session.flush()
+    return {
+        # DELETE returns a CursorResult; Session.execute is only typed as Result.
+        "league_snapshots_deleted": cast(CursorResult, league_result).rowcount or 0,
+        "leaderboard_snapshots_deleted": cast(CursorResult, scope_result).rowcount or 0,
+    }
@@ -7,12 +7,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from apex_predict.enums import JobStatus
 from apex_predict.models import Event, ProviderSyncLog
-from apex_predict.providers.router import ProviderRouter
+from apex_predict.providers.router import provider_router
 from apex_predict.services.ai import get_or_create_preview
-from apex_predict.services.ingestion import auto_finalize_ended_sessions
+from apex_predict.services.idempotency import purge_expired_idempotency_records
+from apex_predict.services.ingestion import auto_finalize_ended_sessions, ingest_live_sessions
 from apex_predict.services.scoring import auto_open_scheduled_sessions, lock_expired_sessions
-
-provider_router = ProviderRouter()
+from apex_predict.services.snapshot_history import compact_snapshot_history
 
 
 def now_utc() -> datetime:
@@ -26,9 +26,14 @@ async def run_session_state_jobs(db: AsyncSession) -> dict[str, int]:
     return {"opened": opened, "locked": locked}
 
 
-async def run_provider_health_job(db: AsyncSession) -> dict[str, str]:
+async def run_provider_health_job(db: AsyncSession) -> dict:
+    # Publishes circuit-breaker state gathered from real provider calls; no probe request is made.
     active = await provider_router.active_provider()
-    details = f"active={active.name}"
+    breakers = provider_router.breaker_states()
+    details = " ".join(
+        [f"active={active.name}"]
+        + [f"{name}={state['state']}/failures={state['recent_failures']}" for name, state in breakers.items()]
+    )
     db.add(
         ProviderSyncLog(
             provider_name=active.name,
@@ -38,7 +43,7 @@ async def run_provider_health_job(db: AsyncSession) -> dict[str, str]:
         )
     )
     await db.flush()
-    return {"active_provider": active.name}
+    return {"active_provider": active.name, "breakers": breakers}
 
 
 async def run_ai_previews_job(db: AsyncSession) -> dict[str, int]:
@@ -61,3 +66,15 @@ async def run_auto_finalize_sessions_job(db: AsyncSession) -> dict[str, int]:
         initiated_by="worker:auto-finalize",
         provider_router=provider_router,
     )
+
+
+async def run_live_ingestion_job(db: AsyncSession) -> dict[str, int]:
+    return await ingest_live_sessions(db, provider_router=provider_router)
+
+
+async def run_snapshot_retention_job(db: AsyncSession) -> dict[str, int]:
+    return await compact_snapshot_history(db)
+
+
+async def run_idempotency_purge_job(db: AsyncSession) -> dict[str, int]:
+    return await purge_expired_idempotency_records(db)
@@ -4,11 +4,15 @@ from fastapi import FastAPI
 
 from apex_predict.config import get_settings
 from apex_predict.db import AsyncSessionLocal, init_db
+from apex_predict.providers.router import provider_router
 from apex_predict.worker.jobs import (
     run_ai_previews_job,
     run_auto_finalize_sessions_job,
+    run_idempotency_purge_job,
+    run_live_ingestion_job,
     run_provider_health_job,
     run_session_state_jobs,
+    run_snapshot_retention_job,
 )
 from apex_predict.worker.scheduler import ScheduledJob, WorkerScheduler
 
@@ -35,6 +39,21 @@ scheduler = WorkerScheduler(
             interval_seconds=settings.worker_auto_finalize_interval_seconds,
             runner=run_auto_finalize_sessions_job,
         ),
+        ScheduledJob(
+            name="live-ingestion",
+            interval_seconds=settings.worker_live_ingestion_interval_seconds,
+            runner=run_live_ingestion_job,
+        ),
+        ScheduledJob(
+            name="snapshot-retention",
+            interval_seconds=settings.worker_snapshot_retention_interval_seconds,
+            runner=run_snapshot_retention_job,
+        ),
+        ScheduledJob(
+            name="idempotency-purge",
+            interval_seconds=settings.worker_idempotency_purge_interval_seconds,
+            runner=run_idempotency_purge_job,
+        ),
     ],
     session_factory=AsyncSessionLocal,
     startup_delay_seconds=settings.worker_startup_delay_seconds,
@@ -43,11 +62,13 @@ scheduler = WorkerScheduler(
 @asynccontextmanager
 async def lifespan(_: FastAPI):
     await init_db()
+    provider_router.open()
     if settings.worker_scheduler_enabled:
         await scheduler.start()
     yield
     if settings.worker_scheduler_enabled:
         await scheduler.stop()
+    await provider_router.aclose()
 
 
 app = FastAPI(title="Apex Predict Worker", lifespan=lifespan)
@@ -94,6 +115,30 @@ async def auto_finalize_sessions_job() -> dict:
         return result
 
 
+@app.post("/jobs/live-ingestion")
+async def live_ingestion_job() -> dict:
+    async with AsyncSessionLocal() as db:
+        result = await run_live_ingestion_job(db)
+        await db.commit()
+        return result
+
+
+@app.post("/jobs/snapshot-retention")
+async def snapshot_retention_job() -> dict:
+    async with AsyncSessionLocal() as db:
+        result = await run_snapshot_retention_job(db)
+        await db.commit()
+        return result
+
+
+@app.post("/jobs/idempotency-purge")
+async def idempotency_purge_job() -> dict:
+    async with AsyncSessionLocal() as db:
+        result = await run_idempotency_purge_job(db)
+        await db.commit()
+        return result
+
+
 @app.post("/jobs/scoring-candidates")
 async def scoring_candidates_compat_job() -> dict:
     async with AsyncSessionLocal() as db:
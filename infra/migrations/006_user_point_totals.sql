@@ -0,0 +1,40 @@
+-- Materialized running point totals maintained by session scoring.
+-- profiles.total_points holds the all-time total; user_season_totals holds per-season totals.
+
+create table if not exists user_season_totals (
+  id text primary key,
+  user_id text not null references users(id),
+  season_id text not null references seasons(id),
+  total_points numeric(10,2) not null default 0,
+  updated_at timestamptz not null default now(),
+  constraint uq_user_season_total unique(user_id, season_id)
+);
+
+create index if not exists idx_user_season_totals_user_id on user_season_totals(user_id);
+create index if not exists idx_user_season_totals_season_id on user_season_totals(season_id);
+
+-- Backfill from existing score entries.
+update profiles p
+set total_points = coalesce(s.total_points, 0)
+from (
+  select user_id, sum(awarded_points) as total_points
+  from score_entries
+  group by user_id
+) s
+where s.user_id = p.user_id;
+
+insert into user_season_totals (id, user_id, season_id, total_points, updated_at)
+select gen_random_uuid()::text, se.user_id, e.season_id, sum(se.awarded_points), now()
+from score_entries se
+join sessions s on s.id = se.session_id
+join events e on e.id = s.event_id
+group by se.user_id, e.season_id
+on conflict (user_id, season_id) do update set total_points = excluded.total_points, updated_at = now();
+
+alter table if exists user_season_totals enable row level security;
+
+drop policy if exists user_season_totals_deny_all on user_season_totals;
+create policy user_season_totals_deny_all on user_season_totals
+for all
+using (false)
+with check (false);
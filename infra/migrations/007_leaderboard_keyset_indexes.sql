@@ -0,0 +1,10 @@
+-- Indexes backing keyset pagination of leaderboards on (total_points desc, user_id).
+
+create index if not exists ix_profiles_leaderboard
+on profiles (total_points desc, user_id);
+
+create index if not exists ix_user_season_totals_leaderboard
+on user_season_totals (season_id, total_points desc, user_id);
+
+create index if not exists ix_leaderboard_snapshots_latest
+on leaderboard_snapshots (scope, scope_id, computed_at desc);
@@ -0,0 +1,19 @@
+-- Delta-encoded league snapshot history: periodic keyframes hold full standings,
+-- deltas hold only rows whose rank/points changed relative to their keyframe.
+
+do $$
+begin
+  if not exists (select 1 from pg_type where typname = 'snapshot_kind') then
+    create type snapshot_kind as enum ('KEYFRAME', 'DELTA');
+  end if;
+end $$;
+
+alter table if exists league_snapshots
+  add column if not exists kind snapshot_kind not null default 'KEYFRAME';
+alter table if exists league_snapshots
+  add column if not exists base_snapshot_id text references league_snapshots(id);
+alter table if exists league_snapshots
+  add column if not exists sequence integer not null default 0;
+
+create index if not exists ix_league_snapshots_base_snapshot_id on league_snapshots(base_snapshot_id);
+create index if not exists ix_league_snapshots_history on league_snapshots(league_id, computed_at);
@@ -0,0 +1,4 @@
+-- Index backing keyset pagination of /v1/users/me/predictions on (updated_at desc, id desc).
+
+create index if not exists ix_predictions_user_history
+on predictions (user_id, updated_at desc, id desc);
@@ -0,0 +1,18 @@
+-- One confidence allocation per (prediction, question) so edits can upsert in place.
+
+delete from prediction_confidence_allocations a
+using prediction_confidence_allocations b
+where a.prediction_id = b.prediction_id
+  and a.question_instance_id = b.question_instance_id
+  and a.id < b.id;
+
+do $$
+begin
+  if not exists (
+    select 1 from pg_constraint where conname = 'uq_allocation_prediction_question'
+  ) then
+    alter table prediction_confidence_allocations
+      add constraint uq_allocation_prediction_question unique (prediction_id, question_instance_id);
+  end if;
+end
+$$;
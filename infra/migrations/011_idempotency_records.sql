@@ -0,0 +1,24 @@
+-- Stored responses for Idempotency-Key replays of prediction submissions.
+
+create table if not exists idempotency_records (
+  id text primary key,
+  user_id text not null references users(id),
+  idempotency_key text not null,
+  request_hash text not null,
+  status_code integer not null,
+  response_json jsonb not null default '{}'::jsonb,
+  created_at timestamptz not null default now(),
+  expires_at timestamptz not null,
+  constraint uq_idempotency_user_key unique(user_id, idempotency_key)
+);
+
+create index if not exists idx_idempotency_records_user_id on idempotency_records(user_id);
+create index if not exists idx_idempotency_records_expires_at on idempotency_records(expires_at);
+
+alter table if exists idempotency_records enable row level security;
+
+drop policy if exists idempotency_records_deny_all on idempotency_records;
+create policy idempotency_records_deny_all on idempotency_records
+for all
+using (false)
+with check (false);
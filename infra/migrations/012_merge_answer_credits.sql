@@ -0,0 +1,17 @@
+-- Confidence credits live on the answer row; the separate allocation table is retired.
+
+alter table prediction_answers add column if not exists credits integer not null default 0;
+
+do $$
+begin
+  if to_regclass('public.prediction_confidence_allocations') is not null then
+    update prediction_answers pa
+    set credits = a.credits
+    from prediction_confidence_allocations a
+    where a.prediction_id = pa.prediction_id
+      and a.question_instance_id = pa.question_instance_id;
+  end if;
+end
+$$;
+
+drop table if exists prediction_confidence_allocations;
@@ -0,0 +1,22 @@
+-- Running provider state for in-session ingestion, and provisional leaderboard snapshots.
+
+alter type leaderboard_scope add value if not exists 'PROVISIONAL';
+
+create table if not exists live_session_states (
+  session_id text primary key references sessions(id) on delete cascade,
+  provider_name text,
+  cursors_json jsonb not null default '{}'::jsonb,
+  rows_json jsonb not null default '{}'::jsonb,
+  facts_json jsonb not null default '{}'::jsonb,
+  provisional_json jsonb not null default '{}'::jsonb,
+  polls integer not null default 0,
+  updated_at timestamptz not null default now()
+);
+
+alter table if exists live_session_states enable row level security;
+
+drop policy if exists live_session_states_deny_all on live_session_states;
+create policy live_session_states_deny_all on live_session_states
+for all
+using (false)
+with check (false);
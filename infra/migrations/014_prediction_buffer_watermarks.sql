@@ -0,0 +1,16 @@
+-- Per-process drain reports from API prediction write buffers; the worker only locks a
+-- session once every live buffer has reported past its lock_at with nothing pending.
+
+create table if not exists prediction_buffer_watermarks (
+  buffer_id text primary key,
+  pending_lock_at timestamptz,
+  reported_at timestamptz not null default now()
+);
+
+alter table if exists prediction_buffer_watermarks enable row level security;
+
+drop policy if exists prediction_buffer_watermarks_deny_all on prediction_buffer_watermarks;
+create policy prediction_buffer_watermarks_deny_all on prediction_buffer_watermarks
+for all
+using (false)
+with check (false);
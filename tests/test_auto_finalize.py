@@ -6,12 +6,12 @@ from uuid import uuid4
 import pytest
 from sqlalchemy import func, select
 
-from apex_predict.enums import QuestionType, SessionState, SessionType
+from apex_predict.enums import JobStatus, QuestionType, SessionState, SessionType
 from apex_predict.models import (
     Event,
+    JobRun,
     Prediction,
     PredictionAnswer,
-    PredictionConfidenceAllocation,
     Profile,
     QuestionInstance,
     ScoreEntry,
@@ -24,7 +24,7 @@ from apex_predict.services.ingestion import auto_finalize_ended_sessions
 
 
 class FakeProviderRouter:
-    async def fetch_session_facts(self, session_external_id: str) -> tuple[str, dict]:
+    async def fetch_session_facts(self, session_external_id: str, **_: object) -> tuple[str, dict]:
         assert session_external_id == "openf1-session-77"
         return (
             "fake-openf1",
@@ -169,13 +169,6 @@ async def test_auto_finalize_session_ingests_all_categories_and_scores(db_sessio
                 user_id=user.id,
                 question_instance_id=question.id,
                 selected_option=answer_by_type[question.question_type],
-            )
-        )
-        db_session.add(
-            PredictionConfidenceAllocation(
-                id=str(uuid4()),
-                prediction_id=prediction.id,
-                question_instance_id=question.id,
                 credits=credits_by_type[question.question_type],
             )
         )
@@ -208,3 +201,84 @@ async def test_auto_finalize_session_ingests_all_categories_and_scores(db_sessio
         select(func.count()).select_from(ScoreEntry).where(ScoreEntry.session_id == session.id)
     )
     assert score_count == 9
+
+
+class IncompleteFactsRouter:
+    def __init__(self) -> None:
+        self.complete = False
+
+    async def fetch_session_facts(self, session_external_id: str, **_: object) -> tuple[str, dict]:
+        facts = {"winner": "NOR", "safety_car": True, "unavailable_facts": []}
+        if not self.complete:
+            # /race_control timed out: safety_car would otherwise read as "no".
+            facts.update(safety_car=False, unavailable_facts=["first_safety_car_lap", "safety_car"])
+        return "fake-openf1", facts
+
+
+@pytest.mark.anyio
+async def test_auto_finalize_retries_sessions_with_unavailable_facts(db_session):
+    season = Season(id=str(uuid4()), year=2026, is_current=True)
+    db_session.add(season)
+    start = now_utc() - timedelta(days=1)
+    event = Event(
+        id=str(uuid4()),
+        season_id=season.id,
+        name="Dutch GP",
+        slug=f"2026-dutch-{uuid4().hex[:6]}",
+        country="Netherlands",
+        start_at=start,
+        end_at=start + timedelta(hours=6),
+    )
+    db_session.add(event)
+    session = Session(
+        id=str(uuid4()),
+        event_id=event.id,
+        external_id="openf1-session-78",
+        provider_name="openf1",
+        name="Race",
+        session_type=SessionType.RACE,
+        state=SessionState.LOCKED,
+        starts_at=start,
+        lock_at=start,
+        ends_at=start + timedelta(hours=2),
+    )
+    db_session.add(session)
+    rule = ScoringRule(
+        id=str(uuid4()),
+        name=f"rule-safety-car-{uuid4().hex[:6]}",
+        question_type=QuestionType.SAFETY_CAR,
+        base_points=10,
+    )
+    db_session.add(rule)
+    await db_session.flush()
+    question = QuestionInstance(
+        id=str(uuid4()),
+        session_id=session.id,
+        question_type=QuestionType.SAFETY_CAR,
+        prompt="Safety car?",
+        options=["YES", "NO"],
+        lock_at=session.lock_at,
+        scoring_rule_id=rule.id,
+    )
+    db_session.add(question)
+    await db_session.commit()
+
+    router = IncompleteFactsRouter()
+    first = await auto_finalize_ended_sessions(db_session, initiated_by="test:auto", provider_router=router)
+    await db_session.commit()
+    assert first["finalized"] == 0
+    assert first["failed"] == 1
+    await db_session.refresh(session)
+    assert session.state == SessionState.LOCKED
+    job = await db_session.scalar(select(JobRun).where(JobRun.idempotency_key == f"auto-finalize:{session.id}"))
+    assert job.status == JobStatus.FAILED
+    assert "safety_car" in job.error_message
+
+    router.complete = True
+    second = await auto_finalize_ended_sessions(db_session, initiated_by="test:auto", provider_router=router)
+    await db_session.commit()
+    assert second["finalized"] == 1
+    await db_session.refresh(session)
+    await db_session.refresh(question)
+    assert session.state == SessionState.FINALIZED
+    assert question.correct_option == "YES"
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+
+from apex_predict.config import get_settings
+from apex_predict.enums import JoinPolicy, LeagueVisibility, SnapshotKind
+from apex_predict.models import League, LeagueMember, LeagueSnapshot, Profile, User
+from apex_predict.services.leaderboard import (
+    build_all_league_leaderboards,
+    build_league_leaderboard,
+    publish_leaderboard_snapshots,
+)
+from apex_predict.services.rank_index import global_rank_index
+from apex_predict.services.snapshot_history import compact_snapshot_history, league_standings_at
+
+
+async def _submit(client, seeded_core, user_headers, options: tuple[str, str]) -> None:
+    payload = {
+        "answers": [
+            {
+                "question_instance_id": seeded_core["question_one"],
+                "selected_option": options[0],
+                "confidence_credits": 50,
+            },
+            {
+                "question_instance_id": seeded_core["question_two"],
+                "selected_option": options[1],
+                "confidence_credits": 50,
+            },
+        ]
+    }
+    submit = await client.post(
+        f"/v1/sessions/{seeded_core['session_id']}/predictions",
+        json=payload,
+        headers=user_headers,
+    )
+    assert submit.status_code == 200
+
+
+@pytest.mark.anyio
+async def test_global_rank_me_and_around_windows(client, auth_headers, admin_headers, seeded_core):
+    await _submit(client, seeded_core, auth_headers, ("VER", "NOR"))
+    await _submit(client, seeded_core, {"X-User-Id": "user-beta"}, ("VER", "LEC"))
+    await _submit(client, seeded_core, {"X-User-Id": "user-gamma"}, ("LEC", "NOR"))
+    score = await client.post(
+        "/v1/admin/scoring/run",
+        json={"session_id": seeded_core["session_id"]},
+        headers=admin_headers,
+    )
+    assert score.status_code == 200
+
+    me = await client.get("/v1/leaderboards/global/me", headers={"X-User-Id": "user-gamma"})
+    assert me.status_code == 200
+    assert me.json()["rank"] == 2
+    assert me.json()["total_points"] == 37.5
+
+    around = await client.get(
+        "/v1/leaderboards/global",
+        params={"around": "user-gamma", "radius": 1},
+        headers=auth_headers,
+    )
+    assert around.status_code == 200
+    body = around.json()
+    assert [row["user_id"] for row in body["rows"]] == ["user-alpha", "user-gamma", "user-beta"]
+    assert body["version"]
+
+    unranked = await client.get("/v1/leaderboards/global/me", headers={"X-User-Id": "user-delta"})
+    assert unranked.status_code == 404
+    assert unranked.json()["detail"] == "not_ranked"
+
+
+@pytest.mark.anyio
+async def test_global_leaderboard_keyset_pagination(client, auth_headers, admin_headers, seeded_core):
+    await _submit(client, seeded_core, auth_headers, ("VER", "NOR"))
+    await _submit(client, seeded_core, {"X-User-Id": "user-beta"}, ("VER", "LEC"))
+    await _submit(client, seeded_core, {"X-User-Id": "user-gamma"}, ("LEC", "NOR"))
+    await client.post(
+        "/v1/admin/scoring/run",
+        json={"session_id": seeded_core["session_id"]},
+        headers=admin_headers,
+    )
+
+    seen: list[tuple[int, str]] = []
+    cursor = None
+    versions = set()
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        page = await client.get("/v1/leaderboards/global", params=params, headers=auth_headers)
+        assert page.status_code == 200
+        body = page.json()
+        versions.add(body["version"])
+        seen.extend((row["rank"], row["user_id"]) for row in body["rows"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == [(1, "user-alpha"), (2, "user-gamma"), (3, "user-beta")]
+    assert len(versions) == 1
+
+    first_page = await client.get("/v1/leaderboards/global", params={"limit": 1}, headers=auth_headers)
+    stale_cursor = first_page.json()["next_cursor"]
+    await client.post(
+        "/v1/admin/scoring/run",
+        json={"session_id": seeded_core["session_id"]},
+        headers=admin_headers,
+    )
+    stale = await client.get(
+        "/v1/leaderboards/global",
+        params={"limit": 1, "cursor": stale_cursor},
+        headers=auth_headers,
+    )
+    assert stale.status_code == 409
+    assert stale.json()["detail"] == "leaderboard_version_changed"
+
+    garbage = await client.get("/v1/leaderboards/global", params={"cursor": "not-a-cursor"}, headers=auth_headers)
+    assert garbage.status_code == 422
+    assert garbage.json()["detail"] == "invalid_cursor"
+
+
+@pytest.mark.anyio
+async def test_global_rank_index_only_follows_committed_snapshots(db_session):
+    db_session.add(User(id="rank-user"))
+    db_session.add(Profile(user_id="rank-user", username="rank-user", total_points=12))
+    await db_session.commit()
+    global_rank_index.load([], version="before-publish")
+
+    await publish_leaderboard_snapshots(db_session, session_id=None)
+    await db_session.rollback()
+    assert global_rank_index.version == "before-publish"
+    assert global_rank_index.row_for("rank-user") is None
+
+    await publish_leaderboard_snapshots(db_session, session_id=None)
+    await db_session.commit()
+    assert global_rank_index.version != "before-publish"
+    assert global_rank_index.row_for("rank-user")["rank"] == 1
+
+
+@pytest.mark.anyio
+async def test_batched_league_standings_match_per_league_builder(db_session):
+    points = {"u1": 10, "u2": 30, "u3": 30, "u4": 0}
+    for user_id, total in points.items():
+        db_session.add(User(id=user_id))
+        db_session.add(Profile(user_id=user_id, username=f"name-{user_id}", total_points=total))
+    memberships = {"league-a": ["u1", "u2", "u3"], "league-b": ["u4", "u1"], "league-empty": []}
+    for league_id, members in memberships.items():
+        db_session.add(
+            League(
+                id=league_id,
+                name=league_id,
+                visibility=LeagueVisibility.PUBLIC,
+                join_policy=JoinPolicy.OPEN,
+                created_by="u1",
+            )
+        )
+        for user_id in members:
+            db_session.add(LeagueMember(league_id=league_id, user_id=user_id))
+    await db_session.commit()
+
+    standings = await build_all_league_leaderboards(db_session)
+
+    assert set(standings) == set(memberships)
+    for league_id in memberships:
+        assert standings[league_id] == await build_league_leaderboard(db_session, league_id)
+    assert [row["user_id"] for row in standings["league-a"]] == ["u2", "u3", "u1"]
+    assert standings["league-empty"] == []
+
+
+@pytest.mark.anyio
+async def test_delta_snapshot_history_rebuilds_and_compacts(db_session, monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "league_snapshot_mode", "delta")
+    monkeypatch.setattr(settings, "league_snapshot_keyframe_interval", 3)
+
+    for user_id in ("u1", "u2", "u3"):
+        db_session.add(User(id=user_id))
+        db_session.add(Profile(user_id=user_id, username=user_id, total_points=0))
+    db_session.add(
+        League(
+            id="league-h",
+            name="History League",
+            visibility=LeagueVisibility.PUBLIC,
+            join_policy=JoinPolicy.OPEN,
+            created_by="u1",
+        )
+    )
+    for user_id in ("u1", "u2", "u3"):
+        db_session.add(LeagueMember(league_id="league-h", user_id=user_id))
+    await db_session.commit()
+
+    expected: list[list[dict]] = []
+    for round_points in ({"u1": 10, "u2": 5}, {"u3": 30}, {"u2": 40}, {"u1": 1}):
+        for user_id, delta in round_points.items():
+            profile = await db_session.get(Profile, user_id)
+            profile.total_points = Decimal(profile.total_points) + delta
+        await db_session.flush()
+        await publish_leaderboard_snapshots(db_session, session_id=None)
+        expected.append(await build_league_leaderboard(db_session, "league-h"))
+        await db_session.commit()
+
+    history = (
+        await db_session.scalars(
+            select(LeagueSnapshot).where(LeagueSnapshot.league_id == "league-h").order_by(LeagueSnapshot.sequence)
+        )
+    ).all()
+    kinds = sorted((snapshot.computed_at, snapshot.kind, snapshot.sequence) for snapshot in history)
+    assert [(kind, sequence) for _, kind, sequence in kinds] == [
+        (SnapshotKind.KEYFRAME, 0),
+        (SnapshotKind.DELTA, 1),
+        (SnapshotKind.DELTA, 2),
+        (SnapshotKind.KEYFRAME, 0),
+    ]
+
+    for (computed_at, _, _), standings in zip(kinds, expected, strict=True):
+        rebuilt = await league_standings_at(db_session, "league-h", at=computed_at)
+        assert rebuilt is not None
+        assert rebuilt[1] == standings
+
+    # Age everything except the newest keyframe; the delta chain is no longer needed.
+    cutoff_time = datetime.now(tz=timezone.utc) - timedelta(days=90)
+    for snapshot in history:
+        if snapshot.computed_at != kinds[-1][0]:
+            snapshot.computed_at = cutoff_time
+    await db_session.commit()
+
+    result = await compact_snapshot_history(db_session, retention_days=30)
+    await db_session.commit()
+    assert result["league_snapshots_deleted"] == 3
+
+    latest = await league_standings_at(db_session, "league-h")
+    assert latest is not None
+    assert latest[1] == expected[-1]
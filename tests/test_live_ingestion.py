@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+from apex_predict.enums import QuestionType, SessionState, SessionType
+from apex_predict.models import (
+    Event,
+    LiveSessionState,
+    Prediction,
+    PredictionAnswer,
+    Profile,
+    QuestionInstance,
+    ScoringRule,
+    Season,
+    Session,
+    User,
+)
+from apex_predict.services.ingestion import ingest_live_sessions, ingest_session_question_outcomes
+from apex_predict.services.leaderboard import get_provisional_leaderboard
+
+DRIVERS = [
+    {"driver_number": 1, "name_acronym": "VER", "team_name": "Red Bull Racing"},
+    {"driver_number": 4, "name_acronym": "NOR", "team_name": "McLaren"},
+]
+
+POLLS = [
+    {
+        "position": [
+            {"driver_number": 1, "date": "2026-03-01T14:00:00", "position": 1},
+            {"driver_number": 4, "date": "2026-03-01T14:00:00", "position": 2},
+        ],
+        "laps": [{"driver_number": 1, "date_start": "2026-03-01T14:00:00", "lap_duration": 82.1}],
+        "pit": [],
+        "race_control": [{"date": "2026-03-01T14:00:30", "message": "GREEN LIGHT", "lap_number": 1}],
+    },
+    {
+        "position": [
+            {"driver_number": 4, "date": "2026-03-01T14:20:00", "position": 1},
+            {"driver_number": 1, "date": "2026-03-01T14:20:00", "position": 2},
+        ],
+        "laps": [],
+        "pit": [{"driver_number": 4, "date": "2026-03-01T14:15:00", "lap_number": 9}],
+        "race_control": [{"date": "2026-03-01T14:10:00", "message": "SAFETY CAR DEPLOYED", "lap_number": 7}],
+    },
+    {"position": [], "laps": [], "pit": [], "race_control": []},
+]
+
+
+class FakeLiveRouter:
+    primary = SimpleNamespace(name="openf1")
+
+    def __init__(self) -> None:
+        self.calls: list[tuple[dict[str, str], bool]] = []
+        self.facts_calls = 0
+
+    async def fetch_session_updates(
+        self,
+        session_external_id: str,
+        cursors: dict[str, str],
+        *,
+        include_drivers: bool = False,
+    ) -> tuple[str, dict]:
+        assert session_external_id == "openf1-live-9"
+        self.calls.append((dict(cursors), include_drivers))
+        rows = dict(POLLS[min(len(self.calls), len(POLLS)) - 1])
+        if include_drivers:
+            rows["drivers"] = DRIVERS
+        return "openf1", {"rows": rows, "failed": []}
+
+    async def fetch_session_facts(self, session_external_id: str, **_: object) -> tuple[str, dict]:
+        self.facts_calls += 1
+        raise AssertionError("finalization should confirm from the live state")
+
+
+def now_utc() -> datetime:
+    return datetime.now(tz=timezone.utc)
+
+
+async def _seed_live_session(db_session) -> tuple[Session, dict[QuestionType, QuestionInstance]]:
+    season = Season(id=str(uuid4()), year=2026, is_current=True)
+    db_session.add(season)
+    start = now_utc() - timedelta(minutes=30)
+    event = Event(
+        id=str(uuid4()),
+        season_id=season.id,
+        name="Bahrain GP",
+        slug=f"2026-bahrain-{uuid4().hex[:6]}",
+        country="Bahrain",
+        start_at=start,
+        end_at=start + timedelta(hours=3),
+    )
+    db_session.add(event)
+    session = Session(
+        id=str(uuid4()),
+        event_id=event.id,
+        external_id="openf1-live-9",
+        provider_name="openf1",
+        name="Race",
+        session_type=SessionType.RACE,
+        state=SessionState.LOCKED,
+        starts_at=start,
+        lock_at=start,
+        ends_at=start + timedelta(hours=2),
+    )
+    db_session.add(session)
+
+    questions: dict[QuestionType, QuestionInstance] = {}
+    for qtype, options in [
+        (QuestionType.WINNER, ["VER", "NOR"]),
+        (QuestionType.SAFETY_CAR, ["YES", "NO"]),
+        (QuestionType.FIRST_PIT_STOP_TEAM, ["MCLAREN", "RED_BULL_RAC"]),
+    ]:
+        rule = ScoringRule(
+            id=str(uuid4()),
+            name=f"live-{qtype.value}-{uuid4().hex[:6]}",
+            question_type=qtype,
+            base_points=10,
+        )
+        db_session.add(rule)
+        await db_session.flush()
+        question = QuestionInstance(
+            id=str(uuid4()),
+            session_id=session.id,
+            question_type=qtype,
+            prompt=f"Prompt {qtype.value}",
+            options=options,
+            lock_at=session.lock_at,
+            scoring_rule_id=rule.id,
+        )
+        db_session.add(question)
+        questions[qtype] = question
+
+    picks = {
+        "live-ver": {
+            QuestionType.WINNER: "VER",
+            QuestionType.SAFETY_CAR: "NO",
+            QuestionType.FIRST_PIT_STOP_TEAM: "MCLAREN",
+        },
+        "live-nor": {
+            QuestionType.WINNER: "NOR",
+            QuestionType.SAFETY_CAR: "YES",
+            QuestionType.FIRST_PIT_STOP_TEAM: "MCLAREN",
+        },
+    }
+    for user_id, answers in picks.items():
+        db_session.add(User(id=user_id, email=f"{user_id}@example.com"))
+        db_session.add(Profile(user_id=user_id, username=user_id))
+        prediction = Prediction(id=str(uuid4()), user_id=user_id, session_id=session.id, client_version="test")
+        db_session.add(prediction)
+        await db_session.flush()
+        for qtype, option in answers.items():
+            db_session.add(
+                PredictionAnswer(
+                    id=str(uuid4()),
+                    prediction_id=prediction.id,
+                    user_id=user_id,
+                    question_instance_id=questions[qtype].id,
+                    selected_option=option,
+                    credits=0,
+                )
+            )
+    await db_session.commit()
+    return session, questions
+
+
+@pytest.mark.anyio
+async def test_live_ingestion_polls_incrementally_and_publishes_provisional_leaderboard(db_session):
+    session, questions = await _seed_live_session(db_session)
+    router = FakeLiveRouter()
+
+    first = await ingest_live_sessions(db_session, provider_router=router)
+    await db_session.commit()
+    assert first == {"candidates": 1, "polled": 1, "failed": 0, "provisional_outcomes": 2}
+
+    snapshot = await get_provisional_leaderboard(db_session, session.id)
+    assert snapshot is not None
+    assert [(row["user_id"], row["total_points"]) for row in snapshot.rows_json] == [
+        ("live-ver", 20.0),
+        ("live-nor", 0.0),
+    ]
+
+    await ingest_live_sessions(db_session, provider_router=router)
+    await db_session.commit()
+
+    assert router.calls[0] == ({}, True)
+    assert router.calls[1] == (
+        {
+            "position": "2026-03-01T14:00:00",
+            "laps": "2026-03-01T14:00:00",
+            "race_control": "2026-03-01T14:00:30",
+        },
+        False,
+    )
+
+    state = await db_session.get(LiveSessionState, session.id)
+    assert state is not None
+    assert state.polls == 2
+    assert state.cursors_json["pit"] == "2026-03-01T14:15:00"
+    assert state.facts_json["winner"] == "NOR"
+    assert state.facts_json["first_safety_car_lap"] == 7
+    assert state.provisional_json == {
+        questions[QuestionType.WINNER].id: "NOR",
+        questions[QuestionType.SAFETY_CAR].id: "YES",
+        questions[QuestionType.FIRST_PIT_STOP_TEAM].id: "MCLAREN",
+    }
+
+    await db_session.refresh(snapshot)
+    assert [(row["rank"], row["user_id"], row["total_points"]) for row in snapshot.rows_json] == [
+        (1, "live-nor", 30.0),
+        (2, "live-ver", 10.0),
+    ]
+
+    result = await ingest_session_question_outcomes(db_session, session, provider_router=router)
+    assert result["resolved"] == 3
+    assert result["provider"] == "openf1"
+    assert router.facts_calls == 0
+    assert len(router.calls) == 3
+
+
+class ScriptedLiveRouter(FakeLiveRouter):
+    # Answers each poll from a script of (provider_name, rows) pairs.
+    def __init__(self, script: list[tuple[str, dict]]) -> None:
+        super().__init__()
+        self.script = script
+
+    async def fetch_session_updates(
+        self,
+        session_external_id: str,
+        cursors: dict[str, str],
+        *,
+        include_drivers: bool = False,
+    ) -> tuple[str, dict]:
+        self.calls.append((dict(cursors), include_drivers))
+        provider_name, rows = self.script[len(self.calls) - 1]
+        return provider_name, {"rows": rows, "failed": []}
+
+
+@pytest.mark.anyio
+async def test_live_ingestion_primary_takes_over_after_empty_fallback_poll(db_session):
+    session, questions = await _seed_live_session(db_session)
+    router = ScriptedLiveRouter([("fallback", {}), ("openf1", {**POLLS[0], "drivers": DRIVERS})])
+
+    await ingest_live_sessions(db_session, provider_router=router)
+    await db_session.commit()
+    await ingest_live_sessions(db_session, provider_router=router)
+    await db_session.commit()
+
+    assert router.calls == [({}, True), ({}, True)]
+    state = await db_session.get(LiveSessionState, session.id)
+    assert state is not None
+    assert state.provider_name == "openf1"
+    assert state.facts_json["winner"] == "VER"
+    assert state.provisional_json[questions[QuestionType.WINNER].id] == "VER"
+
+
+@pytest.mark.anyio
+async def test_live_ingestion_keeps_rows_sharing_the_cursor_timestamp(db_session):
+    session, _questions = await _seed_live_session(db_session)
+    green = {"date": "2026-03-01T14:00:30", "message": "GREEN LIGHT", "lap_number": 1}
+    late = {"date": "2026-03-01T14:00:30", "message": "SAFETY CAR DEPLOYED", "lap_number": 1}
+    router = ScriptedLiveRouter(
+        [
+            ("openf1", {**POLLS[0], "drivers": DRIVERS}),
+            # The inclusive cursor returns the row already merged alongside one published late.
+            ("openf1", {**POLLS[2], "race_control": [green, late]}),
+        ]
+    )
+
+    await ingest_live_sessions(db_session, provider_router=router)
+    await db_session.commit()
+    await ingest_live_sessions(db_session, provider_router=router)
+    await db_session.commit()
+
+    assert router.calls[1][0]["race_control"] == "2026-03-01T14:00:30"
+    state = await db_session.get(LiveSessionState, session.id)
+    assert state is not None
+    assert [row["message"] for row in state.rows_json["race_control"]] == ["GREEN LIGHT", "SAFETY CAR DEPLOYED"]
+    assert state.facts_json["safety_car"] is True
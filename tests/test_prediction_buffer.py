@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from apex_predict.enums import SessionState
+from apex_predict.models import Prediction, PredictionAnswer, Session
+from apex_predict.schemas import PredictionSubmission
+from apex_predict.services import prediction_buffer as prediction_buffer_module
+from apex_predict.services.prediction_buffer import PredictionWriteBuffer, prediction_buffer
+from apex_predict.services.scoring import lock_expired_sessions
+
+
+def now_utc() -> datetime:
+    return datetime.now(tz=timezone.utc)
+
+
+def _payload(seeded_core, first_pick: str) -> dict:
+    return {
+        "answers": [
+            {
+                "question_instance_id": seeded_core["question_one"],
+                "selected_option": first_pick,
+                "confidence_credits": 60,
+            },
+            {
+                "question_instance_id": seeded_core["question_two"],
+                "selected_option": "NOR",
+                "confidence_credits": 40,
+            },
+        ]
+    }
+
+
+@pytest.mark.anyio
+async def test_buffered_submissions_ack_with_sequence_and_flush_latest(
+    client, auth_headers, seeded_core, session_maker, db_session, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(prediction_buffer, "journal_path", tmp_path / "predictions.journal")
+    await prediction_buffer.start(session_maker)
+    try:
+        url = f"/v1/sessions/{seeded_core['session_id']}/predictions"
+        first = await client.post(url, json=_payload(seeded_core, "VER"), headers=auth_headers)
+        second = await client.post(url, json=_payload(seeded_core, "LEC"), headers=auth_headers)
+        assert first.status_code == 202
+        assert second.status_code == 202
+        assert second.json()["sequence"] == first.json()["sequence"] + 1
+
+        await prediction_buffer.drain()
+    finally:
+        await prediction_buffer.stop()
+
+    assert prediction_buffer.flushed_sequence >= second.json()["sequence"]
+    answer = await db_session.scalar(
+        select(PredictionAnswer).where(PredictionAnswer.question_instance_id == seeded_core["question_one"])
+    )
+    assert answer is not None
+    assert answer.selected_option == "LEC"
+
+
+@pytest.mark.anyio
+async def test_buffer_journal_replays_unflushed_submissions(tmp_path, seeded_core, session_maker, db_session):
+    journal = tmp_path / "predictions.journal"
+    crashed = PredictionWriteBuffer(journal_path=str(journal))
+    payload = PredictionSubmission.model_validate(_payload(seeded_core, "VER"))
+    lock_at = now_utc() + timedelta(hours=1)
+    for user_id in ("user-a", "user-b"):
+        await crashed.submit(user_id=user_id, session_id=seeded_core["session_id"], lock_at=lock_at, payload=payload)
+
+    recovered = PredictionWriteBuffer(journal_path=str(journal))
+    await recovered.start(session_maker)
+    # Recovery seals the unflushed entries into a segment instead of rewriting the journal.
+    assert [path.name for path in tmp_path.glob("predictions.journal.segment-*")] == [
+        "predictions.journal.segment-000000000002"
+    ]
+    try:
+        assert await recovered.drain() == 2
+        sequence = await recovered.submit(
+            user_id="user-c", session_id=seeded_core["session_id"], lock_at=lock_at, payload=payload
+        )
+        assert sequence == 3
+    finally:
+        await recovered.stop()
+
+    users = set((await db_session.scalars(select(Prediction.user_id))).all())
+    assert users == {"user-a", "user-b", "user-c"}
+    assert journal.read_text().strip() == '{"flushed": 3}'
+    assert list(tmp_path.glob("predictions.journal.segment-*")) == []
+
+
+@pytest.mark.anyio
+async def test_buffer_group_commits_concurrent_submissions(tmp_path, seeded_core, monkeypatch):
+    journal = tmp_path / "predictions.journal"
+    buffer = PredictionWriteBuffer(journal_path=str(journal))
+    payload = PredictionSubmission.model_validate(_payload(seeded_core, "VER"))
+    lock_at = now_utc() + timedelta(hours=1)
+    syncs: list[int] = []
+    real_sync = buffer._sync_journal
+
+    def slow_sync() -> None:
+        syncs.append(buffer._sequence)
+        time.sleep(0.1)
+        real_sync()
+
+    monkeypatch.setattr(buffer, "_sync_journal", slow_sync)
+    sequences = await asyncio.gather(
+        *(
+            buffer.submit(user_id=f"user-{n}", session_id=seeded_core["session_id"], lock_at=lock_at, payload=payload)
+            for n in range(20)
+        )
+    )
+
+    assert sorted(sequences) == list(range(1, 21))
+    # Submissions queued behind the first fsync share the next one.
+    assert len(syncs) <= 2
+    assert len(journal.read_text().splitlines()) == 20
+
+
+@pytest.mark.anyio
+async def test_buffer_requires_journal_before_acknowledging(session_maker):
+    buffer = PredictionWriteBuffer()
+    with pytest.raises(RuntimeError, match="prediction_buffer_journal_required"):
+        await buffer.start(session_maker)
+    assert not buffer.is_running
+
+
+@pytest.mark.anyio
+async def test_buffer_refuses_a_journal_claimed_by_another_buffer(tmp_path, session_maker):
+    journal = tmp_path / "predictions.journal"
+    owner = PredictionWriteBuffer(journal_path=str(journal))
+    await owner.start(session_maker)
+    try:
+        contender = PredictionWriteBuffer(journal_path=str(journal))
+        with pytest.raises(RuntimeError, match="prediction_buffer_journal_in_use"):
+            await contender.start(session_maker)
+        assert not contender.is_running
+    finally:
+        await owner.stop()
+
+    # Released on stop, so a restarted process can take its journal back.
+    successor = PredictionWriteBuffer(journal_path=str(journal))
+    await successor.start(session_maker)
+    await successor.stop()
+
+
+@pytest.mark.anyio
+async def test_buffer_isolates_rejected_rows(tmp_path, seeded_core, session_maker, db_session, monkeypatch):
+    real_upsert = prediction_buffer_module.upsert_predictions
+
+    async def upsert_rejecting_user_b(db, writes):
+        if any(user_id == "user-b" for user_id, _, _ in writes):
+            raise IntegrityError("insert", {}, Exception("rejected"))
+        return await real_upsert(db, writes)
+
+    monkeypatch.setattr(prediction_buffer_module, "upsert_predictions", upsert_rejecting_user_b)
+    journal = tmp_path / "predictions.journal"
+    buffer = PredictionWriteBuffer(journal_path=str(journal))
+    payload = PredictionSubmission.model_validate(_payload(seeded_core, "VER"))
+    lock_at = now_utc() + timedelta(hours=1)
+    await buffer.start(session_maker)
+    try:
+        for user_id in ("user-a", "user-b", "user-c"):
+            await buffer.submit(user_id=user_id, session_id=seeded_core["session_id"], lock_at=lock_at, payload=payload)
+        assert await buffer.drain() == 3
+    finally:
+        await buffer.stop()
+
+    users = set((await db_session.scalars(select(Prediction.user_id))).all())
+    assert users == {"user-a", "user-c"}
+    rejected = (tmp_path / "predictions.journal.rejected").read_text().splitlines()
+    assert len(rejected) == 1
+    assert '"user_id": "user-b"' in rejected[0]
+
+
+@pytest.mark.anyio
+async def test_buffer_drops_rows_for_sessions_locked_before_the_flush(tmp_path, seeded_core, session_maker, db_session):
+    journal = tmp_path / "predictions.journal"
+    buffer = PredictionWriteBuffer(journal_path=str(journal), flush_interval_seconds=60.0)
+    payload = PredictionSubmission.model_validate(_payload(seeded_core, "VER"))
+    lock_at = now_utc() + timedelta(hours=1)
+    await buffer.start(session_maker)
+    try:
+        await buffer.submit(user_id="user-late", session_id=seeded_core["session_id"], lock_at=lock_at, payload=payload)
+        await db_session.execute(
+            update(Session).where(Session.id == seeded_core["session_id"]).values(state=SessionState.LOCKED)
+        )
+        await db_session.commit()
+        assert await buffer.drain() == 1
+    finally:
+        await buffer.stop()
+
+    assert buffer.dropped_count == 1
+    assert await db_session.scalar(select(Prediction.id).where(Prediction.user_id == "user-late")) is None
+    rejected = (tmp_path / "predictions.journal.rejected").read_text().splitlines()
+    assert len(rejected) == 1
+    assert '"user_id": "user-late"' in rejected[0]
+
+
+@pytest.mark.anyio
+async def test_lock_expired_sessions_waits_for_buffer_watermark(tmp_path, seeded_core, session_maker, db_session):
+    buffer = PredictionWriteBuffer(journal_path=str(tmp_path / "predictions.journal"), flush_interval_seconds=60.0)
+    payload = PredictionSubmission.model_validate(_payload(seeded_core, "VER"))
+    lock_at = now_utc() + timedelta(milliseconds=300)
+    await buffer.start(session_maker)
+    try:
+        await buffer.submit(
+            user_id="user-alpha", session_id=seeded_core["session_id"], lock_at=lock_at, payload=payload
+        )
+        await buffer.report_watermark()
+        await db_session.execute(update(Session).where(Session.id == seeded_core["session_id"]).values(lock_at=lock_at))
+        await db_session.commit()
+        await asyncio.sleep(max((lock_at - now_utc()).total_seconds(), 0.0) + 0.05)
+
+        with pytest.raises(ValueError, match="session_locked"):
+            await buffer.submit(
+                user_id="user-beta", session_id=seeded_core["session_id"], lock_at=lock_at, payload=payload
+            )
+
+        # The submission is still pending in the buffer, so the worker must not lock yet.
+        assert await lock_expired_sessions(db_session) == 0
+        await db_session.commit()
+
+        await buffer.drain()
+        await buffer.report_watermark()
+        assert await lock_expired_sessions(db_session) == 1
+        await db_session.commit()
+    finally:
+        await buffer.stop()
+
+    session_obj = await db_session.get(Session, seeded_core["session_id"])
+    await db_session.refresh(session_obj)
+    assert session_obj.state == SessionState.LOCKED
+    assert await db_session.scalar(select(Prediction.id).where(Prediction.user_id == "user-alpha")) is not None
@@ -3,10 +3,18 @@ from __future__ import annotations
 from datetime import datetime, timedelta, timezone
 
 import pytest
-from sqlalchemy import update
+from sqlalchemy import event, func, select, update
 
 from apex_predict.enums import SessionState
-from apex_predict.models import Session
+from apex_predict.models import (
+    IdempotencyRecord,
+    Prediction,
+    PredictionAnswer,
+    QuestionInstance,
+    Session,
+)
+from apex_predict.services.idempotency import idempotency_store, purge_expired_idempotency_records
+from apex_predict.services.session_catalog import session_catalog
 
 
 def now_utc() -> datetime:
@@ -100,3 +108,403 @@ async def test_submit_predictions_rejected_when_locked(client, auth_headers, see
     )
     assert response.status_code == 409
     assert response.json()["detail"] == "session_locked"
+
+
+@pytest.mark.anyio
+async def test_prediction_history_paginates_and_filters_with_constant_queries(
+    client, auth_headers, seeded_core, db_session
+):
+    base_session = await db_session.get(Session, seeded_core["session_id"])
+    base_question = await db_session.get(QuestionInstance, seeded_core["question_one"])
+    session_ids = [seeded_core["session_id"]]
+    questions = {seeded_core["session_id"]: [seeded_core["question_one"], seeded_core["question_two"]]}
+    for index in range(2):
+        extra = Session(
+            event_id=base_session.event_id,
+            name=f"Practice {index + 1}",
+            session_type=base_session.session_type,
+            state=SessionState.OPEN,
+            starts_at=base_session.starts_at,
+            lock_at=base_session.lock_at,
+            ends_at=base_session.ends_at,
+        )
+        db_session.add(extra)
+        await db_session.flush()
+        session_ids.append(extra.id)
+        questions[extra.id] = []
+        for prompt in ("Fastest?", "Slowest?"):
+            question = QuestionInstance(
+                session_id=extra.id,
+                question_type=base_question.question_type,
+                prompt=prompt,
+                options=base_question.options,
+                lock_at=base_question.lock_at,
+                scoring_rule_id=base_question.scoring_rule_id,
+            )
+            db_session.add(question)
+            await db_session.flush()
+            questions[extra.id].append(question.id)
+    await db_session.commit()
+
+    statements: list[str] = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    for index, session_id in enumerate(session_ids):
+        db_session.add(Prediction(id=f"pred-{index}", user_id="user-alpha", session_id=session_id))
+        await db_session.flush()
+        for question_id, credits in zip(questions[session_id], (70, 30), strict=True):
+            db_session.add(
+                PredictionAnswer(
+                    prediction_id=f"pred-{index}",
+                    user_id="user-alpha",
+                    question_instance_id=question_id,
+                    selected_option="VER",
+                    credits=credits,
+                )
+            )
+        await db_session.commit()
+        await db_session.execute(
+            update(Prediction)
+            .where(Prediction.id == f"pred-{index}")
+            .values(updated_at=now_utc() - timedelta(hours=10 - index))
+        )
+        await db_session.commit()
+
+    event.listen(db_session.bind.sync_engine, "before_cursor_execute", _count)
+    try:
+        first_page = await client.get("/v1/users/me/predictions", params={"limit": 2}, headers=auth_headers)
+        page_queries = len(statements)
+        statements.clear()
+        everything = await client.get("/v1/users/me/predictions", headers=auth_headers)
+        all_queries = len(statements)
+    finally:
+        event.remove(db_session.bind.sync_engine, "before_cursor_execute", _count)
+
+    assert first_page.status_code == 200
+    assert [row["id"] for row in first_page.json()] == ["pred-2", "pred-1"]
+    assert all(len(row["answers"]) == 2 for row in first_page.json())
+    assert {a["confidence_credits"] for a in first_page.json()[0]["answers"]} == {70, 30}
+    assert [row["id"] for row in everything.json()] == ["pred-2", "pred-1", "pred-0"]
+    assert page_queries == all_queries
+
+    second_page = await client.get(
+        "/v1/users/me/predictions",
+        params={"limit": 2, "before": first_page.json()[-1]["updated_at"]},
+        headers=auth_headers,
+    )
+    assert [row["id"] for row in second_page.json()] == ["pred-0"]
+
+    by_session = await client.get(
+        "/v1/users/me/predictions", params={"session_id": session_ids[1]}, headers=auth_headers
+    )
+    assert [row["id"] for row in by_session.json()] == ["pred-1"]
+
+    by_season = await client.get(
+        "/v1/users/me/predictions", params={"season_id": seeded_core["season_id"]}, headers=auth_headers
+    )
+    assert len(by_season.json()) == 3
+    other_season = await client.get("/v1/users/me/predictions", params={"season_id": "nope"}, headers=auth_headers)
+    assert other_season.json() == []
+
+
+@pytest.mark.anyio
+async def test_prediction_history_cursor_resumes_inside_updated_at_ties(client, auth_headers, seeded_core, db_session):
+    base_session = await db_session.get(Session, seeded_core["session_id"])
+    session_ids = [seeded_core["session_id"]]
+    for index in range(2):
+        extra = Session(
+            event_id=base_session.event_id,
+            name=f"Sprint {index + 1}",
+            session_type=base_session.session_type,
+            state=SessionState.OPEN,
+            starts_at=base_session.starts_at,
+            lock_at=base_session.lock_at,
+            ends_at=base_session.ends_at,
+        )
+        db_session.add(extra)
+        await db_session.flush()
+        session_ids.append(extra.id)
+    for index, session_id in enumerate(session_ids):
+        db_session.add(Prediction(id=f"tied-{index}", user_id="user-alpha", session_id=session_id))
+    await db_session.flush()
+    # One batch upsert stamps every row with the same updated_at.
+    await db_session.execute(update(Prediction).values(updated_at=now_utc() - timedelta(hours=1)))
+    await db_session.commit()
+
+    first_page = await client.get("/v1/users/me/predictions", params={"limit": 2}, headers=auth_headers)
+    assert [row["id"] for row in first_page.json()] == ["tied-2", "tied-1"]
+    next_cursor = first_page.headers["X-Next-Cursor"]
+
+    second_page = await client.get(
+        "/v1/users/me/predictions", params={"limit": 2, "cursor": next_cursor}, headers=auth_headers
+    )
+    assert [row["id"] for row in second_page.json()] == ["tied-0"]
+    assert "X-Next-Cursor" not in second_page.headers
+
+    garbage = await client.get("/v1/users/me/predictions", params={"cursor": "%%%"}, headers=auth_headers)
+    assert garbage.status_code == 422
+    assert garbage.json()["detail"] == "invalid_cursor"
+
+
+def _answer(question_id: str, selected_option: str, credits: int) -> dict:
+    return {"question_instance_id": question_id, "selected_option": selected_option, "confidence_credits": credits}
+
+
+@pytest.mark.anyio
+async def test_prediction_edit_only_touches_changed_rows(client, auth_headers, seeded_core, db_session):
+    url = f"/v1/sessions/{seeded_core['session_id']}/predictions"
+    first = await client.post(
+        url,
+        json={
+            "answers": [
+                _answer(seeded_core["question_one"], "VER", 60),
+                _answer(seeded_core["question_two"], "NOR", 40),
+            ]
+        },
+        headers=auth_headers,
+    )
+    assert first.status_code == 200
+    answer_ids = {
+        answer.question_instance_id: answer.id
+        for answer in (await db_session.scalars(select(PredictionAnswer))).all()
+    }
+
+    edited = await client.post(
+        url,
+        json={
+            "client_version": "ios-0.2.0",
+            "answers": [
+                _answer(seeded_core["question_one"], "LEC", 100),
+            ],
+        },
+        headers=auth_headers,
+    )
+    assert edited.status_code == 200
+    body = edited.json()
+    assert body["id"] == first.json()["id"]
+    assert body["client_version"] == "ios-0.2.0"
+    assert body["answers"] == [_answer(seeded_core["question_one"], "LEC", 100)]
+
+    db_session.expire_all()
+    answers = (await db_session.scalars(select(PredictionAnswer))).all()
+    assert [(a.id, a.selected_option, a.credits) for a in answers] == [
+        (answer_ids[seeded_core["question_one"]], "LEC", 100)
+    ]
+    assert await db_session.scalar(select(func.count()).select_from(Prediction)) == 1
+
+    history = await client.get("/v1/users/me/predictions", headers=auth_headers)
+    assert history.json()[0]["answers"] == body["answers"]
+
+
+@pytest.mark.anyio
+async def test_session_catalog_serves_hot_path_and_invalidates_on_state_change(
+    client, auth_headers, admin_headers, seeded_core, db_session
+):
+    session_id = seeded_core["session_id"]
+    url = f"/v1/sessions/{session_id}/predictions"
+    payload = {
+        "answers": [
+            _answer(seeded_core["question_one"], "VER", 60),
+            _answer(seeded_core["question_two"], "NOR", 40),
+        ]
+    }
+    warm = await client.get(f"/v1/sessions/{session_id}/questions")
+    assert warm.status_code == 200
+    assert [row["id"] for row in warm.json()] == [seeded_core["question_one"], seeded_core["question_two"]]
+
+    statements: list[str] = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_session.bind.sync_engine, "before_cursor_execute", _record)
+    try:
+        assert (await client.get(f"/v1/sessions/{session_id}/questions")).json() == warm.json()
+        assert (await client.post(url, json=payload, headers=auth_headers)).status_code == 200
+    finally:
+        event.remove(db_session.bind.sync_engine, "before_cursor_execute", _record)
+    assert not [sql for sql in statements if "FROM sessions" in sql or "FROM question_instances" in sql]
+
+    scored = await client.post("/v1/admin/scoring/run", json={"session_id": session_id}, headers=admin_headers)
+    assert scored.status_code == 200
+
+    locked = await client.post(url, json=payload, headers=auth_headers)
+    assert locked.status_code == 409
+    assert locked.json()["detail"] == "session_locked"
+
+
+@pytest.mark.anyio
+async def test_session_catalog_invalidation_waits_for_commit(seeded_core, db_session, session_maker):
+    session_id = seeded_core["session_id"]
+    warm = await session_catalog.get(db_session, session_id)
+    assert warm is not None
+
+    async with session_maker() as writer:
+        await writer.execute(update(Session).where(Session.id == session_id).values(state=SessionState.LOCKED))
+        session_catalog.invalidate_on_commit(writer, session_id)
+        await writer.rollback()
+        assert await session_catalog.get(db_session, session_id) is warm
+
+        await writer.execute(update(Session).where(Session.id == session_id).values(state=SessionState.LOCKED))
+        session_catalog.invalidate_on_commit(writer, session_id)
+        assert await session_catalog.get(db_session, session_id) is warm
+        await writer.commit()
+
+    reloaded = await session_catalog.get(db_session, session_id)
+    assert reloaded is not None
+    assert reloaded.version > warm.version
+    assert reloaded.state == SessionState.LOCKED
+
+
+@pytest.mark.anyio
+async def test_batch_submission_writes_valid_sessions_and_reports_per_session_errors(
+    client, auth_headers, seeded_core, db_session
+):
+    base_session = await db_session.get(Session, seeded_core["session_id"])
+    base_question = await db_session.get(QuestionInstance, seeded_core["question_one"])
+    sprint = Session(
+        event_id=base_session.event_id,
+        name="Sprint",
+        session_type=base_session.session_type,
+        state=SessionState.OPEN,
+        starts_at=base_session.starts_at,
+        lock_at=base_session.lock_at,
+        ends_at=base_session.ends_at,
+    )
+    db_session.add(sprint)
+    await db_session.flush()
+    sprint_question = QuestionInstance(
+        session_id=sprint.id,
+        question_type=base_question.question_type,
+        prompt="Sprint pole?",
+        options=base_question.options,
+        lock_at=base_question.lock_at,
+        scoring_rule_id=base_question.scoring_rule_id,
+    )
+    db_session.add(sprint_question)
+    await db_session.commit()
+
+    qualifying = {
+        "session_id": seeded_core["session_id"],
+        "answers": [
+            _answer(seeded_core["question_one"], "VER", 60),
+            _answer(seeded_core["question_two"], "NOR", 40),
+        ],
+    }
+    response = await client.post(
+        "/v1/predictions:batch",
+        json={
+            "submissions": [
+                qualifying,
+                {"session_id": sprint.id, "answers": [_answer(sprint_question.id, "LEC", 100)]},
+                {"session_id": "missing-session", "answers": [_answer(sprint_question.id, "LEC", 100)]},
+                {"session_id": sprint.id, "answers": [_answer(sprint_question.id, "BOGUS", 100)]},
+                qualifying,
+            ]
+        },
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [(row["status_code"], row["error"]) for row in results] == [
+        (200, None),
+        (200, None),
+        (404, "session_not_found"),
+        (422, "duplicate_session_submission"),
+        (422, "duplicate_session_submission"),
+    ]
+    assert results[1]["prediction"]["answers"] == [_answer(sprint_question.id, "LEC", 100)]
+
+    stored = set((await db_session.scalars(select(Prediction.session_id))).all())
+    assert stored == {seeded_core["session_id"], sprint.id}
+
+    empty = await client.post("/v1/predictions:batch", json={"submissions": []}, headers=auth_headers)
+    assert empty.status_code == 422
+
+
+@pytest.mark.anyio
+async def test_idempotency_key_replays_stored_prediction_response(client, auth_headers, seeded_core, db_session):
+    url = f"/v1/sessions/{seeded_core['session_id']}/predictions"
+    payload = {
+        "answers": [
+            _answer(seeded_core["question_one"], "VER", 60),
+            _answer(seeded_core["question_two"], "NOR", 40),
+        ]
+    }
+    headers = {**auth_headers, "Idempotency-Key": "retry-me"}
+    first = await client.post(url, json=payload, headers=headers)
+    assert first.status_code == 200
+    assert "Idempotent-Replayed" not in first.headers
+
+    statements: list[str] = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_session.bind.sync_engine, "before_cursor_execute", _record)
+    try:
+        replay = await client.post(url, json=payload, headers=headers)
+    finally:
+        event.remove(db_session.bind.sync_engine, "before_cursor_execute", _record)
+    assert replay.status_code == 200
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.json() == first.json()
+    assert not [sql for sql in statements if "prediction" in sql.lower()]
+
+    idempotency_store.clear()
+    from_db = await client.post(url, json=payload, headers=headers)
+    assert from_db.headers["Idempotent-Replayed"] == "true"
+    assert from_db.json() == first.json()
+
+    payload["answers"][0]["selected_option"] = "LEC"
+    reused = await client.post(url, json=payload, headers=headers)
+    assert reused.status_code == 409
+    assert reused.json()["detail"] == "idempotency_key_reused"
+
+    await db_session.execute(update(IdempotencyRecord).values(expires_at=now_utc() - timedelta(seconds=1)))
+    await db_session.commit()
+    assert await purge_expired_idempotency_records(db_session) == {"idempotency_records_deleted": 1}
+
+
+@pytest.mark.anyio
+async def test_idempotency_reservation_replays_racing_retry_and_reclaims_expired_keys(
+    client, auth_headers, seeded_core, db_session, monkeypatch
+):
+    url = f"/v1/sessions/{seeded_core['session_id']}/predictions"
+    payload = {
+        "answers": [
+            _answer(seeded_core["question_one"], "VER", 60),
+            _answer(seeded_core["question_two"], "NOR", 40),
+        ]
+    }
+    headers = {**auth_headers, "Idempotency-Key": "race-me"}
+    first = await client.post(url, json=payload, headers=headers)
+    assert first.status_code == 200
+
+    async def missed_lookup(*_, **__):
+        # Both retries passed the read-side check before either had written.
+        return None
+
+    idempotency_store.clear()
+    monkeypatch.setattr(idempotency_store, "lookup", missed_lookup)
+    changed = {**payload, "answers": [_answer(seeded_core["question_one"], "LEC", 60), payload["answers"][1]]}
+    racing = await client.post(url, json=changed, headers=headers)
+    assert racing.status_code == 409
+    assert racing.json()["detail"] == "idempotency_key_reused"
+    replayed = await client.post(url, json=payload, headers=headers)
+    assert replayed.headers["Idempotent-Replayed"] == "true"
+    answer = await db_session.scalar(
+        select(PredictionAnswer).where(PredictionAnswer.question_instance_id == seeded_core["question_one"])
+    )
+    assert answer.selected_option == "VER"
+
+    await db_session.execute(update(IdempotencyRecord).values(expires_at=now_utc() - timedelta(seconds=1)))
+    await db_session.commit()
+    reclaimed = await client.post(url, json=changed, headers=headers)
+    assert reclaimed.status_code == 200
+    assert "Idempotent-Replayed" not in reclaimed.headers
+    record = await db_session.scalar(select(IdempotencyRecord).execution_options(populate_existing=True))
+    assert record.expires_at.replace(tzinfo=timezone.utc) > now_utc()
+    assert record.response_json == reclaimed.json()
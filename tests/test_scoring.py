@@ -1,10 +1,25 @@
 from __future__ import annotations
 
+from decimal import Decimal
+
 import pytest
-from sqlalchemy import func, select
+from sqlalchemy import delete, func, select, update
 
-from apex_predict.enums import LeaderboardScope
-from apex_predict.models import LeaderboardSnapshot, LeagueSnapshot, ScoreEntry
+from apex_predict.config import get_settings
+from apex_predict.enums import JobStatus, LeaderboardScope
+from apex_predict.models import (
+    JobRun,
+    LeaderboardSnapshot,
+    LeagueSnapshot,
+    Prediction,
+    PredictionAnswer,
+    Profile,
+    ScoreEntry,
+    User,
+    UserSeasonTotal,
+)
+from apex_predict.services import leaderboard
+from apex_predict.services.scoring import ScoringError, run_session_scoring
 
 
 @pytest.mark.anyio
@@ -168,3 +183,305 @@ async def test_scoring_publishes_global_and_league_snapshots(
     assert league_snapshot is not None
     assert league_snapshot.rows_json
     assert league_snapshot.rows_json[0]["user_id"] == "user-alpha"
+
+
+@pytest.mark.anyio
+async def test_scoring_maintains_running_point_totals(
+    client,
+    auth_headers,
+    admin_headers,
+    seeded_core,
+    db_session,
+):
+    payload = {
+        "answers": [
+            {
+                "question_instance_id": seeded_core["question_one"],
+                "selected_option": "VER",
+                "confidence_credits": 50,
+            },
+            {
+                "question_instance_id": seeded_core["question_two"],
+                "selected_option": "NOR",
+                "confidence_credits": 50,
+            },
+        ]
+    }
+    await client.post(
+        f"/v1/sessions/{seeded_core['session_id']}/predictions",
+        json=payload,
+        headers=auth_headers,
+    )
+    for _ in range(2):
+        score = await client.post(
+            "/v1/admin/scoring/run",
+            json={"session_id": seeded_core["session_id"]},
+            headers=admin_headers,
+        )
+        assert score.status_code == 200
+
+    profile = await db_session.get(Profile, "user-alpha")
+    assert profile is not None
+    assert Decimal(profile.total_points) == Decimal("67.50")
+
+    season_total = await db_session.scalar(
+        select(UserSeasonTotal).where(
+            UserSeasonTotal.user_id == "user-alpha",
+            UserSeasonTotal.season_id == seeded_core["season_id"],
+        )
+    )
+    assert season_total is not None
+    assert Decimal(season_total.total_points) == Decimal("67.50")
+
+    board = await client.get(
+        "/v1/leaderboards/global",
+        params={"season_id": seeded_core["season_id"]},
+        headers=auth_headers,
+    )
+    assert board.status_code == 200
+    assert board.json()["rows"][0]["total_points"] == 67.5
+
+
+@pytest.mark.anyio
+async def test_increment_user_totals_adds_atomically_in_batches(db_session, seeded_core, monkeypatch):
+    monkeypatch.setattr(leaderboard, "TOTALS_BATCH_SIZE", 2)
+    user_ids = [f"totals-user-{index}" for index in range(5)]
+    for user_id in user_ids:
+        db_session.add(User(id=user_id, email=f"{user_id}@example.com"))
+    db_session.add(Profile(user_id=user_ids[0], username="totals-zero", total_points=Decimal("5.00")))
+    await db_session.flush()
+
+    deltas = {user_id: Decimal("1.25") for user_id in user_ids}
+    for _ in range(2):
+        await leaderboard.increment_user_totals(db_session, season_id=seeded_core["season_id"], deltas=deltas)
+    await db_session.commit()
+
+    totals = (
+        await db_session.execute(select(Profile.user_id, Profile.total_points).where(Profile.user_id.in_(user_ids)))
+    ).all()
+    assert {user_id: Decimal(str(points)) for user_id, points in totals} == {
+        user_ids[0]: Decimal("7.50"),
+        **{user_id: Decimal("2.50") for user_id in user_ids[1:]},
+    }
+    season_points = (
+        await db_session.scalars(
+            select(UserSeasonTotal.total_points).where(
+                UserSeasonTotal.season_id == seeded_core["season_id"],
+                UserSeasonTotal.user_id.in_(user_ids),
+            )
+        )
+    ).all()
+    assert sorted(Decimal(str(points)) for points in season_points) == [Decimal("2.50")] * 5
+
+
+@pytest.mark.anyio
+async def test_scoring_republishes_only_leagues_with_changed_members(
+    client,
+    auth_headers,
+    admin_headers,
+    seeded_core,
+    db_session,
+):
+    scored_league = await client.post(
+        "/v1/leagues",
+        json={"name": "Scored League", "visibility": "PUBLIC"},
+        headers=auth_headers,
+    )
+    idle_league = await client.post(
+        "/v1/leagues",
+        json={"name": "Idle League", "visibility": "PUBLIC"},
+        headers={"X-User-Id": "user-idle"},
+    )
+    assert scored_league.status_code == 201
+    assert idle_league.status_code == 201
+
+    payload = {
+        "answers": [
+            {
+                "question_instance_id": seeded_core["question_one"],
+                "selected_option": "VER",
+                "confidence_credits": 50,
+            },
+            {
+                "question_instance_id": seeded_core["question_two"],
+                "selected_option": "NOR",
+                "confidence_credits": 50,
+            },
+        ]
+    }
+    await client.post(
+        f"/v1/sessions/{seeded_core['session_id']}/predictions",
+        json=payload,
+        headers=auth_headers,
+    )
+    for _ in range(2):
+        await client.post(
+            "/v1/admin/scoring/run",
+            json={"session_id": seeded_core["session_id"]},
+            headers=admin_headers,
+        )
+
+    scored_count = await db_session.scalar(
+        select(func.count())
+        .select_from(LeagueSnapshot)
+        .where(LeagueSnapshot.league_id == scored_league.json()["id"])
+    )
+    idle_count = await db_session.scalar(
+        select(func.count())
+        .select_from(LeagueSnapshot)
+        .where(LeagueSnapshot.league_id == idle_league.json()["id"])
+    )
+    assert scored_count == 1
+    assert idle_count == 0
+
+
+async def _seed_engine_predictions(db_session, seeded_core) -> None:
+    # (question_one answer, credits), (question_two answer, credits); credits None = column left at default.
+    picks = {
+        "engine-u1": (("VER", 50), ("NOR", 50)),
+        "engine-u2": (("VER", 33), ("NOR", None)),
+        "engine-u3": (("LEC", 100), ("NOR", 100)),
+        "engine-u4": (("VER", None), ("VER", 0)),
+        "engine-u5": (("VER", 7), ("NOR", 93)),
+    }
+    for user_id, answers in picks.items():
+        db_session.add(User(id=user_id))
+        prediction = Prediction(user_id=user_id, session_id=seeded_core["session_id"])
+        db_session.add(prediction)
+        await db_session.flush()
+        for question_key, (selected, credits) in zip(("question_one", "question_two"), answers, strict=True):
+            db_session.add(
+                PredictionAnswer(
+                    prediction_id=prediction.id,
+                    user_id=user_id,
+                    question_instance_id=seeded_core[question_key],
+                    selected_option=selected,
+                    **({} if credits is None else {"credits": credits}),
+                )
+            )
+    await db_session.commit()
+
+
+async def _score_with_engine(db_session, session_id: str, engine: str) -> tuple[int, dict, dict]:
+    created = await run_session_scoring(db_session, session_id, initiated_by="admin", engine=engine)
+    await db_session.commit()
+    entries = {
+        (entry.user_id, entry.question_instance_id): (
+            Decimal(str(entry.base_points)),
+            Decimal(str(entry.confidence_multiplier)),
+            Decimal(str(entry.awarded_points)),
+            entry.metadata_json,
+        )
+        for entry in (await db_session.scalars(select(ScoreEntry))).all()
+    }
+    totals = {
+        profile.user_id: Decimal(str(profile.total_points))
+        for profile in (await db_session.scalars(select(Profile))).all()
+    }
+    return created, entries, totals
+
+
+async def _reset_scores(db_session) -> None:
+    await db_session.execute(delete(ScoreEntry))
+    await db_session.execute(delete(UserSeasonTotal))
+    await db_session.execute(update(Profile).values(total_points=0))
+    await db_session.commit()
+    db_session.expire_all()
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("engine", ["sql", "numpy", "stream"])
+async def test_scoring_engine_matches_python_reference(db_session, seeded_core, engine):
+    if engine == "numpy":
+        pytest.importorskip("numpy")
+    await _seed_engine_predictions(db_session, seeded_core)
+    session_id = seeded_core["session_id"]
+
+    expected = await _score_with_engine(db_session, session_id, "python")
+    assert expected[0] == 8
+    await _reset_scores(db_session)
+
+    assert await _score_with_engine(db_session, session_id, engine) == expected
+    assert await run_session_scoring(db_session, session_id, initiated_by="admin", engine=engine) == 0
+
+
+@pytest.mark.anyio
+async def test_unknown_scoring_engine_is_rejected(db_session, seeded_core):
+    with pytest.raises(ScoringError, match="unknown_scoring_engine"):
+        await run_session_scoring(db_session, seeded_core["session_id"], initiated_by="admin", engine="abacus")
+
+
+@pytest.mark.anyio
+async def test_stream_scoring_records_chunk_progress(db_session, seeded_core, monkeypatch):
+    monkeypatch.setattr(get_settings(), "scoring_chunk_size", 2)
+    await _seed_engine_predictions(db_session, seeded_core)
+    session_id = seeded_core["session_id"]
+
+    created = await run_session_scoring(db_session, session_id, initiated_by="admin", engine="stream")
+    await db_session.commit()
+    assert created == 8
+
+    progress = await db_session.scalar(
+        select(JobRun).where(JobRun.idempotency_key == f"scoring-progress:{session_id}")
+    )
+    assert progress is not None
+    assert progress.status == JobStatus.SUCCESS
+    assert progress.result_json["chunks"] == 3
+    assert progress.result_json["predictions_scored"] == 5
+    assert progress.result_json["entries_created"] == 8
+
+
+@pytest.mark.anyio
+async def test_admin_rebuild_totals_repairs_drift_to_score_entry_sums(
+    client,
+    auth_headers,
+    admin_headers,
+    seeded_core,
+    db_session,
+):
+    payload = {
+        "answers": [
+            {"question_instance_id": seeded_core["question_one"], "selected_option": "VER", "confidence_credits": 50},
+            {"question_instance_id": seeded_core["question_two"], "selected_option": "NOR", "confidence_credits": 50},
+        ]
+    }
+    await client.post(f"/v1/sessions/{seeded_core['session_id']}/predictions", json=payload, headers=auth_headers)
+    score = await client.post(
+        "/v1/admin/scoring/run",
+        json={"session_id": seeded_core["session_id"]},
+        headers=admin_headers,
+    )
+    assert score.status_code == 200
+
+    await db_session.execute(update(Profile).values(total_points=999))
+    await db_session.execute(update(UserSeasonTotal).values(total_points=-5))
+    await db_session.commit()
+
+    rebuilt = await client.post("/v1/admin/leaderboards/rebuild-totals", headers=admin_headers)
+    assert rebuilt.status_code == 200
+    assert rebuilt.json() == {"users": 1, "season_totals": 1}
+
+    expected = dict(
+        (
+            await db_session.execute(
+                select(ScoreEntry.user_id, func.sum(ScoreEntry.awarded_points)).group_by(ScoreEntry.user_id)
+            )
+        ).all()
+    )
+    profiles = dict((await db_session.execute(select(Profile.user_id, Profile.total_points))).all())
+    season_totals = dict(
+        (
+            await db_session.execute(
+                select(UserSeasonTotal.user_id, UserSeasonTotal.total_points).where(
+                    UserSeasonTotal.season_id == seeded_core["season_id"]
+                )
+            )
+        ).all()
+    )
+    assert {user_id: Decimal(profiles[user_id]) for user_id in expected} == {
+        user_id: Decimal(points) for user_id, points in expected.items()
+    }
+    assert all(Decimal(points) == 0 for user_id, points in profiles.items() if user_id not in expected)
+    assert {user_id: Decimal(points) for user_id, points in season_totals.items()} == {
+        user_id: Decimal(points) for user_id, points in expected.items()
+    }
@@ -7,7 +7,7 @@ import pytest
 
 from apex_predict.enums import QuestionType
 from apex_predict.models import QuestionInstance
-from apex_predict.services.ingestion import resolve_question_option
+from apex_predict.services.ingestion import advance_live_cursors, merge_live_rows, resolve_question_option
 
 
 def _question(question_type: QuestionType, options: list[str]) -> QuestionInstance:
@@ -69,3 +69,48 @@ def test_resolve_question_option_handles_missing_safety_car_lap() -> None:
     question = _question(QuestionType.FIRST_SAFETY_CAR_LAP, ["NONE", "5", "10"])
     facts = {"first_safety_car_lap": None}
     assert resolve_question_option(question, facts) == "NONE"
+
+
+@pytest.mark.unit
+def test_resolve_question_option_skips_questions_backed_by_unavailable_facts() -> None:
+    facts = {
+        "winner": "VER",
+        "safety_car": False,
+        "first_safety_car_lap": None,
+        "unavailable_facts": ["first_safety_car_lap", "safety_car"],
+    }
+    assert resolve_question_option(_question(QuestionType.SAFETY_CAR, ["YES", "NO"]), facts) is None
+    assert resolve_question_option(_question(QuestionType.FIRST_SAFETY_CAR_LAP, ["NONE", "5"]), facts) is None
+    assert resolve_question_option(_question(QuestionType.WINNER, ["VER", "NOR"]), facts) == "VER"
+
+
+@pytest.mark.unit
+def test_merge_live_rows_folds_updates_and_advances_cursors_only_for_answered_endpoints() -> None:
+    stored = {
+        "drivers": [{"driver_number": 1, "name_acronym": "VER"}],
+        "position": [{"driver_number": 1, "date": "2026-03-01T14:00:00", "position": 2}],
+        "laps": [{"driver_number": 1, "date_start": "2026-03-01T14:00:00", "lap_duration": 81.2}],
+        "race_control": [{"date": "2026-03-01T14:01:00", "message": "GREEN FLAG"}],
+    }
+    cursors = {"position": "2026-03-01T14:00:00", "laps": "2026-03-01T14:00:00", "pit": "2026-03-01T13:00:00"}
+    updates = {
+        "position": [
+            {"driver_number": 1, "date": "2026-03-01T14:05:00", "position": 1},
+            {"driver_number": 4, "date": "2026-03-01T14:04:00", "position": 2},
+        ],
+        "laps": [{"driver_number": 1, "date_start": "2026-03-01T14:02:00", "lap_duration": 82.0}],
+        "race_control": [{"date": "2026-03-01T14:06:00", "message": "SAFETY CAR DEPLOYED"}],
+    }
+
+    merged = merge_live_rows(stored, updates)
+
+    assert merged["drivers"] == stored["drivers"]
+    assert sorted((row["driver_number"], row["position"]) for row in merged["position"]) == [(1, 1), (4, 2)]
+    assert merged["laps"] == stored["laps"]
+    assert [row["message"] for row in merged["race_control"]] == ["GREEN FLAG", "SAFETY CAR DEPLOYED"]
+    assert advance_live_cursors(cursors, updates) == {
+        "position": "2026-03-01T14:05:00",
+        "laps": "2026-03-01T14:02:00",
+        "pit": "2026-03-01T13:00:00",
+        "race_control": "2026-03-01T14:06:00",
+    }
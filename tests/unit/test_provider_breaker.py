@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import pytest
+
+from apex_predict.api import routes_v1
+from apex_predict.providers import router
+from apex_predict.providers.breaker import BreakerState, CircuitBreaker
+from apex_predict.providers.latency import LatencyTracker
+from apex_predict.services import ingestion
+from apex_predict.worker import jobs
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _breaker(clock: _Clock) -> CircuitBreaker:
+    return CircuitBreaker(failure_threshold=3, failure_window_seconds=60, reset_timeout_seconds=30, clock=clock)
+
+
+@pytest.mark.unit
+def test_breaker_opens_after_threshold_and_recovers_through_single_trial() -> None:
+    clock = _Clock()
+    breaker = _breaker(clock)
+
+    for _ in range(3):
+        assert breaker.allow_request()
+        breaker.record_failure(TimeoutError())
+    assert breaker.state == BreakerState.OPEN
+    assert not breaker.allow_request()
+
+    clock.now += 30
+    assert breaker.state == BreakerState.HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    breaker.record_failure(TimeoutError())
+    assert breaker.state == BreakerState.OPEN
+    assert breaker.snapshot()["last_error"] == "TimeoutError"
+
+    clock.now += 30
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == BreakerState.CLOSED
+    assert breaker.snapshot() == {"state": "CLOSED", "recent_failures": 0, "last_error": None}
+
+
+@pytest.mark.unit
+def test_breaker_forgets_failures_outside_window() -> None:
+    clock = _Clock()
+    breaker = _breaker(clock)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.now += 61
+    breaker.record_failure()
+    assert breaker.state == BreakerState.CLOSED
+    assert breaker.snapshot()["recent_failures"] == 1
+
+
+@pytest.mark.unit
+def test_breaker_released_trial_can_be_retried() -> None:
+    clock = _Clock()
+    breaker = _breaker(clock)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 30
+
+    assert breaker.allow_request()
+    breaker.release_trial()
+    assert breaker.allow_request()
+
+
+@pytest.mark.unit
+def test_latency_tracker_uses_p95_once_warm() -> None:
+    tracker = LatencyTracker(window=100, min_samples=20, default_delay_seconds=1.0, max_delay_seconds=5.0)
+    for index in range(19):
+        tracker.observe("events", index / 100)
+    assert tracker.hedge_delay("events") == 1.0
+
+    tracker.observe("events", 0.19)
+    assert tracker.hedge_delay("events") == pytest.approx(0.18)
+
+    tracker.observe("events", 60.0)
+    assert tracker.hedge_delay("events") == pytest.approx(0.19)
+    assert tracker.hedge_delay("weather") == 1.0
+
+
+@pytest.mark.unit
+def test_api_worker_and_ingestion_share_one_router_and_its_breakers() -> None:
+    shared = router.provider_router
+    assert routes_v1.provider_router is shared
+    assert jobs.provider_router is shared
+    assert ingestion.shared_provider_router is shared
@@ -0,0 +1,403 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+
+from apex_predict.providers import base
+from apex_predict.providers.openf1 import OpenF1Provider
+from apex_predict.providers.router import ProviderRouter
+
+
+@pytest.mark.unit
+@pytest.mark.anyio
+async def test_provider_reuses_one_pooled_client_until_closed(monkeypatch) -> None:
+    requests: list[str] = []
+    built: list[httpx.AsyncClient] = []
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        return httpx.Response(200, json=[])
+
+    def _build(settings, transport=None) -> httpx.AsyncClient:
+        client = httpx.AsyncClient(transport=httpx.MockTransport(_handler))
+        built.append(client)
+        return client
+
+    monkeypatch.setattr(base, "build_http_client", _build)
+    router = ProviderRouter()
+
+    assert await router.primary.health_check()
+    assert await router.primary.fetch_events(2025) == []
+    assert await router.primary.fetch_session_results("9999") == []
+    assert len(built) == 1
+    assert len(requests) == 3
+
+    await router.aclose()
+    assert built[0].is_closed
+
+    await router.primary.fetch_events(2025)
+    assert len(built) == 2
+    await router.aclose()
+
+
+@pytest.mark.unit
+@pytest.mark.anyio
+async def test_get_json_passes_timeout_to_the_request_not_the_query(monkeypatch) -> None:
+    seen: list[httpx.Request] = []
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        return httpx.Response(200, json=[])
+
+    monkeypatch.setattr(
+        base,
+        "build_http_client",
+        lambda settings, transport=None: httpx.AsyncClient(transport=httpx.MockTransport(_handler)),
+    )
+    provider = OpenF1Provider()
+    try:
+        assert await provider._get_json("https://example.test/laps", {"session_key": "9"}, timeout=2.5) == []
+    finally:
+        await provider.aclose()
+
+    assert dict(seen[0].url.params) == {"session_key": "9"}
+    assert seen[0].extensions["timeout"]["read"] == 2.5
+
+
+def _session_payloads() -> dict[str, list[dict]]:
+    return {
+        "/drivers": [
+            {"driver_number": 1, "name_acronym": "VER", "team_name": "Red Bull"},
+            {"driver_number": 4, "name_acronym": "NOR", "team_name": "McLaren"},
+        ],
+        "/position": [
+            {"driver_number": 1, "position": 1, "date": "2025-01-01T10:00:00"},
+            {"driver_number": 4, "position": 2, "date": "2025-01-01T10:00:00"},
+        ],
+        "/laps": [{"driver_number": 4, "lap_duration": 90.5}],
+        "/pit": [{"driver_number": 1, "date": "2025-01-01T10:20:00"}],
+    }
+
+
+@pytest.mark.unit
+@pytest.mark.anyio
+async def test_session_facts_fan_out_concurrently_and_report_failed_endpoints(monkeypatch) -> None:
+    payloads = _session_payloads()
+    in_flight = 0
+    peak_in_flight = 0
+
+    async def _handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak_in_flight
+        in_flight += 1
+        peak_in_flight = max(peak_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if request.url.path == "/race_control":
+            return httpx.Response(503)
+        return httpx.Response(200, json=payloads[request.url.path])
+
+    monkeypatch.setattr(
+        base,
+        "build_http_client",
+        lambda settings, transport=None: httpx.AsyncClient(transport=httpx.MockTransport(_handler)),
+    )
+    provider = OpenF1Provider()
+    monkeypatch.setattr(provider.settings, "openf1_base_url", "https://openf1.test")
+
+    facts = await provider.fetch_session_facts("9999")
+    await provider.aclose()
+
+    assert peak_in_flight == 5
+    assert facts["winner"] == "VER"
+    assert facts["fastest_lap"] == "NOR"
+    assert facts["first_pit_stop_team"] == "RED_BULL"
+    assert facts["unavailable_facts"] == ["dnf_driver_codes", "first_safety_car_lap", "safety_car"]
+
+
+@pytest.mark.unit
+@pytest.mark.anyio
+async def test_session_facts_require_drivers_endpoint(monkeypatch) -> None:
+    payloads = _session_payloads()
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/drivers":
+            return httpx.Response(500)
+        return httpx.Response(200, json=payloads.get(request.url.path, []))
+
+    monkeypatch.setattr(
+        base,
+        "build_http_client",
+        lambda settings, transport=None: httpx.AsyncClient(transport=httpx.MockTransport(_handler)),
+    )
+    provider = OpenF1Provider()
+    monkeypatch.setattr(provider.settings, "openf1_base_url", "https://openf1.test")
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await provider.fetch_session_facts("9999")
+    await provider.aclose()
+
+
+@pytest.mark.unit
+@pytest.mark.anyio
+async def test_router_skips_health_probe_and_opens_breaker_on_failures(monkeypatch) -> None:
+    paths: list[str] = []
+    primary_up = True
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        paths.append(request.url.host + request.url.path)
+        if request.url.host == "openf1.test" and not primary_up:
+            return httpx.Response(503)
+        if request.url.host == "openf1.test":
+            return httpx.Response(200, json=[])
+        return httpx.Response(200, json={"MRData": {"RaceTable": {"Races": []}}})
+
+    monkeypatch.setattr(
+        base,
+        "build_http_client",
+        lambda settings, transport=None: httpx.AsyncClient(transport=httpx.MockTransport(_handler)),
+    )
+    router = ProviderRouter()
+    monkeypatch.setattr(router.primary.settings, "openf1_base_url", "https://openf1.test")
+    monkeypatch.setattr(router.primary.settings, "fallback_base_url", "https://fallback.test")
+
+    assert await router.fetch_events(2025) == ("openf1", [])
+    assert paths == ["openf1.test/meetings"]
+
+    primary_up = False
+    paths.clear()
+    threshold = router.breakers["openf1"].failure_threshold
+    for _ in range(threshold):
+        assert await router.fetch_events(2025) == ("fallback", [])
+    assert router.breaker_states()["openf1"]["state"] == "OPEN"
+    assert (await router.active_provider()).name == "fallback"
+
+    paths.clear()
+    assert await router.fetch_events(2025) == ("fallback", [])
+    assert paths == ["fallback.test/2025.json"]
+    await router.aclose()
+
+
+def _hedging_router(monkeypatch, primary_delay: float) -> tuple[ProviderRouter, list[str]]:
+    paths: list[str] = []
+
+    async def _handler(request: httpx.Request) -> httpx.Response:
+        paths.append(request.url.host)
+        if request.url.host == "openf1.test":
+            try:
+                await asyncio.sleep(primary_delay)
+            except asyncio.CancelledError:
+                paths.append("openf1.test:cancelled")
+                raise
+            return httpx.Response(200, json=[{"meeting_key": 1, "meeting_name": "Primary GP"}])
+        return httpx.Response(
+            200,
+            json={"MRData": {"RaceTable": {"Races": [{"round": "1", "raceName": "Fallback GP"}]}}},
+        )
+
+    monkeypatch.setattr(
+        base,
+        "build_http_client",
+        lambda settings, transport=None: httpx.AsyncClient(transport=httpx.MockTransport(_handler)),
+    )
+    router = ProviderRouter()
+    monkeypatch.setattr(router.primary.settings, "openf1_base_url", "https://openf1.test")
+    monkeypatch.setattr(router.primary.settings, "fallback_base_url", "https://fallback.test")
+    router.hedging_enabled = True
+    router.latency.default_delay_seconds = 0.05
+    return router, paths
+
+
+@pytest.mark.unit
+@pytest.mark.anyio
+async def test_hedged_fetch_races_fallback_and_cancels_slow_primary(monkeypatch) -> None:
+    router, paths = _hedging_router(monkeypatch, primary_delay=2.0)
+
+    provider_name, events = await router.fetch_events(2025)
+    await asyncio.sleep(0)
+
+    assert provider_name == "fallback"
+    assert events[0]["name"] == "Fallback GP"
+    assert paths == ["openf1.test", "fallback.test", "openf1.test:cancelled"]
+    assert router.breaker_states()["openf1"]["state"] == "CLOSED"
+    await router.aclose()
+
+
+@pytest.mark.unit
+@pytest.mark.anyio
+async def test_hedged_fetch_skips_fallback_when_primary_is_fast(monkeypatch) -> None:
+    router, paths = _hedging_router(monkeypatch, primary_delay=0)
+
+    provider_name, events = await router.fetch_events(2025)
+
+    assert provider_name == "openf1"
+    assert events[0]["name"] == "Primary GP"
+    assert paths == ["openf1.test"]
+    await router.aclose()
+
+
+@pytest.mark.unit
+@pytest.mark.anyio
+async def test_session_facts_served_from_disk_cache_and_revalidated(monkeypatch, tmp_path) -> None:
+    payloads = _session_payloads()
+    seen: list[tuple[str, str | None]] = []
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        validator = request.headers.get("if-none-match")
+        seen.append((request.url.path, validator))
+        if validator == f'"{request.url.path}"':
+            return httpx.Response(304)
+        return httpx.Response(
+            200,
+            json=payloads.get(request.url.path, []),
+            headers={"ETag": f'"{request.url.path}"'},
+        )
+
+    monkeypatch.setattr(
+        base,
+        "build_http_client",
+        lambda settings, transport=None: httpx.AsyncClient(transport=httpx.MockTransport(_handler)),
+    )
+    provider = OpenF1Provider()
+    monkeypatch.setattr(provider.settings, "openf1_base_url", "https://openf1.test")
+    monkeypatch.setattr(provider.settings, "provider_cache_dir", str(tmp_path))
+    monkeypatch.setattr(provider.settings, "provider_cache_live_ttl_seconds", 0.0)
+
+    live = await provider.fetch_session_facts("9999")
+    assert len(seen) == 5
+    assert all(validator is None for _, validator in seen)
+    assert len(list(tmp_path.glob("*/*.json.gz"))) == 5
+
+    seen.clear()
+    revalidated = await provider.fetch_session_facts("9999")
+    assert revalidated == live
+    assert len(seen) == 5
+    assert all(validator == f'"{path}"' for path, validator in seen)
+
+    seen.clear()
+    await provider.fetch_session_facts("9999", finalized=True)
+    seen.clear()
+    assert await provider.fetch_session_facts("9999", finalized=True) == live
+    assert seen == []
+    await provider.aclose()
+
+
+@pytest.mark.unit
+def test_pushdown_filters_only_sends_supported_fields() -> None:
+    assert OpenF1Provider.pushdown_filters(
+        "laps",
+        {"lap_duration>": 0, "is_pit_out_lap": False, "date>=": "2025-01-01"},
+    ) == {"lap_duration>": "0", "is_pit_out_lap": "false"}
+    assert OpenF1Provider.pushdown_filters("drivers", {"date>=": "2025-01-01"}) == {}
+
+
+@pytest.mark.unit
+@pytest.mark.anyio
+async def test_session_facts_push_filters_upstream_and_retry_incomplete_windows(monkeypatch) -> None:
+    payloads = _session_payloads()
+    queries: list[tuple[str, dict]] = []
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        params = dict(request.url.params)
+        queries.append((request.url.path, params))
+        rows = payloads.get(request.url.path, [])
+        if request.url.path == "/position" and "date>=" in params:
+            rows = rows[:1]
+        if "driver_number" in params:
+            rows = [row for row in rows if str(row["driver_number"]) == params["driver_number"]]
+        if request.url.path == "/pit" and "lap_number<=" in params:
+            rows = []
+        return httpx.Response(200, json=rows)
+
+    monkeypatch.setattr(
+        base,
+        "build_http_client",
+        lambda settings, transport=None: httpx.AsyncClient(transport=httpx.MockTransport(_handler)),
+    )
+    provider = OpenF1Provider()
+    monkeypatch.setattr(provider.settings, "openf1_base_url", "https://openf1.test")
+
+    ends_at = datetime(2025, 3, 16, 6, 0, tzinfo=timezone.utc)
+    facts = await provider.fetch_session_facts("9999", ends_at=ends_at)
+    await provider.aclose()
+
+    first_round = {path: params for path, params in queries[:5]}
+    assert first_round["/position"]["date>="] == "2025-03-16T05:45:00"
+    assert first_round["/laps"] == {"session_key": "9999", "lap_duration>": "0", "is_pit_out_lap": "false"}
+    assert first_round["/pit"]["lap_number<="] == "25"
+    assert first_round["/drivers"] == {"session_key": "9999"}
+    assert sorted((path, params) for path, params in queries[5:]) == [
+        ("/pit", {"session_key": "9999"}),
+        ("/position", {"session_key": "9999", "driver_number": "4"}),
+    ]
+    assert facts["top5"] == ["VER", "NOR"]
+    assert facts["first_pit_stop_team"] == "RED_BULL"
+    assert facts["unavailable_facts"] == []
+
+    queries.clear()
+    provider = OpenF1Provider()
+    monkeypatch.setattr(provider.settings, "openf1_base_url", "https://openf1.test")
+    settled = await provider.fetch_session_facts("9999", ends_at=ends_at, finalized=True)
+    await provider.aclose()
+    assert [params for path, params in queries if path == "/position"] == [{"session_key": "9999"}]
+    assert settled["top5"] == ["VER", "NOR"]
+
+
+@pytest.mark.unit
+@pytest.mark.anyio
+async def test_weather_remembers_meetings_that_are_no_longer_live(monkeypatch) -> None:
+    queries: list[dict] = []
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        params = dict(request.url.params)
+        queries.append(params)
+        if "date>=" in params:
+            return httpx.Response(200, json=[])
+        return httpx.Response(200, json=[{"date": "2025-03-16T06:00:00", "air_temperature": 21.5}])
+
+    monkeypatch.setattr(
+        base,
+        "build_http_client",
+        lambda settings, transport=None: httpx.AsyncClient(transport=httpx.MockTransport(_handler)),
+    )
+    provider = OpenF1Provider()
+    monkeypatch.setattr(provider.settings, "openf1_base_url", "https://openf1.test")
+    try:
+        assert (await provider.fetch_weather("1254"))["air_temperature"] == 21.5
+        assert len(queries) == 2
+        assert (await provider.fetch_weather("1254"))["air_temperature"] == 21.5
+    finally:
+        await provider.aclose()
+    assert queries[2:] == [{"meeting_key": "1254"}]
+
+
+@pytest.mark.unit
+@pytest.mark.anyio
+async def test_weather_retries_the_recent_window_once_a_quiet_meeting_expires(monkeypatch) -> None:
+    queries: list[dict] = []
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        params = dict(request.url.params)
+        queries.append(params)
+        if "date>=" in params:
+            return httpx.Response(200, json=[])
+        return httpx.Response(200, json=[{"date": "2025-03-15T06:00:00", "air_temperature": 19.0}])
+
+    monkeypatch.setattr(
+        base,
+        "build_http_client",
+        lambda settings, transport=None: httpx.AsyncClient(transport=httpx.MockTransport(_handler)),
+    )
+    provider = OpenF1Provider()
+    monkeypatch.setattr(provider.settings, "openf1_base_url", "https://openf1.test")
+    # A zero-length window expires the quiet entry immediately.
+    monkeypatch.setattr(provider.settings, "openf1_weather_window_seconds", 0.0)
+    try:
+        await provider.fetch_weather("1254")
+        await provider.fetch_weather("1254")
+    finally:
+        await provider.aclose()
+    # A gap between sessions of a multi-day meeting must not pin it to the full series forever.
+    assert ["date>=" in params for params in queries] == [True, False, True, False]
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import time
+
+import httpx
+import pytest
+
+from apex_predict.providers import base
+from apex_predict.providers.openf1 import OpenF1Provider
+from apex_predict.providers.replay import ReplayArchive, ReplayProvider
+
+SESSION_PAYLOADS = {
+    "/drivers": [
+        {"driver_number": 1, "name_acronym": "VER", "team_name": "Red Bull"},
+        {"driver_number": 4, "name_acronym": "NOR", "team_name": "McLaren"},
+    ],
+    "/position": [
+        {"driver_number": 1, "position": 2, "date": "2025-01-01T10:00:00"},
+        {"driver_number": 4, "position": 1, "date": "2025-01-01T10:00:00"},
+    ],
+    "/laps": [{"driver_number": 1, "lap_duration": 89.9}],
+    "/pit": [{"driver_number": 4, "date": "2025-01-01T10:20:00"}],
+    "/race_control": [{"message": "SAFETY CAR DEPLOYED", "lap_number": 12}],
+    "/weather": [{"date": "2025-01-01T10:00:00", "air_temperature": 24.5, "rainfall": 0}],
+}
+
+
+def _offline_transport() -> httpx.AsyncBaseTransport:
+    def _handler(request: httpx.Request) -> httpx.Response:
+        raise AssertionError(f"unexpected network request: {request.url}")
+
+    return httpx.MockTransport(_handler)
+
+
+def _replay_provider(archive: ReplayArchive, monkeypatch, **options) -> ReplayProvider:
+    provider = ReplayProvider(OpenF1Provider(), archive=archive, mode="replay", **options)
+    monkeypatch.setattr(provider.inner.settings, "openf1_base_url", "https://openf1.test")
+    return provider
+
+
+@pytest.mark.unit
+@pytest.mark.anyio
+async def test_recorded_provider_traffic_replays_offline(monkeypatch, tmp_path) -> None:
+    archive = ReplayArchive(tmp_path)
+    network_calls: list[str] = []
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        network_calls.append(request.url.path)
+        return httpx.Response(200, json=SESSION_PAYLOADS[request.url.path], headers={"ETag": '"v1"'})
+
+    monkeypatch.setattr(base, "build_http_transport", lambda settings: httpx.MockTransport(_handler))
+    recorder = ReplayProvider(OpenF1Provider(), archive=archive, mode="record")
+    monkeypatch.setattr(recorder.inner.settings, "openf1_base_url", "https://openf1.test")
+    recorded_facts = await recorder.fetch_session_facts("9999")
+    recorded_weather = await recorder.fetch_weather("1234")
+    await recorder.aclose()
+    assert len(network_calls) == 6
+
+    monkeypatch.setattr(base, "build_http_transport", lambda settings: _offline_transport())
+    replayer = _replay_provider(archive, monkeypatch)
+    assert replayer.name == "openf1"
+    assert await replayer.fetch_session_facts("9999") == recorded_facts
+    assert await replayer.fetch_weather("1234") == recorded_weather == {
+        "air_temperature": 24.5,
+        "rainfall": 0,
+        "track_temperature": None,
+        "wind_speed": None,
+    }
+    assert recorded_facts["winner"] == "NOR"
+    assert recorded_facts["safety_car"] is True
+    await replayer.aclose()
+
+
+@pytest.mark.unit
+@pytest.mark.anyio
+async def test_replay_injects_latency_failures_and_rejects_unrecorded_requests(monkeypatch, tmp_path) -> None:
+    archive = ReplayArchive(tmp_path)
+    monkeypatch.setattr(base, "build_http_transport", lambda settings: _offline_transport())
+
+    missing = _replay_provider(archive, monkeypatch)
+    with pytest.raises(httpx.ConnectError, match="no recording"):
+        await missing.fetch_events(2025)
+    await missing.aclose()
+
+    failing = _replay_provider(archive, monkeypatch, failure_rate=1.0, seed=3)
+    with pytest.raises(httpx.ConnectError, match="injected failure"):
+        await failing.fetch_events(2025)
+    await failing.aclose()
+
+    slow = _replay_provider(archive, monkeypatch, latency_seconds=0.05, jitter_seconds=0.01, seed=3)
+    started = time.monotonic()
+    assert await slow.health_check() is False
+    assert time.monotonic() - started >= 0.04
+    await slow.aclose()
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from apex_predict.providers import reducers
+from apex_predict.providers.streaming import iter_json_array
+
+
+async def _chunks(text: str, size: int):
+    for start in range(0, len(text), size):
+        yield text[start : start + size]
+
+
+async def _collect(text: str, size: int) -> list:
+    return [item async for item in iter_json_array(_chunks(text, size))]
+
+
+@pytest.mark.unit
+@pytest.mark.anyio
+@pytest.mark.parametrize("size", [1, 3, 7, 4096])
+async def test_iter_json_array_matches_json_loads_for_any_chunking(size: int) -> None:
+    document = [
+        {"driver_number": 1, "date": "2025-03-16T05:00:00", "position": 1},
+        {"driver_number": 44, "lap_duration": 91.25, "nested": {"a": [1, 2, "]"]}},
+        12345,
+        "text, with ] brackets",
+        None,
+        True,
+    ]
+    text = "\n  " + json.dumps(document, indent=1) + "  \n"
+    assert await _collect(text, size) == document
+    assert await _collect("[ ]", size) == []
+
+
+@pytest.mark.unit
+@pytest.mark.anyio
+@pytest.mark.parametrize("text", ['{"a": 1}', '[{"a": 1}', '[{"a": 1} {"b": 2}]', ""])
+async def test_iter_json_array_rejects_malformed_documents(text: str) -> None:
+    with pytest.raises(ValueError):
+        await _collect(text, 2)
+
+
+@pytest.mark.unit
+def test_per_driver_reducers_keep_one_row_per_driver() -> None:
+    position = reducers.latest_position()
+    laps = reducers.fastest_lap()
+    pits = reducers.earliest_pit()
+    rows = [
+        {"driver_number": 1, "date": "2025-01-01T10:00:00", "position": 2, "lap_duration": 91.0},
+        {"driver_number": 1, "date": "2025-01-01T10:05:00", "position": 1, "lap_duration": 90.2},
+        {"driver_number": 4, "date": "2025-01-01T10:01:00", "position": 1, "lap_duration": None},
+        {"driver_number": 4, "date": "2025-01-01T09:59:00", "position": 3, "lap_duration": 0},
+        {"driver_number": None, "date": "2025-01-01T11:00:00", "position": 9, "lap_duration": 60.0},
+    ]
+    for row in rows:
+        position.feed(row)
+        laps.feed(row)
+        pits.feed(row)
+
+    assert {row["driver_number"]: row["position"] for row in position.rows()} == {1: 1, 4: 1}
+    assert [(row["driver_number"], row["lap_duration"]) for row in laps.rows()] == [(1, 90.2)]
+    assert {row["driver_number"]: row["date"] for row in pits.rows()} == {
+        1: "2025-01-01T10:00:00",
+        4: "2025-01-01T09:59:00",
+    }
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import pytest
+
+from apex_predict.services.rank_index import LeaderboardIndex
+
+
+def _index() -> LeaderboardIndex:
+    index = LeaderboardIndex()
+    index.load(
+        [
+            {"user_id": "carol", "username": "carol", "total_points": 40.0},
+            {"user_id": "alice", "username": "alice", "total_points": 75.5},
+            {"user_id": "bob", "username": "bob", "total_points": 40.0},
+            {"user_id": "dave", "username": "dave", "total_points": 12.25},
+        ],
+        version="v1",
+    )
+    return index
+
+
+@pytest.mark.unit
+def test_rank_index_orders_by_points_then_user_id() -> None:
+    index = _index()
+    assert [index.row_at(rank)["user_id"] for rank in range(1, 5)] == ["alice", "bob", "carol", "dave"]
+    assert index.rank_of("carol") == 3
+    assert index.rank_of("nobody") is None
+    assert index.version == "v1"
+
+
+@pytest.mark.unit
+def test_rank_index_window_clamps_to_bounds() -> None:
+    index = _index()
+    assert [row["user_id"] for row in index.window("alice", 1)] == ["alice", "bob"]
+    assert [row["rank"] for row in index.window("carol", 1)] == [2, 3, 4]
+    assert index.window("nobody", 3) == []
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from decimal import Decimal
+
+import pytest
+
+from apex_predict.services.scoring import awarded_points_for_prediction, confidence_multiplier_from_credits
+
+np = pytest.importorskip("numpy")
+
+from apex_predict.services.scoring_columnar import award_cents, score_answer_columns  # noqa: E402
+
+
+@pytest.mark.unit
+def test_award_cents_matches_decimal_quantization() -> None:
+    base = np.repeat(np.arange(0, 60, dtype=np.int64), 301)
+    credits = np.tile(np.arange(0, 301, dtype=np.int64), 60)
+
+    multiplier_cents, awarded = award_cents(base, credits)
+
+    for row_base, row_credits, row_multiplier, row_awarded in zip(
+        base.tolist(), credits.tolist(), multiplier_cents.tolist(), awarded.tolist(), strict=True
+    ):
+        assert Decimal(row_multiplier).scaleb(-2) == confidence_multiplier_from_credits(row_credits)
+        assert Decimal(row_awarded).scaleb(-2) == awarded_points_for_prediction(row_base, row_credits)
+        assert row_awarded / 100 == float(awarded_points_for_prediction(row_base, row_credits))
+
+
+@pytest.mark.unit
+def test_award_cents_rejects_negative_values() -> None:
+    with pytest.raises(ValueError, match="credits_must_be_non_negative"):
+        award_cents(np.array([10]), np.array([-1]))
+
+
+@pytest.mark.unit
+def test_score_answer_columns_masks_incorrect_and_unknown_questions() -> None:
+    rows, base, multiplier_cents, awarded = score_answer_columns(
+        question_ids=["q1", "q2"],
+        correct_options=["VER", "NOR"],
+        base_points=[20, 25],
+        answer_question_ids=["q1", "q2", "q1", "q9"],
+        selected_options=["VER", "LEC", "VER", "VER"],
+        credits=[50, 10, 0, 100],
+    )
+    assert rows.tolist() == [0, 2]
+    assert base.tolist() == [20, 20]
+    assert multiplier_cents.tolist() == [150, 100]
+    assert awarded.tolist() == [3000, 2000]
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import pytest
+
+from apex_predict.services.snapshot_history import apply_league_delta, diff_league_rows
+
+
+def _row(rank: int, user_id: str, points: float) -> dict:
+    return {"rank": rank, "user_id": user_id, "username": user_id, "total_points": points}
+
+
+@pytest.mark.unit
+def test_league_delta_round_trips_changes_additions_and_removals() -> None:
+    keyframe = [_row(1, "a", 50.0), _row(2, "b", 40.0), _row(3, "c", 10.0)]
+    current = [_row(1, "b", 60.0), _row(2, "a", 50.0), _row(3, "d", 20.0)]
+
+    delta = diff_league_rows(keyframe, current)
+
+    assert {row["user_id"] for row in delta} == {"a", "b", "c", "d"}
+    assert {"user_id": "c", "removed": True} in delta
+    assert apply_league_delta(keyframe, delta) == current
+
+
+@pytest.mark.unit
+def test_league_delta_is_empty_when_standings_unchanged() -> None:
+    keyframe = [_row(1, "a", 50.0), _row(2, "b", 40.0)]
+    assert diff_league_rows(keyframe, list(keyframe)) == []
+    assert apply_league_delta(keyframe, []) == keyframe